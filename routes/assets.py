@@ -1,12 +1,40 @@
 from fastapi import APIRouter, HTTPException, Query
 from pathlib import Path
+from threading import Lock
 import os
 
+from tools.asset_manifest import update_manifest
+
 router = APIRouter()
 
 # Répertoire racine où les résultats sont écrits
 PUBLIC_DIR = Path("public")
 
+# Manifestes servis par /mesh-assets/ : dossier de sortie → manifeste.
+# Invalidé par invalidate_manifest() à la fin de chaque job qui y écrit.
+_manifests: dict = {}
+_manifests_lock = Lock()
+
+
+def get_manifest(out_dir: Path) -> dict:
+    key = str(Path(out_dir).resolve())
+    with _manifests_lock:
+        manifest = _manifests.get(key)
+    if manifest is None:
+        manifest = update_manifest(out_dir)
+        with _manifests_lock:
+            _manifests[key] = manifest
+    return manifest
+
+
+def invalidate_manifest(out_dir: str | Path | None = None) -> None:
+    """Oublie le manifeste en cache de ``out_dir`` (ou tous)."""
+    with _manifests_lock:
+        if out_dir is None:
+            _manifests.clear()
+        else:
+            _manifests.pop(str(Path(out_dir).resolve()), None)
+
 
 @router.get("/mesh-assets/")
 def list_mesh_assets(
@@ -19,8 +47,9 @@ def list_mesh_assets(
     )
 ):
     """
-    Retourne les textures (.gii) et normales (.csv) associées **au sujet**
-    du mesh donné. Les fichiers sont cherchés dans :
+    Retourne les textures (.gii) et normales (.csv / .npy) associées **au sujet**
+    du mesh donné, avec leurs métadonnées (n_vertices, dtype, min, max,
+    sha256) issues du manifeste de :
 
         public/<subject>/cortexanalyzer/
     """
@@ -42,12 +71,8 @@ def list_mesh_assets(
     textures: list[dict] = []
     normals:  list[dict] = []
 
-    if out_dir.exists():
-        for f in out_dir.iterdir():
-            if f.is_file():
-                if f.suffix.lower() == ".gii":
-                    textures.append({"name": f.name, "path": str(f)})
-                elif f.suffix.lower() == ".csv":
-                    normals.append({"name": f.name, "path": str(f)})
+    for name, asset in get_manifest(out_dir)["assets"].items():
+        item = {**asset, "path": str(out_dir / name)}
+        (textures if asset["kind"] == "texture" else normals).append(item)
 
     return {"textures": textures, "normals": normals}
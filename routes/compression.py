@@ -0,0 +1,207 @@
+"""Compression des réponses HTTP (brotli si disponible, sinon gzip).
+
+``CompressionMiddleware`` est un middleware ASGI autonome (il ne dépend que de
+l'interface ASGI et des structures publiques de Starlette) :
+  • brotli lorsque le client l'accepte et que le module ``brotli`` est
+    installé, sinon gzip ; corps inchangé si aucun des deux n'est accepté
+  • seuls les corps d'au moins ``MIN_SIZE`` octets sont compressés ; les
+    réponses en streaming sont compressées bloc par bloc (flush à chaque bloc)
+  • réponses partielles (206), sans corps (204, 304), déjà encodées ou de
+    type exclu transmises telles quelles
+
+Les corps binaires (maillages, textures encodées, CVMZ) sont exclus : déjà
+compacts, ils gagneraient peu pour un coût CPU élevé. Un ETag fort posé par
+l'application est suffixé par l'encodage (``"…-gzip"``), puisque les octets
+envoyés diffèrent ; ``http_cache.etag_matches`` retire ce suffixe. Un 304
+porte le même ETag que la réponse 200 qu'il revalide : suffixé si le client
+a présenté la version compressée avec l'encodage négocié.
+"""
+import os
+import zlib
+
+import anyio.to_thread
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Taille minimale (octets) d'un corps compressé
+MIN_SIZE = int(os.environ.get("CORTEXVISU_COMPRESS_MIN_SIZE", "1024"))
+
+# Niveaux choisis pour la vitesse : un maillage JSON fait plusieurs Mo
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Au-delà (octets), la compression se fait dans un thread
+THREAD_MIN_SIZE = 128 * 1024
+
+# Types exclus ("type/*" : toute la famille)
+EXCLUDED_CONTENT_TYPES = (
+    "application/octet-stream",
+    "application/vnd.cortexvisu.cvmz",
+    "application/gzip",
+    "application/x-gzip",
+    "application/zip",
+    "text/event-stream",
+    "font/woff",
+    "font/woff2",
+    "image/*",
+    "audio/*",
+    "video/*",
+)
+
+
+def _accepts(accept_encoding: str, coding: str) -> bool:
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        if name.strip().lower() == coding:
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+def _excluded(content_type: str) -> bool:
+    media_type = content_type.partition(";")[0].strip().lower()
+    family = media_type.partition("/")[0] + "/*"
+    return media_type in EXCLUDED_CONTENT_TYPES or family in EXCLUDED_CONTENT_TYPES
+
+
+class _GzipStream:
+    def __init__(self, level: int):
+        self._z = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        return self._z.compress(data) + self._z.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class _BrotliStream:
+    def __init__(self, quality: int):
+        self._c = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        return self._c.process(data) + (self._c.finish() if final else self._c.flush())
+
+
+class _Responder:
+    """Compression d'une réponse : en-têtes retenus jusqu'au premier bloc de corps."""
+
+    def __init__(self, app: ASGIApp, encoding: str, stream, minimum_size: int,
+                 if_none_match: str = ""):
+        self.app = app
+        self.encoding = encoding
+        self.if_none_match = if_none_match
+        self.stream = stream
+        self.minimum_size = minimum_size
+        self.send: Send | None = None
+        self.start: Message | None = None
+        self.passthrough = False
+        self.compressing = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    async def _compress(self, data: bytes, final: bool) -> bytes:
+        if len(data) >= THREAD_MIN_SIZE:
+            # un gros corps compressé sur la boucle d'événements la bloquerait
+            return await anyio.to_thread.run_sync(self.stream.compress, data, final)
+        return self.stream.compress(data, final)
+
+    def _encoded_etag(self, etag: str | None) -> str | None:
+        if etag and not etag.startswith("W/") and etag.endswith('"'):
+            return f'{etag[:-1]}-{self.encoding}"'
+        return None
+
+    def _revalidated(self, message: Message) -> None:
+        """304 : ETag suffixé si le client a présenté la version compressée."""
+        headers = MutableHeaders(raw=message["headers"])
+        encoded = self._encoded_etag(headers.get("etag"))
+        tags = {t.strip().removeprefix("W/") for t in self.if_none_match.split(",")}
+        if encoded in tags:
+            headers["etag"] = encoded
+            headers.add_vary_header("Accept-Encoding")
+
+    def _set_headers(self, length: int | None) -> None:
+        headers = MutableHeaders(raw=self.start["headers"])
+        headers.add_vary_header("Accept-Encoding")
+        headers["content-encoding"] = self.encoding
+        if length is None:
+            del headers["content-length"]
+        else:
+            headers["content-length"] = str(length)
+        encoded = self._encoded_etag(headers.get("etag"))
+        if encoded:
+            headers["etag"] = encoded
+
+    async def send_compressed(self, message: Message) -> None:
+        if self.passthrough:
+            await self.send(message)
+            return
+
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            if message["status"] == 304:
+                self._revalidated(message)
+            if (message["status"] in (204, 206, 304) or "content-encoding" in headers
+                    or _excluded(headers.get("content-type", ""))):
+                self.passthrough = True
+                await self.send(message)
+            else:
+                self.start = message
+            return
+
+        if message["type"] != "http.response.body":
+            # pathsend, trailers… : aucune compression possible
+            self.passthrough = True
+            if self.start is not None and not self.compressing:
+                await self.send(self.start)
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if not self.compressing:
+            if not more_body and len(body) < self.minimum_size:
+                MutableHeaders(raw=self.start["headers"]).add_vary_header("Accept-Encoding")
+                self.passthrough = True
+                await self.send(self.start)
+                await self.send(message)
+                return
+            self.compressing = True
+            data = await self._compress(body, final=not more_body)
+            self._set_headers(None if more_body else len(data))
+            await self.send(self.start)
+        else:
+            data = await self._compress(body, final=not more_body)
+        await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = MIN_SIZE,
+                 compresslevel: int = GZIP_LEVEL, brotli_quality: int = BROTLI_QUALITY):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.compresslevel = compresslevel
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        accept_encoding = request_headers.get("Accept-Encoding", "")
+        if_none_match = request_headers.get("If-None-Match", "")
+        if brotli is not None and _accepts(accept_encoding, "br"):
+            responder = _Responder(self.app, "br", _BrotliStream(self.brotli_quality),
+                                   self.minimum_size, if_none_match)
+        elif _accepts(accept_encoding, "gzip"):
+            responder = _Responder(self.app, "gzip", _GzipStream(self.compresslevel),
+                                   self.minimum_size, if_none_match)
+        else:
+            await self.app(scope, receive, send)
+            return
+        await responder(scope, receive, send)
@@ -1,34 +1,39 @@
 from fastapi import APIRouter, Form
 from fastapi.responses import JSONResponse
 from typing import List
-from pathlib import Path
 
-from tools.curvature import compute_curvature
-from tools.parser import load_scalar_data
+from tools.curvature import CURVATURE_OUTPUT, compute_curvature
+from tools.parser import load_scalar_array
 
-UPLOAD_DIR = Path("uploads")
+from . import upload_store
+from .executor import run_blocking
+from .jobs import get_process_pool
 
 router = APIRouter()
 
 
-@router.post("/compute-curvature")
-async def compute_curvature_batch(mesh_ids: List[str] = Form(...)):
-    results = []
-
+def _compute_curvatures(mesh_ids: list) -> JSONResponse:
+    # Un maillage par processus du pool : les calculs tournent en parallèle
+    pool = get_process_pool()
+    output_dir = CURVATURE_OUTPUT.resolve()
+    uploads = upload_store.get_many(mesh_ids)
+    pending = []
     for mesh_id in mesh_ids:
-        matching = list(UPLOAD_DIR.glob(f"{mesh_id}_*"))
-        if not matching:
+        if mesh_id not in uploads:
             continue
+        mesh_path = uploads[mesh_id]["path"]
+        fut = pool.submit(compute_curvature, mesh_path, output_dir)
+        pending.append((mesh_id, mesh_path, fut))
 
-        mesh_path = str(matching[0])
-
+    results = []
+    for mesh_id, mesh_path, fut in pending:
         try:
-            curvature_path = compute_curvature(mesh_path)
-            scalars = load_scalar_data(curvature_path)
+            curvature_path = fut.result()
+            scalars = load_scalar_array(curvature_path)
 
             results.append({
                 "id": mesh_id,
-                "scalars": scalars,
+                "scalars": scalars.tolist(),
                 "message": f"Courbure calculée pour {mesh_path}"
             })
 
@@ -39,3 +44,8 @@ async def compute_curvature_batch(mesh_ids: List[str] = Form(...)):
             })
 
     return JSONResponse(content=results)
+
+
+@router.post("/compute-curvature")
+async def compute_curvature_batch(mesh_ids: List[str] = Form(...)):
+    return await run_blocking(_compute_curvatures, mesh_ids)
@@ -1,75 +1,122 @@
-from fastapi import APIRouter, Body
+from fastapi import APIRouter, BackgroundTasks, Body
 from pathlib import Path
 from fastapi.responses import JSONResponse
 import json
+import os
+import threading
+from tools.conversion_cache import file_digest
 from tools.mesh_to_threejs_json import generate_threejs_json
-from tools.parser import load_scalar_data
+from tools.mesh_to_glb import generate_glb
+from tools.parser import load_scalar_array
+
+from .jobs import create_job, finish_job, job_log, run_in_pool, run_job
 
 router = APIRouter()
 
 MESH_OUTPUT = Path("public/meshes")
 TEXTURE_OUTPUT = Path("public/textures")
+BUNDLE_OUTPUT = Path("public/bundles")      # .glb : maillage + toutes ses textures
 ASSOCIATIONS_FILE = TEXTURE_OUTPUT / "associations.json"
 
 MESH_OUTPUT.mkdir(parents=True, exist_ok=True)
 TEXTURE_OUTPUT.mkdir(parents=True, exist_ok=True)
+BUNDLE_OUTPUT.mkdir(parents=True, exist_ok=True)
 
 
-@router.post("/generate-database")
-async def generate_database(data: dict = Body(...)):
-    mesh_paths = data.get("meshes", [])
-    texture_paths = data.get("textures", [])
+def write_texture_json(texture_path: Path, output_dir: Path) -> Path:
+    """
+    Écrit ``{"scalars": [...]}`` pour une texture (exécuté dans le pool).
 
-    if not mesh_paths or not texture_paths:
-        return JSONResponse(status_code=400, content={
-            "error": "Les chemins des maillages ou des textures sont manquants."
-        })
+    Le nom de sortie ``<nom>-<empreinte>.json`` inclut l'empreinte du contenu :
+    deux textures de même nom (``sub-01/…/curv.gii``, ``sub-02/…/curv.gii``)
+    ne s'écrasent pas. L'écriture passe par un fichier temporaire puis
+    ``os.replace`` : un lecteur ne voit jamais de JSON tronqué.
+    """
+    texture_path = Path(texture_path)
+    scalars = load_scalar_array(texture_path)
+    texture_json_path = Path(output_dir) / f"{texture_path.stem}-{file_digest(texture_path)[:16]}.json"
+    tmp = texture_json_path.with_name(
+        f".{texture_json_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        tmp.write_text(json.dumps({"scalars": scalars.tolist()}))
+        os.replace(tmp, texture_json_path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+    return texture_json_path
 
-    mesh_jsons = []
-    texture_jsons = []
-
-    # Générer les JSON de maillages
-    for mesh_path in mesh_paths:
-        try:
-            json_path = generate_threejs_json(Path(mesh_path), MESH_OUTPUT)
-            mesh_jsons.append({
-                "mesh_path": mesh_path,
-                "json": json_path.name
-            })
-        except Exception as e:
-            print(f"Erreur lors de la génération du maillage pour {mesh_path}: {e}")
-
-    # Générer les JSON de textures
-    for texture_path in texture_paths:
-        try:
-            scalars = load_scalar_data(texture_path)
-            texture_name = Path(texture_path).stem
-
-            texture_json_path = TEXTURE_OUTPUT / f"{texture_name}.json"
-            texture_json_path.write_text(json.dumps({"scalars": scalars}))
-
-            texture_jsons.append({
-                "texture_path": texture_path,
-                "json": texture_json_path.name
-            })
-        except Exception as e:
-            print(f"Erreur lors de la génération de la texture pour {texture_path}: {e}")
 
-    # Création de la structure d'association maillages ↔ textures
-    associations = {}
-    for mesh_json in mesh_jsons:
-        associations[mesh_json["mesh_path"]] = []
+def build_database(job_id: str, mesh_paths: list, texture_paths: list) -> None:
+    """Conversion parallèle maillages + textures, puis bundles .glb."""
+    # Générer les JSON de maillages et de textures (pool de processus ;
+    # chemins absolus car les workers ne partagent pas forcément le cwd)
+    converted, errors = run_in_pool(job_id, [
+        *((("mesh", p), generate_threejs_json, (Path(p).resolve(), MESH_OUTPUT.resolve()))
+          for p in mesh_paths),
+        *((("texture", p), write_texture_json, (Path(p).resolve(), TEXTURE_OUTPUT.resolve()))
+          for p in texture_paths),
+    ])
 
-    for texture_json in texture_jsons:
-        texture_path = texture_json["texture_path"]
-        for mesh_json in mesh_jsons:
-            # Pour simplifier, on associe chaque texture à tous les maillages
-            associations[mesh_json["mesh_path"]].append(texture_json["json"])
+    mesh_jsons = [
+        {"mesh_path": p, "json": converted[("mesh", p)].name}
+        for p in mesh_paths if ("mesh", p) in converted
+    ]
+    texture_jsons = [
+        {"texture_path": p, "json": converted[("texture", p)].name}
+        for p in texture_paths if ("texture", p) in converted
+    ]
 
+    # Création de la structure d'association maillages ↔ textures
+    # Pour simplifier, on associe chaque texture à tous les maillages
+    associations = {
+        mesh_json["mesh_path"]: [t["json"] for t in texture_jsons]
+        for mesh_json in mesh_jsons
+    }
     ASSOCIATIONS_FILE.write_text(json.dumps(associations, indent=2))
 
-    return JSONResponse({
+    # Générer un .glb par maillage (positions + faces + textures associées)
+    texture_sources = [t["texture_path"] for t in texture_jsons]
+    glbs, glb_errors = run_in_pool(job_id, [
+        (("bundle", m["mesh_path"]), generate_glb,
+         (Path(m["mesh_path"]).resolve(), [Path(t).resolve() for t in texture_sources],
+          BUNDLE_OUTPUT.resolve()))
+        for m in mesh_jsons
+    ], done=len(mesh_paths) + len(texture_paths))
+    errors.update(glb_errors)
+
+    bundles = [
+        {"mesh_path": m["mesh_path"], "glb": glbs[key][0].name, "textures": glbs[key][1]}
+        for m in mesh_jsons if (key := ("bundle", m["mesh_path"])) in glbs
+    ]
+
+    job_log(job_id, f"{len(mesh_jsons)} maillage(s), {len(texture_jsons)} texture(s), "
+                    f"{len(errors)} erreur(s)")
+    finish_job(job_id, {
         "meshes": mesh_jsons,
         "textures": texture_jsons,
-        "associations": associations
+        "bundles": bundles,
+        "associations": associations,
+        "errors": [{"kind": kind, "path": path, "error": msg}
+                   for (kind, path), msg in errors.items()],
     })
+
+
+@router.post("/generate-database")
+def generate_database(background_tasks: BackgroundTasks, data: dict = Body(...)):
+    """
+    Lance la génération en tâche de fond et renvoie immédiatement un job_id ;
+    le résultat est disponible via GET /progress/{job_id} ("results").
+    """
+    mesh_paths = data.get("meshes", [])
+    texture_paths = data.get("textures", [])
+
+    if not mesh_paths or not texture_paths:
+        return JSONResponse(status_code=400, content={
+            "error": "Les chemins des maillages ou des textures sont manquants."
+        })
+
+    # une étape par conversion + un .glb par maillage
+    job_id = create_job(2 * len(mesh_paths) + len(texture_paths))
+    background_tasks.add_task(run_job, job_id, build_database, mesh_paths, texture_paths)
+
+    return JSONResponse({"status": "started", "job_id": job_id})
@@ -0,0 +1,51 @@
+"""Exécution des traitements bloquants hors de la boucle d'événements.
+
+Les handlers ``async def`` délèguent leur travail disque / nibabel / NumPy à
+``run_blocking`` : la boucle reste libre de servir les autres requêtes pendant
+le chargement d'un gros fichier.
+
+Configuration (variables d'environnement) :
+  • CORTEXVISU_EXECUTOR  "thread" (défaut) ou "process"
+  • CORTEXVISU_EXECUTOR_WORKERS  nombre de threads / processus
+
+En mode "process", les fonctions passées doivent être définies au niveau
+module (picklables).
+"""
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from threading import Lock
+import asyncio
+import multiprocessing
+import os
+
+EXECUTOR_KIND = os.environ.get("CORTEXVISU_EXECUTOR", "thread").lower()
+EXECUTOR_WORKERS = int(os.environ.get(
+    "CORTEXVISU_EXECUTOR_WORKERS", min(32, (os.cpu_count() or 1) + 4)
+))
+
+_executor: Executor | None = None
+_executor_lock = Lock()
+
+
+def get_executor() -> Executor:
+    """Executor partagé par tous les routers, créé au premier usage."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            if EXECUTOR_KIND == "process":
+                _executor = ProcessPoolExecutor(
+                    max_workers=EXECUTOR_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            else:
+                _executor = ThreadPoolExecutor(
+                    max_workers=EXECUTOR_WORKERS,
+                    thread_name_prefix="cortexvisu-io",
+                )
+        return _executor
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Exécute ``func(*args, **kwargs)`` dans l'executor et attend son résultat."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), partial(func, *args, **kwargs))
@@ -0,0 +1,206 @@
+"""Index persistant (SQLite) du contenu des dossiers de données.
+
+Chaque dossier indexé est enregistré avec son ``mtime`` : un rafraîchissement
+ne fait qu'un ``stat`` par dossier et ne relit (``scandir``) que ceux dont le
+mtime a changé, c'est-à-dire ceux où un fichier ou sous-dossier a été ajouté,
+supprimé ou renommé. Les sous-arbres disparus sont retirés de l'index.
+
+Si ``watchdog`` est installé et CORTEXVISU_FOLDER_WATCH=1, chaque racine
+indexée est surveillée : tant qu'aucun événement n'est reçu, le
+rafraîchissement est entièrement évité.
+
+Les fichiers et dossiers cachés (nom commençant par ".", dont les sidecars
+``.<nom>.csv.npy`` de tools.parser) ne sont pas indexés.
+
+Les chemins sont stockés relativement à la racine, au format POSIX ; le
+sujet BIDS (``sub-<label>``) est extrait à l'indexation pour le filtrage.
+"""
+from pathlib import Path, PurePath, PurePosixPath
+from threading import Lock
+from typing import Dict, List, Tuple
+import os
+import re
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+
+from .sqlite_store import connect
+
+INDEX_DB = Path(os.environ.get("CORTEXVISU_FOLDER_INDEX_DB", "cache/folder_index.sqlite"))
+WATCH = os.environ.get("CORTEXVISU_FOLDER_WATCH", "0") == "1" and Observer is not None
+
+# Sujet BIDS : composant *dossier* "sub-<label>" (pas un nom de fichier sub-01_…)
+_SUBJECT_RE = re.compile(r"(?:^|/)sub-([^/]+)/")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS dirs (
+    root      TEXT NOT NULL,
+    path      TEXT NOT NULL,
+    mtime_ns  INTEGER NOT NULL,
+    PRIMARY KEY (root, path)
+);
+CREATE TABLE IF NOT EXISTS files (
+    root      TEXT NOT NULL,
+    path      TEXT NOT NULL,
+    dir       TEXT NOT NULL,
+    ext       TEXT NOT NULL,
+    subject   TEXT,
+    PRIMARY KEY (root, path)
+);
+CREATE INDEX IF NOT EXISTS files_dir ON files (root, dir);
+CREATE INDEX IF NOT EXISTS files_ext ON files (root, ext);
+CREATE INDEX IF NOT EXISTS files_subject ON files (root, subject);
+"""
+
+_locks: Dict[str, Lock] = {}
+_locks_guard = Lock()
+
+# Surveillance : racine → (observer, état) ; état["dirty"] passe à True à chaque événement
+_watches: Dict[str, Tuple[object, dict]] = {}
+
+
+def _connect():
+    return connect(INDEX_DB, _SCHEMA)
+
+
+def _root_lock(root: str) -> Lock:
+    with _locks_guard:
+        return _locks.setdefault(root, Lock())
+
+
+def _parent(rel: str) -> str:
+    return rel.rpartition("/")[0]
+
+
+def _scan_dir(conn, root: str, rel: str, mtime_ns: int) -> List[str]:
+    """
+    Relit un dossier, remplace ses fichiers dans l'index et renvoie ses
+    sous-dossiers. Les liens symboliques vers des dossiers ne sont pas suivis
+    (comme ``os.walk``) ; un dossier illisible est ignoré.
+    """
+    rows = []
+    subdirs = []
+    try:
+        with os.scandir(os.path.join(root, rel)) as it:
+            for entry in it:
+                if entry.name.startswith("."):      # fichiers cachés : sidecars .npy, temporaires
+                    continue
+                child = f"{rel}/{entry.name}" if rel else entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(child)
+                    elif entry.is_file():
+                        subject = _SUBJECT_RE.search(child)
+                        rows.append((root, child, rel, PurePosixPath(child).suffix.lower(),
+                                     subject.group(1) if subject else None))
+                except OSError:
+                    continue
+    except OSError:
+        conn.execute("DELETE FROM files WHERE root = ? AND dir = ?", (root, rel))
+        conn.execute("DELETE FROM dirs WHERE root = ? AND path = ?", (root, rel))
+        return []
+
+    conn.execute("DELETE FROM files WHERE root = ? AND dir = ?", (root, rel))
+    conn.executemany(
+        "INSERT OR REPLACE INTO files (root, path, dir, ext, subject) VALUES (?, ?, ?, ?, ?)", rows
+    )
+    conn.execute(
+        "INSERT OR REPLACE INTO dirs (root, path, mtime_ns) VALUES (?, ?, ?)", (root, rel, mtime_ns)
+    )
+    return subdirs
+
+
+def refresh(root: str | Path) -> int:
+    """
+    Met l'index de ``root`` à jour ; renvoie le nombre de dossiers relus.
+    """
+    root = str(Path(root).resolve())
+    with _root_lock(root):
+        watch = _watches.get(root)
+        if watch is not None and not watch[1]["dirty"]:
+            return 0
+        if watch is not None:
+            watch[1]["dirty"] = False
+        elif WATCH:
+            _start_watch(root)          # avant le parcours : aucun événement perdu
+
+        with _connect() as conn:
+            known = {r["path"]: r["mtime_ns"] for r in
+                     conn.execute("SELECT path, mtime_ns FROM dirs WHERE root = ?", (root,))}
+            children: Dict[str, List[str]] = {}
+            for rel in known:
+                if rel:
+                    children.setdefault(_parent(rel), []).append(rel)
+
+            seen = set()
+            rescanned = 0
+            stack = [""]
+            while stack:
+                rel = stack.pop()
+                try:
+                    mtime_ns = os.stat(os.path.join(root, rel)).st_mtime_ns
+                except OSError:
+                    continue
+                seen.add(rel)
+                if known.get(rel) == mtime_ns:
+                    stack.extend(children.get(rel, ()))
+                else:
+                    stack.extend(_scan_dir(conn, root, rel, mtime_ns))
+                    rescanned += 1
+
+            removed = [(root, rel) for rel in known if rel not in seen]
+            conn.executemany("DELETE FROM dirs WHERE root = ? AND path = ?", removed)
+            conn.executemany("DELETE FROM files WHERE root = ? AND dir = ?", removed)
+        return rescanned
+
+
+def query(root: str | Path, extensions: List[str] | None = None, subject: str | None = None,
+          offset: int = 0, limit: int | None = None) -> Tuple[List[str], int]:
+    """
+    Fichiers indexés sous ``root`` (après rafraîchissement), triés par chemin.
+
+    Args:
+        extensions: suffixes acceptés (".gii", "csv"…), insensibles à la casse
+        subject: label BIDS (avec ou sans le préfixe "sub-")
+
+    Returns:
+        (chemins relatifs de la page demandée, nombre total de fichiers filtrés)
+    """
+    refresh(root)
+    root = str(Path(root).resolve())
+
+    where = ["root = ?"]
+    params: list = [root]
+    if extensions:
+        exts = [e.lower() if e.startswith(".") else f".{e.lower()}" for e in extensions]
+        where.append(f"ext IN ({','.join('?' * len(exts))})")
+        params += exts
+    if subject:
+        where.append("subject = ?")
+        params.append(subject.removeprefix("sub-"))
+    clause = " AND ".join(where)
+
+    with _connect() as conn:
+        total = conn.execute(f"SELECT COUNT(*) FROM files WHERE {clause}", params).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT path FROM files WHERE {clause} ORDER BY path LIMIT ? OFFSET ?",
+            (*params, -1 if limit is None else limit, offset),
+        ).fetchall()
+    return [str(PurePath(*r["path"].split("/"))) for r in rows], total
+
+
+def _start_watch(root: str) -> None:
+    state = {"dirty": False}
+
+    class _Handler(FileSystemEventHandler):
+        def on_any_event(self, event):
+            state["dirty"] = True
+
+    observer = Observer()
+    observer.schedule(_Handler(), root, recursive=True)
+    observer.daemon = True
+    observer.start()
+    _watches[root] = (observer, state)
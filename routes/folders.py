@@ -1,34 +1,107 @@
-from fastapi import APIRouter, Body, Request
+from fastapi import APIRouter, Body, Query, Request
 from fastapi.responses import JSONResponse
 from pathlib import Path
+from typing import List
 import os
+import shutil
 import uuid
-from tools.parser import load_mesh
+from tools.conversion_cache import file_digest
+
+try:
+    import fcntl
+except ImportError:          # Windows : ni reflink ni ioctl
+    fcntl = None
+
+from . import folder_index, upload_store
+from .executor import run_blocking
+from .http_cache import file_response
 
 router = APIRouter()
 
-UPLOAD_DIR = Path("uploads")
+UPLOAD_DIR = upload_store.UPLOAD_DIR
 UPLOAD_DIR.mkdir(exist_ok=True)
 
+# ioctl de clonage copy-on-write (btrfs, xfs…) ; absent de fcntl avant Python 3.12
+FICLONE = getattr(fcntl, "FICLONE", 0x40049409)
 
-@router.get("/select-folder")
-def select_folder():
-    folder = Path("data")  # Chemin de base configurable
-    if not folder.exists():
+DATA_DIR = Path("data")  # Chemin de base configurable
+
+# Extensions proposées par défaut par /list-folder-files
+ALLOWED_EXTENSIONS = [".gii", ".csv", ".npy"]
+
+
+# ---------------------------------------------------------------------------
+# Traitements bloquants (exécutés via run_blocking)
+# ---------------------------------------------------------------------------
+def _list_data_folder(extensions: list | None, subject: str | None,
+                      offset: int, limit: int | None) -> JSONResponse:
+    if not DATA_DIR.exists():
         return JSONResponse(status_code=404, content={"error": "Dossier non trouvé."})
 
-    files = [str(p.relative_to(folder)) for p in folder.rglob("*") if p.is_file()]
+    files, total = folder_index.query(DATA_DIR, extensions, subject, offset, limit)
+    return JSONResponse({
+        "path": str(DATA_DIR.resolve()),
+        "files": files,
+        "total": total,
+    })
+
+
+def _link_or_copy(src: Path, dst: Path) -> str:
+    """
+    Place ``src`` dans ``dst`` sans dupliquer les données si possible :
+    lien physique, sinon clone copy-on-write (reflink, Linux), sinon copie
+    par blocs. Renvoie la méthode utilisée.
+    """
+    try:
+        os.link(src, dst)
+        return "hardlink"
+    except OSError:
+        pass
+
+    if fcntl is not None:
+        try:
+            with open(src, "rb") as s, open(dst, "wb") as d:
+                fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+            return "reflink"
+        except OSError:
+            dst.unlink(missing_ok=True)
+
+    shutil.copyfile(src, dst)
+    return "copy"
+
+
+def _non_negative(value, default: int | None) -> int | None:
+    """Entier ≥ 0 (``default`` si absent) ; ValueError sinon."""
+    if value is None:
+        return default
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(f"entier attendu : {value!r}")
+    value = int(value)
+    if value < 0:
+        raise ValueError(f"entier positif attendu : {value}")
+    return value
+
+
+def _upload_info(entry: dict, deduplicated: bool) -> dict:
     return {
-        "path": str(folder.resolve()),
-        "files": files
+        "id": entry["id"],
+        "name": entry["name"],
+        "path": entry["path"],
+        "size": entry["size"],
+        "sha256": entry["sha256"],
+        "deduplicated": deduplicated,
     }
 
 
-@router.post("/import-meshes-from-folder")
-def import_meshes_from_folder(payload: dict = Body(...)):
-    folder_path = Path(payload.get("folder", ""))
-    filenames = payload.get("files", [])
-
+def _import_meshes(folder_path: Path, filenames: list, mode: str = "link") -> JSONResponse:
+    """
+    Importe les fichiers sans les relire : un contenu déjà importé (même
+    sha256, revalidé par ``find_by_hash``) renvoie l'entrée existante avec
+    une référence de plus ; sinon le fichier est lié dans ``uploads/`` (mode
+    "link") ou simplement indexé à son emplacement d'origine (mode
+    "register"). Seules les métadonnées sont renvoyées, la géométrie se
+    charge à la demande via /load-mesh-from-path.
+    """
     if not folder_path.exists():
         return JSONResponse(status_code=400, content={"error": "Dossier non valide."})
 
@@ -38,30 +111,53 @@ def import_meshes_from_folder(payload: dict = Body(...)):
         if not file_path.exists() or not file_path.is_file():
             continue
 
-        file_id = str(uuid.uuid4())
-        target_path = UPLOAD_DIR / f"{file_id}_{file_path.name}"
-
         try:
-            with open(file_path, "rb") as src, open(target_path, "wb") as dst:
-                dst.write(src.read())
+            existing = upload_store.find_by_hash(file_digest(file_path))
+            if existing is not None:
+                entry = upload_store.acquire(existing["id"])
+                if entry is not None:
+                    result.append(_upload_info(entry, deduplicated=True))
+                    continue
 
-            vertices, faces = load_mesh(str(target_path))
+            file_id = str(uuid.uuid4())
+            if mode == "register":
+                target_path, method = file_path, "register"
+            else:
+                target_path = UPLOAD_DIR / f"{file_id}_{file_path.name}"
+                method = _link_or_copy(file_path, target_path)
 
-            result.append({
-                "id": file_id,
-                "name": file_path.name,
-                "vertices": vertices,
-                "faces": faces,
-                "path": str(target_path)
+            entry = upload_store.register(file_id, target_path, file_path.name, {
+                "source": str(file_path.resolve()),
+                "mode": method,
             })
+            result.append(_upload_info(entry, deduplicated=False))
 
         except Exception as e:
-            print(f"Erreur lors du chargement de {filename} : {e}")
+            print(f"Erreur lors de l'import de {filename} : {e}")
             continue
 
     return JSONResponse(result)
 
 
+# ---------------------------------------------------------------------------
+# Routes
+# ---------------------------------------------------------------------------
+@router.get("/select-folder")
+async def select_folder(ext: List[str] = Query(None), subject: str | None = None,
+                        offset: int = Query(0, ge=0), limit: int | None = Query(None, ge=0)):
+    """Fichiers de DATA_DIR (index incrémental), filtrables et paginés."""
+    return await run_blocking(_list_data_folder, ext, subject, offset, limit)
+
+
+@router.post("/import-meshes-from-folder")
+async def import_meshes_from_folder(payload: dict = Body(...)):
+    folder_path = Path(payload.get("folder", ""))
+    filenames = payload.get("files", [])
+    mode = payload.get("mode", "link")
+
+    return await run_blocking(_import_meshes, folder_path, filenames, mode)
+
+
 @router.post("/list-folder-files")
 async def list_folder_files(request: Request):
     try:
@@ -71,25 +167,41 @@ async def list_folder_files(request: Request):
         if not folder_path or not os.path.isdir(folder_path):
             return JSONResponse(status_code=400, content={"error": "Chemin invalide ou dossier introuvable."})
 
-        all_files = []
-        ALLOWED_EXTENSIONS = {".gii", ".csv"}
-        for root, dirs, files in os.walk(folder_path):
-            for file in files:
-                if Path(file).suffix.lower() not in ALLOWED_EXTENSIONS:
-                    continue
-                relative_path = os.path.relpath(os.path.join(root, file), start=folder_path)
-                all_files.append(relative_path)
-
-        return {"files": all_files}
+        try:
+            offset = _non_negative(data.get("offset"), 0)
+            limit = _non_negative(data.get("limit"), None)
+        except ValueError as e:
+            return JSONResponse(status_code=400, content={"error": f"offset / limit invalide : {e}"})
+
+        files, total = await run_blocking(
+            folder_index.query,
+            folder_path,
+            data.get("extensions") or ALLOWED_EXTENSIONS,
+            data.get("subject"),
+            offset,
+            limit,
+        )
+
+        return {"files": files, "total": total}
 
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": f"Erreur serveur : {str(e)}"})
 
 
-@router.post("/read-file")
-async def read_file(payload: dict = Body(...)):
-    file_path = Path(payload.get("path", ""))
-    if not file_path.exists() or not file_path.is_file():
+@router.get("/read-file")
+def read_file(request: Request, path: str):
+    """
+    Contenu brut du fichier, lu par blocs. Supporte Range (lecture partielle)
+    et les requêtes conditionnelles (ETag / Last-Modified → 304).
+    """
+    file_path = Path(path)
+    if not file_path.is_file():
         return JSONResponse(status_code=400, content={"error": "Fichier introuvable"})
 
-    return file_path.read_bytes()
+    return file_response(request, file_path)
+
+
+@router.post("/read-file")
+def read_file_post(request: Request, payload: dict = Body(...)):
+    """Ancienne forme (chemin dans le corps JSON) : même réponse en streaming."""
+    return read_file(request, payload.get("path", ""))
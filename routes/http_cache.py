@@ -0,0 +1,222 @@
+"""Réponses compatibles cache HTTP.
+
+``file_response`` s'appuie sur ``FileResponse`` de Starlette (lecture par
+blocs, requêtes Range / If-Range, en-têtes ETag et Last-Modified) et y ajoute
+les requêtes conditionnelles If-None-Match / If-Modified-Since : un fichier
+inchangé est revalidé par un 304 sans corps.
+
+Pour les artefacts dérivés (maillage JSON, textures, manifestes) :
+  • ``cached_response`` pose un ETag fort calculé à partir du contenu des
+    fichiers sources et des paramètres, et répond 304 *avant* tout calcul
+  • ``ETagMiddleware`` pose un ETag fort (empreinte du corps) sur les autres
+    réponses GET qui n'en ont pas, et répond 304 si le client l'a déjà
+  • ``CachedStaticFiles`` sert les fichiers empreintés du build Vite
+    (``assets/<nom>-<hash>.js``) avec un cache d'un an, sans revalidation
+"""
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Callable, Iterable
+import hashlib
+import mimetypes
+import os
+
+from fastapi import Request
+from fastapi.responses import FileResponse, Response
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from tools.conversion_cache import file_digest
+
+from .executor import run_blocking
+
+# Le navigateur garde le fichier mais le revalide à chaque usage (ETag)
+CACHE_CONTROL = "no-cache"
+
+# Fichiers dont le nom contient l'empreinte du contenu : jamais revalidés
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+IMMUTABLE_PREFIXES = ("assets/",)
+
+# Suffixes ajoutés à l'ETag par routes.compression selon l'encodage
+_ENCODING_SUFFIXES = ('-gzip"', '-br"')
+
+
+def file_etag(stat: os.stat_result) -> str:
+    """ETag calculé comme celui de FileResponse (mtime + taille)."""
+    base = f"{stat.st_mtime}-{stat.st_size}"
+    return f'"{hashlib.md5(base.encode(), usedforsecurity=False).hexdigest()}"'
+
+
+def _strip_encoding(etag: str) -> str:
+    for suffix in _ENCODING_SUFFIXES:
+        if etag.endswith(suffix):
+            return etag[:-len(suffix)] + '"'
+    return etag
+
+
+def content_etag(*parts) -> str:
+    """ETag fort : empreinte de ``parts`` (octets ou valeurs converties en texte)."""
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else str(part).encode())
+        h.update(b"\0")
+    return f'"{h.hexdigest()}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Vrai si l'en-tête If-None-Match désigne ``etag`` (comparaison faible, encodage ignoré)."""
+    if not if_none_match:
+        return False
+    tags = {_strip_encoding(t.strip().removeprefix("W/")) for t in if_none_match.split(",")}
+    return "*" in tags or etag in tags
+
+
+def is_not_modified(request: Request, etag: str, mtime: float) -> bool:
+    """Vrai si les en-têtes conditionnels de ``request`` désignent la version courante."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def file_response(request: Request, path: str | Path,
+                  media_type: str | None = None, etag: str | None = None) -> Response:
+    """
+    Réponse en streaming de ``path`` (Range, ETag, Last-Modified, 304).
+
+    Args:
+        etag: ETag à utiliser à la place de celui dérivé de (mtime, taille)
+    """
+    path = Path(path)
+    stat = path.stat()
+    etag = etag or file_etag(stat)
+    headers = {
+        "etag": etag,
+        "last-modified": formatdate(stat.st_mtime, usegmt=True),
+        "cache-control": CACHE_CONTROL,
+    }
+
+    if request.method in ("GET", "HEAD") and is_not_modified(request, etag, stat.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    media_type = media_type or mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    return FileResponse(path, media_type=media_type, headers=headers, stat_result=stat)
+
+
+def artifact_validator(sources: Iterable[str | Path], params: tuple) -> tuple | None:
+    """
+    (ETag fort, mtime) d'un artefact dérivé de ``sources`` : sha256 de chaque
+    source (mémorisé par ``file_digest``) combiné à ``params``. None si une
+    source est illisible.
+    """
+    sources = [s for s in sources if s]
+    try:
+        etag = content_etag(*(file_digest(s) for s in sources), *params)
+        mtime = max((os.stat(s).st_mtime for s in sources), default=0)
+    except OSError:
+        return None
+    return etag, mtime
+
+
+async def cached_response(request: Request, sources: Iterable[str | Path], params: tuple,
+                          build: Callable[..., Response], *args) -> Response:
+    """
+    Réponse ``build(*args)`` revalidable, pour un artefact dérivé de ``sources``.
+
+    Le hachage des sources et ``build`` passent par ``run_blocking`` avec des
+    arguments picklables (compatible CORTEXVISU_EXECUTOR=process) ; les
+    en-têtes conditionnels sont évalués sur la boucle d'événements. Un client
+    qui possède déjà l'artefact reçoit un 304 sans que ``build`` soit appelé.
+    Si une source est illisible, ``build`` est appelé tel quel (il produit l'erreur).
+    """
+    validator = await run_blocking(artifact_validator, list(sources), tuple(params))
+    if validator is None:
+        return await run_blocking(build, *args)
+
+    etag, mtime = validator
+    headers = {"etag": etag, "cache-control": CACHE_CONTROL}
+    if request.method in ("GET", "HEAD") and is_not_modified(request, etag, mtime):
+        return Response(status_code=304, headers=headers)
+    response = await run_blocking(build, *args)
+    if response.status_code == 200:
+        response.headers.update(headers)
+    return response
+
+
+class ETagMiddleware:
+    """
+    ETag fort (empreinte du corps) sur les réponses 200 aux GET / HEAD qui
+    n'en ont pas, et 304 si la requête présente cet ETag. Les réponses en
+    streaming (plusieurs messages de corps : fichiers, SSE) passent telles quelles.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+
+        if_none_match = Headers(scope=scope).get("if-none-match")
+        start: Message | None = None
+        passthrough = False
+
+        async def send_with_etag(message: Message) -> None:
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                if message["status"] != 200 or "etag" in Headers(raw=message["headers"]):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start = message
+                return
+            if message["type"] != "http.response.body" or message.get("more_body", False):
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+
+            # corps complet en un message : l'empreinte ne coûte qu'un hachage
+            headers = MutableHeaders(raw=start["headers"])
+            etag = content_etag(message.get("body", b""))
+            headers["etag"] = etag
+            headers.setdefault("cache-control", CACHE_CONTROL)
+            if etag_matches(if_none_match, etag):
+                await send({"type": "http.response.start", "status": 304,
+                            "headers": [(k, v) for k, v in start["headers"]
+                                        if k not in (b"content-length", b"content-type")]})
+                await send({"type": "http.response.body", "body": b""})
+            else:
+                await send(start)
+                await send(message)
+
+        await self.app(scope, receive, send_with_etag)
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles : cache long pour les fichiers empreintés, revalidation pour les autres."""
+
+    def is_not_modified(self, response_headers: Headers, request_headers: Headers) -> bool:
+        # ETag renvoyé par le client éventuellement suffixé par routes.compression
+        if request_headers.get("if-none-match"):
+            return etag_matches(request_headers["if-none-match"], response_headers["etag"])
+        return super().is_not_modified(response_headers, request_headers)
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        path = self.get_path(scope).replace(os.sep, "/")
+        response.headers["cache-control"] = (
+            IMMUTABLE_CACHE_CONTROL if path.startswith(IMMUTABLE_PREFIXES) else CACHE_CONTROL
+        )
+        return response
@@ -3,6 +3,9 @@
 Expose deux endpoints :
   • POST /import-package/          → liste les fonctions + métadonnées YAML
   • POST /run-function-batch/      → exécute une fonction sur ≥1 meshes
+  • GET  /jobs/{job_id}            → état persistant du job (SQLite)
+  • POST /jobs/{job_id}/cancel     → annule les sujets non terminés
+  • POST /jobs/{job_id}/retry      → relance les sujets en échec / annulés
 
 `run-function` (ancienne route mono‑mesh) a été retirée : le front appelle
 maintenant uniquement /run-function-batch/.
@@ -11,22 +14,14 @@ from fastapi import APIRouter, HTTPException
 from fastapi.responses import JSONResponse
 from typing import Dict, Any, List
 from pydantic import BaseModel
-from pathlib import Path
 import importlib
 import re
 from inspect import signature, Parameter
-import yaml
-from fastapi import BackgroundTasks
-
-from .config_loader import load_config_yaml  # utilitaire de lecture YAML
-
 import uuid
-import time
-from threading import Lock
 
-# Dictionnaire pour stocker la progression des jobs
-progress_registry = {}
-progress_lock = Lock()
+from .config_loader import load_config_yaml  # utilitaire de lecture YAML
+from . import job_store, package_runner
+from .package_runner import start_job
 
 router = APIRouter()
 
@@ -147,97 +142,21 @@ def import_package(payload: PackageRequest):
 
 
 @router.post("/run-function-batch/")
-def run_function_batch(req: RunBatchRequest, background_tasks: BackgroundTasks):
+def run_function_batch(req: RunBatchRequest):
     """
-    Lance le traitement en tâche de fond et retourne immédiatement un job_id.
-    Le polling côté client peut commencer sans attendre la fin du traitement.
+    Enregistre le job (SQLite) et répartit les sujets sur le pool de workers ;
+    retourne immédiatement un job_id. Le polling côté client peut commencer
+    sans attendre la fin du traitement.
     """
     if req.name not in imported_functions:
         raise HTTPException(404, f"Fonction '{req.name}' inconnue.")
 
-    func = imported_functions[req.name]["function"]
     yaml_key = _yaml_key_for(req.name)
-    base_cfg_yaml = package_config.get(yaml_key, {})
+    step_cfg = package_config.get(yaml_key, {}).copy()
+    step_cfg.update(req.args_user)                # UI > YAML
 
     job_id = str(uuid.uuid4())
-    start_time = time.time()
-
-    # Préparer la structure de suivi
-    with progress_lock:
-        progress_registry[job_id] = {
-            "progress": 0,
-            "logs": [],
-            "eta": "?",
-            "elapsed": "0 s",
-            "start": start_time,
-            "total": len(req.mesh_paths)
-        }
-
-    # Le vrai traitement à exécuter plus tard
-    def do_work():
-        total = len(req.mesh_paths)
-        results = []
-
-        def log(msg: str):
-            with progress_lock:
-                progress_registry[job_id]["logs"].append(msg)
-
-        for idx, mesh_path in enumerate(req.mesh_paths, start=1):
-            mesh_path = Path(mesh_path)
-            subject_dir = mesh_path.parent.parent
-            out_dir = Path("public") / subject_dir.name / "cortexanalyzer"
-            out_dir.mkdir(parents=True, exist_ok=True)
-
-            step_cfg = base_cfg_yaml.copy()
-            step_cfg.update(req.args_user)
-            cfg_dict = {yaml_key: step_cfg}
-
-            cfg_file = out_dir / "config_generated.yaml"
-            with cfg_file.open("w") as f:
-                yaml.safe_dump(cfg_dict, f)
-
-            try:
-                log(f"[{subject_dir.name}] Début exécution sur {mesh_path.name}")
-
-                def progress_callback(p: float, msg: str = ""):
-                    done_frac = (idx - 1 + p) / total
-                    elapsed = time.time() - start_time
-                    eta = (elapsed / done_frac) * (1 - done_frac) if done_frac > 0 else 0
-                    with progress_lock:
-                        progress_registry[job_id]["progress"] = int(done_frac * 100)
-                        progress_registry[job_id]["eta"] = f"{int(eta)} s"
-                        progress_registry[job_id]["elapsed"] = f"{int(elapsed)} s"
-                        if msg:
-                            progress_registry[job_id]["logs"].append(msg)
-
-                result = func(
-                    str(subject_dir),
-                    str(out_dir),
-                    cfg_dict,
-                    progress_callback=progress_callback
-                )
-
-                log(f"[{subject_dir.name}] Terminé")
-
-            except Exception as e:
-                log(f"[{subject_dir.name}] Erreur: {str(e)}")
-
-            results.append({
-                "subject": subject_dir.name,
-                "mesh": mesh_path.name,
-                "config": str(cfg_file),
-                "output": str(out_dir),
-                "result": result,
-            })
-
-        # Marquer comme terminé
-        with progress_lock:
-            progress_registry[job_id]["progress"] = 100
-            progress_registry[job_id]["eta"] = "0 s"
-            progress_registry[job_id]["elapsed"] = f"{int(time.time() - start_time)} s"
-
-    # Ajouter la tâche au background
-    background_tasks.add_task(do_work)
+    start_job(job_id, current_package, req.name, yaml_key, step_cfg, req.mesh_paths)
 
     return JSONResponse(content={
         "status": "started",
@@ -245,14 +164,25 @@ def run_function_batch(req: RunBatchRequest, background_tasks: BackgroundTasks):
     })
 
 
-@router.get("/progress/{job_id}")
-def get_progress(job_id: str):
-    with progress_lock:
-        if job_id not in progress_registry:
-            raise HTTPException(404, "Job ID inconnu")
-        return {
-            "progress": progress_registry[job_id]["progress"],
-            "eta": progress_registry[job_id]["eta"],
-            "elapsed": progress_registry[job_id]["elapsed"],
-            "logs": progress_registry[job_id]["logs"][-50:]  # ou tout si nécessaire # derniers logs
-        }
\ No newline at end of file
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """État persistant d'un job : statut, configuration et sujets."""
+    job = job_store.get_job(job_id)
+    if job is None:
+        raise HTTPException(404, "Job ID inconnu")
+    return job
+
+
+@router.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: str):
+    if job_store.get_job(job_id) is None:
+        raise HTTPException(404, "Job ID inconnu")
+    return {"status": "cancelling", "cancelled": package_runner.cancel_job(job_id)}
+
+
+@router.post("/jobs/{job_id}/retry")
+def retry_job(job_id: str):
+    """Relance les sujets en échec ou annulés du job."""
+    if job_store.get_job(job_id) is None:
+        raise HTTPException(404, "Job ID inconnu")
+    return {"status": "started", "retried": package_runner.retry_job(job_id)}
@@ -0,0 +1,165 @@
+"""Stockage persistant (SQLite) des jobs de /run-function-batch/.
+
+Un job = une fonction de package appliquée à N sujets. L'état de chaque sujet
+(pending, running, done, failed, cancelled) est écrit à chaque transition :
+après un redémarrage du serveur, les sujets non terminés sont relancés.
+
+Chaque opération ouvre sa propre connexion : le module est utilisable depuis
+les threads du serveur comme depuis les processus workers.
+"""
+from pathlib import Path
+from typing import Any, Dict, List
+import json
+import os
+import time
+
+from .sqlite_store import connect
+
+JOB_DB = Path(os.environ.get("CORTEXVISU_JOB_DB", "cache/jobs.sqlite"))
+
+# Statuts des sujets
+PENDING, RUNNING, DONE, FAILED, CANCELLED = "pending", "running", "done", "failed", "cancelled"
+FINAL = (DONE, FAILED, CANCELLED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id        TEXT PRIMARY KEY,
+    package   TEXT NOT NULL,
+    function  TEXT NOT NULL,
+    yaml_key  TEXT,
+    config    TEXT NOT NULL,
+    status    TEXT NOT NULL,
+    created   REAL NOT NULL,
+    finished  REAL
+);
+CREATE TABLE IF NOT EXISTS subjects (
+    job_id    TEXT NOT NULL REFERENCES jobs(id),
+    idx       INTEGER NOT NULL,
+    mesh_path TEXT NOT NULL,
+    status    TEXT NOT NULL,
+    attempts  INTEGER NOT NULL DEFAULT 0,
+    error     TEXT,
+    result    TEXT,
+    PRIMARY KEY (job_id, idx)
+);
+"""
+
+
+def _connect():
+    return connect(JOB_DB, _SCHEMA)
+
+
+def create_job(job_id: str, package: str, function: str, yaml_key: str | None,
+               config: Dict[str, Any], mesh_paths: List[str]) -> None:
+    with _connect() as conn:
+        conn.execute(
+            "INSERT INTO jobs (id, package, function, yaml_key, config, status, created) "
+            "VALUES (?, ?, ?, ?, ?, 'running', ?)",
+            (job_id, package, function, yaml_key, json.dumps(config), time.time()),
+        )
+        conn.executemany(
+            "INSERT INTO subjects (job_id, idx, mesh_path, status) VALUES (?, ?, ?, ?)",
+            [(job_id, i, p, PENDING) for i, p in enumerate(mesh_paths)],
+        )
+
+
+def get_job(job_id: str) -> Dict[str, Any] | None:
+    """Job et ses sujets, ou None s'il est inconnu."""
+    with _connect() as conn:
+        job = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if job is None:
+            return None
+        subjects = conn.execute(
+            "SELECT * FROM subjects WHERE job_id = ? ORDER BY idx", (job_id,)
+        ).fetchall()
+    job = dict(job)
+    job["config"] = json.loads(job["config"])
+    job["subjects"] = [
+        {**dict(s), "result": json.loads(s["result"]) if s["result"] else None}
+        for s in subjects
+    ]
+    return job
+
+
+def unfinished_jobs() -> List[str]:
+    with _connect() as conn:
+        rows = conn.execute("SELECT id FROM jobs WHERE status = 'running'").fetchall()
+    return [r["id"] for r in rows]
+
+
+def subject_status(job_id: str, idx: int) -> str | None:
+    with _connect() as conn:
+        row = conn.execute(
+            "SELECT status FROM subjects WHERE job_id = ? AND idx = ?", (job_id, idx)
+        ).fetchone()
+    return row["status"] if row else None
+
+
+def mark_running(job_id: str, idx: int) -> bool:
+    """Passe un sujet de pending à running ; False s'il a été annulé entre-temps."""
+    with _connect() as conn:
+        cur = conn.execute(
+            "UPDATE subjects SET status = ?, attempts = attempts + 1 "
+            "WHERE job_id = ? AND idx = ? AND status = ?",
+            (RUNNING, job_id, idx, PENDING),
+        )
+    return cur.rowcount == 1
+
+
+def mark_finished(job_id: str, idx: int, status: str,
+                  result: Any = None, error: str | None = None) -> None:
+    with _connect() as conn:
+        conn.execute(
+            "UPDATE subjects SET status = ?, result = ?, error = ? "
+            "WHERE job_id = ? AND idx = ?",
+            (status, json.dumps(result) if result is not None else None, error,
+             job_id, idx),
+        )
+
+
+def reset_subjects(job_id: str, statuses: tuple, exclude=()) -> List[int]:
+    """
+    Remet en pending les sujets dans ``statuses`` (sauf les indices
+    ``exclude``) ; renvoie leurs indices.
+    """
+    marks = ",".join("?" * len(statuses))
+    with _connect() as conn:
+        rows = [r for r in conn.execute(
+            f"SELECT idx FROM subjects WHERE job_id = ? AND status IN ({marks})",
+            (job_id, *statuses),
+        ).fetchall() if r["idx"] not in exclude]
+        conn.executemany(
+            "UPDATE subjects SET status = ?, error = NULL WHERE job_id = ? AND idx = ?",
+            [(PENDING, job_id, r["idx"]) for r in rows],
+        )
+        if rows:
+            conn.execute(
+                "UPDATE jobs SET status = 'running', finished = NULL WHERE id = ?", (job_id,)
+            )
+    return [r["idx"] for r in rows]
+
+
+def cancel_subjects(job_id: str) -> int:
+    """Annule les sujets non terminés ; renvoie leur nombre."""
+    with _connect() as conn:
+        cur = conn.execute(
+            "UPDATE subjects SET status = ? WHERE job_id = ? AND status IN (?, ?)",
+            (CANCELLED, job_id, PENDING, RUNNING),
+        )
+    return cur.rowcount
+
+
+def finish_job_if_complete(job_id: str) -> bool:
+    """Clôt le job si tous ses sujets sont terminés ; True si c'est le cas."""
+    with _connect() as conn:
+        left = conn.execute(
+            "SELECT COUNT(*) FROM subjects WHERE job_id = ? AND status IN (?, ?)",
+            (job_id, PENDING, RUNNING),
+        ).fetchone()[0]
+        if left:
+            return False
+        conn.execute(
+            "UPDATE jobs SET status = 'done', finished = ? WHERE id = ? AND status = 'running'",
+            (time.time(), job_id),
+        )
+    return True
@@ -0,0 +1,322 @@
+"""Suivi des jobs de fond : registre de progression partagé et pool de processus.
+
+Tous les traitements longs (conversions batch, fonctions de package) créent un
+job ici et rapportent leur avancement dans ``progress_registry`` ; le client
+suit n'importe quel job via GET /progress/{job_id}.
+
+Le registre reste borné : chaque job ne garde en mémoire que ses
+``LOG_RING_SIZE`` dernières lignes de log (le journal complet peut être écrit
+dans ``JOB_LOG_DIR``), et les jobs terminés sont évincés après ``JOB_TTL``
+secondes ou au-delà de ``MAX_FINISHED_JOBS`` (les moins récemment consultés).
+"""
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import FileResponse, StreamingResponse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from threading import Lock
+from typing import Any, Callable, Dict, List, Tuple
+import asyncio
+import json
+import multiprocessing
+import os
+import time
+import uuid
+
+# Nombre de processus de conversion (par défaut : un par cœur)
+MAX_WORKERS = int(os.environ.get("CORTEXVISU_WORKERS", os.cpu_count() or 1))
+
+# Dictionnaire pour stocker la progression des jobs
+progress_registry: Dict[str, Dict[str, Any]] = {}
+progress_lock = Lock()
+# Sérialise les écritures du journal disque (jamais tenu avec progress_lock)
+_log_file_lock = Lock()
+
+# Bornes du registre
+LOG_RING_SIZE = int(os.environ.get("CORTEXVISU_JOB_LOG_LINES", 500))
+JOB_TTL = float(os.environ.get("CORTEXVISU_JOB_TTL", 3600))
+MAX_FINISHED_JOBS = int(os.environ.get("CORTEXVISU_MAX_FINISHED_JOBS", 200))
+
+# Si défini, le journal complet de chaque job est écrit dans <JOB_LOG_DIR>/<job_id>.log
+_log_dir = os.environ.get("CORTEXVISU_JOB_LOG_DIR")
+JOB_LOG_DIR = Path(_log_dir) if _log_dir else None
+
+# Flux SSE : intervalle minimal entre deux événements, et keep-alive (s)
+SSE_MIN_INTERVAL = float(os.environ.get("CORTEXVISU_SSE_INTERVAL", 0.25))
+SSE_HEARTBEAT = 15.0
+
+# Abonnés SSE par job : (boucle asyncio, événement à réveiller)
+_listeners: Dict[str, set] = {}
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = Lock()
+
+router = APIRouter()
+
+
+# ---------------------------------------------------------------------------
+# Registre de progression
+# ---------------------------------------------------------------------------
+def create_job(total: int, job_id: str | None = None) -> str:
+    """Enregistre un nouveau job (ou ré-enregistre ``job_id``) et renvoie son identifiant."""
+    job_id = job_id or str(uuid.uuid4())
+    now = time.time()
+    with progress_lock:
+        _evict_finished(now)
+        progress_registry[job_id] = {
+            "status": "running",
+            "progress": 0,
+            "logs": deque(maxlen=LOG_RING_SIZE),
+            "log_seq": 0,                 # nombre total de lignes émises
+            "eta": "?",
+            "elapsed": "0 s",
+            "start": now,
+            "accessed": now,
+            "finished": None,
+            "total": total,
+            "results": None,
+        }
+    return job_id
+
+
+def _evict_finished(now: float) -> None:
+    """Retire les jobs terminés expirés ou en surnombre (appelé sous progress_lock)."""
+    finished = sorted(
+        (job["accessed"], job_id)
+        for job_id, job in progress_registry.items()
+        if job["finished"] is not None
+    )
+    excess = len(finished) - MAX_FINISHED_JOBS
+    for i, (accessed, job_id) in enumerate(finished):
+        if i < excess or now - accessed > JOB_TTL:
+            del progress_registry[job_id]
+
+
+def _append_log(job: Dict[str, Any], msg: str) -> None:
+    """Ajoute une ligne au ring buffer du job (sous progress_lock)."""
+    job["logs"].append(msg)
+    job["log_seq"] += 1
+
+
+def _write_log_file(job_id: str, msg: str) -> None:
+    """Ajoute ``msg`` au journal disque du job si activé (hors progress_lock)."""
+    if JOB_LOG_DIR is None:
+        return
+    with _log_file_lock:
+        JOB_LOG_DIR.mkdir(parents=True, exist_ok=True)
+        with open(JOB_LOG_DIR / f"{job_id}.log", "a", encoding="utf-8") as f:
+            f.write(msg + "\n")
+
+
+def _notify(job_id: str) -> None:
+    """Réveille les flux SSE abonnés à ``job_id`` (appelable depuis tout thread)."""
+    with progress_lock:
+        listeners = list(_listeners.get(job_id, ()))
+    for loop, event in listeners:
+        loop.call_soon_threadsafe(event.set)
+
+
+def job_log(job_id: str, msg: str) -> None:
+    with progress_lock:
+        _append_log(progress_registry[job_id], msg)
+    _write_log_file(job_id, msg)
+    _notify(job_id)
+
+
+def set_progress(job_id: str, done_frac: float, msg: str = "") -> None:
+    """Met à jour progression, temps écoulé et ETA (``done_frac`` ∈ [0, 1])."""
+    with progress_lock:
+        job = progress_registry[job_id]
+        elapsed = time.time() - job["start"]
+        eta = (elapsed / done_frac) * (1 - done_frac) if done_frac > 0 else 0
+        job["progress"] = int(done_frac * 100)
+        job["eta"] = f"{int(eta)} s"
+        job["elapsed"] = f"{int(elapsed)} s"
+        if msg:
+            _append_log(job, msg)
+    if msg:
+        _write_log_file(job_id, msg)
+    _notify(job_id)
+
+
+def finish_job(job_id: str, results: Any = None, status: str = "done") -> None:
+    """Marque le job comme terminé et y attache ses résultats."""
+    with progress_lock:
+        job = progress_registry[job_id]
+        job["status"] = status
+        job["progress"] = 100
+        job["eta"] = "0 s"
+        job["elapsed"] = f"{int(time.time() - job['start'])} s"
+        job["results"] = results
+        job["finished"] = job["accessed"] = time.time()
+        _evict_finished(job["finished"])
+    _notify(job_id)
+
+
+def run_job(job_id: str, work: Callable, *args) -> None:
+    """
+    Exécute ``work(job_id, *args)`` (tâche de fond) ; une exception non gérée
+    termine le job avec le statut "failed" au lieu de le laisser en cours.
+    """
+    try:
+        work(job_id, *args)
+    except Exception as e:
+        job_log(job_id, f"Erreur: {e}")
+        finish_job(job_id, {"error": str(e)}, status="failed")
+
+
+# ---------------------------------------------------------------------------
+# Pool de processus borné
+# ---------------------------------------------------------------------------
+def get_process_pool() -> ProcessPoolExecutor:
+    """Pool de processus partagé, créé au premier usage (contexte spawn)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=MAX_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def run_in_pool(job_id: str,
+                tasks: List[Tuple[Any, Callable, tuple]],
+                done: int = 0) -> Tuple[Dict[Any, Any], Dict[Any, str]]:
+    """
+    Exécute ``tasks`` (clé, fonction, arguments) sur le pool de processus.
+
+    La progression du job avance à chaque tâche terminée ; ``done`` est le
+    nombre d'étapes déjà comptées dans ``total`` avant cet appel. Un échec
+    n'interrompt pas le batch : il est journalisé et renvoyé dans ``errors``.
+
+    Returns:
+        (results, errors): résultats par clé, messages d'erreur par clé
+    """
+    with progress_lock:
+        total = progress_registry[job_id]["total"] or 1
+
+    pool = get_process_pool()
+    futures = {pool.submit(func, *args): key for key, func, args in tasks}
+
+    results: Dict[Any, Any] = {}
+    errors: Dict[Any, str] = {}
+    for fut in as_completed(futures):
+        key = futures[fut]
+        done += 1
+        try:
+            results[key] = fut.result()
+            set_progress(job_id, done / total)
+        except Exception as e:
+            errors[key] = str(e)
+            set_progress(job_id, done / total, f"[{key}] Erreur: {e}")
+
+    return results, errors
+
+
+# ---------------------------------------------------------------------------
+# Routes
+# ---------------------------------------------------------------------------
+@router.get("/progress/{job_id}")
+def get_progress(job_id: str):
+    with progress_lock:
+        if job_id not in progress_registry:
+            raise HTTPException(404, "Job ID inconnu")
+        job = progress_registry[job_id]
+        job["accessed"] = time.time()
+        return {
+            "status": job["status"],
+            "progress": job["progress"],
+            "eta": job["eta"],
+            "elapsed": job["elapsed"],
+            "logs": list(job["logs"])[-50:],  # derniers logs
+            "results": job["results"],
+        }
+
+
+async def _progress_events(job_id: str, last_seq: int | None = None):
+    """
+    Générateur SSE : un événement "progress" à chaque changement du job
+    (au plus un toutes les SSE_MIN_INTERVAL s), ne contenant que les nouvelles
+    lignes de log, puis un événement "done" final.
+
+    Chaque événement porte ``id: <log_seq>`` : après une coupure, EventSource
+    se reconnecte avec Last-Event-ID (``last_seq``) et ne reçoit que les lignes
+    manquantes. Un job inconnu ou évincé termine le flux par un événement
+    "done" de statut "expired".
+    """
+    event = asyncio.Event()
+    listener = (asyncio.get_running_loop(), event)
+    with progress_lock:
+        _listeners.setdefault(job_id, set()).add(listener)
+
+    sent_seq = last_seq
+    try:
+        while True:
+            event.clear()
+            with progress_lock:
+                job = progress_registry.get(job_id)
+                if job is not None:
+                    job["accessed"] = time.time()
+                    if sent_seq is None:
+                        sent_seq = max(0, job["log_seq"] - 50)
+                    # lignes émises depuis le dernier événement (bornées par le ring buffer)
+                    new = max(0, min(job["log_seq"] - sent_seq, len(job["logs"])))
+                    logs = list(job["logs"])[len(job["logs"]) - new:]
+                    sent_seq = job["log_seq"]
+                    payload = {
+                        "status": job["status"],
+                        "progress": job["progress"],
+                        "eta": job["eta"],
+                        "elapsed": job["elapsed"],
+                        "logs": logs,
+                    }
+                    finished = job["status"] != "running"
+                    if finished:
+                        payload["results"] = job["results"]
+
+            if job is None:                         # inconnu ou évincé entre-temps
+                payload = {"status": "expired", "progress": 0, "eta": "?", "elapsed": "?",
+                           "logs": [], "results": None}
+                yield f"event: done\ndata: {json.dumps(payload)}\n\n"
+                return
+
+            kind = "done" if finished else "progress"
+            yield f"id: {sent_seq}\nevent: {kind}\ndata: {json.dumps(payload)}\n\n"
+            if finished:
+                return
+
+            await asyncio.sleep(SSE_MIN_INTERVAL)   # regroupe les mises à jour rapprochées
+            while not event.is_set():
+                try:
+                    await asyncio.wait_for(event.wait(), SSE_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+    finally:
+        with progress_lock:
+            _listeners.get(job_id, set()).discard(listener)
+            if not _listeners.get(job_id):
+                _listeners.pop(job_id, None)
+
+
+@router.get("/progress/{job_id}/stream")
+def stream_progress(job_id: str, last_event_id: str | None = Header(None)):
+    """Flux Server-Sent Events de la progression (remplace le polling)."""
+    with progress_lock:
+        if job_id not in progress_registry:
+            raise HTTPException(404, "Job ID inconnu")
+    last_seq = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+    return StreamingResponse(
+        _progress_events(job_id, last_seq),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/progress/{job_id}/logs")
+def get_full_logs(job_id: str):
+    """Journal complet d'un job (uniquement si CORTEXVISU_JOB_LOG_DIR est défini)."""
+    log_file = JOB_LOG_DIR / f"{job_id}.log" if JOB_LOG_DIR is not None else None
+    if log_file is None or not log_file.exists():
+        raise HTTPException(404, "Journal indisponible")
+    return FileResponse(log_file, media_type="text/plain; charset=utf-8")
@@ -1,17 +1,22 @@
-from fastapi import APIRouter, Body, Form
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, BackgroundTasks, Body, Form, Query, Request
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel
 from pathlib import Path
-from typing import List
+from typing import List, Literal
+import json
 
 
-from tools.parser import load_mesh, load_scalar_data
-from tools.mesh_to_threejs_json import generate_threejs_json
+from tools.parser import load_mesh_arrays
+from tools.mesh_compression import generate_compressed_mesh
+from tools.mesh_lod import LOD_LEVELS, get_lod
+from tools.mesh_to_threejs_json import generate_threejs_json, invalidate_threejs_json
 
-router = APIRouter()
+from . import upload_store
+from .executor import run_blocking
+from .http_cache import cached_response
+from .jobs import create_job, finish_job, run_in_pool, run_job
 
-UPLOAD_DIR = Path("uploads")
-UPLOAD_DIR.mkdir(exist_ok=True)
+router = APIRouter()
 
 MESH_OUTPUT = Path("public/meshes")
 MESH_OUTPUT.mkdir(parents=True, exist_ok=True)
@@ -22,37 +27,170 @@ ASSOCIATIONS_FILE = TEXTURE_OUTPUT / "associations.json"
 
 class MeshPathRequest(BaseModel):
     path: str
+    # "json" : listes imbriquées (anciens clients)
+    # "binary" : float32 / uint32 bruts, description dans l'en-tête X-Mesh-Layout
+    # "compressed" : format CVMZ (positions 16 bits, indices delta + gzip)
+    format: Literal["json", "binary", "compressed"] = "json"
+
+
+class MeshLODRequest(BaseModel):
+    path: str
+    level: float = LOD_LEVELS[0]   # fraction de sommets conservée (une de LOD_LEVELS)
+    format: Literal["json", "binary"] = "binary"
+    mapping: bool = False           # joint le mapping sommet d'origine → sommet du niveau
+
+
+def binary_mesh_response(vertices, faces, mapping=None, lod=None) -> Response:
+    """
+    Réponse binaire : vertices (float32 LE) puis faces (uint32 LE), concaténés,
+    suivis éventuellement du mapping LOD (uint32 LE).
+    L'en-tête X-Mesh-Layout (JSON) donne shape, dtype et offset de chaque bloc
+    pour que le client crée ses TypedArray directement sur le buffer reçu.
+    """
+    # int32 → uint32 : simple réinterprétation (indices toujours positifs)
+    blocks = [vertices.astype("<f4", copy=False).tobytes(),
+              faces.astype("<i4", copy=False).view("<u4").tobytes()]
+    layout = {
+        "vertices": {"shape": list(vertices.shape), "dtype": "float32", "offset": 0},
+        "faces": {"shape": list(faces.shape), "dtype": "uint32", "offset": len(blocks[0])},
+        "byteorder": "little",
+    }
+    if mapping is not None:
+        layout["mapping"] = {"shape": list(mapping.shape), "dtype": "uint32",
+                             "offset": len(blocks[0]) + len(blocks[1])}
+        blocks.append(mapping.astype("<i4", copy=False).view("<u4").tobytes())
+    if lod is not None:
+        layout["lod"] = lod
+    return Response(
+        content=b"".join(blocks),
+        media_type="application/octet-stream",
+        headers={"X-Mesh-Layout": json.dumps(layout)},
+    )
+
+
+def _load_mesh_response(path: str, fmt: str) -> Response:
+    try:
+        if fmt == "compressed":
+            artifact = generate_compressed_mesh(Path(path), MESH_OUTPUT)
+            return Response(content=artifact.read_bytes(),
+                            media_type="application/vnd.cortexvisu.cvmz")
+
+        vertices, faces = load_mesh_arrays(path)
+        if fmt == "binary":
+            return binary_mesh_response(vertices, faces)
+
+        return JSONResponse({"vertices": vertices.tolist(), "faces": faces.tolist()})
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
 
 
 @router.post("/load-mesh-from-path")
-def load_mesh_from_path(req: MeshPathRequest):
-    path = req.path
+async def load_mesh_from_path(req: MeshPathRequest):
+    return await run_blocking(_load_mesh_response, req.path, req.format)
+
+
+@router.get("/load-mesh-from-path")
+async def get_mesh_from_path(request: Request, path: str = Query(...),
+                             format: Literal["json", "binary", "compressed"] = "json"):
+    """Variante GET : revalidée par le navigateur (ETag du maillage source, 304)."""
+    return await cached_response(request, [path], ("mesh", format),
+                                 _load_mesh_response, path, format)
+
+
+def _load_lod_response(path: str, level: float, fmt: str, with_mapping: bool) -> Response:
+    if level not in LOD_LEVELS:
+        return JSONResponse({"error": f"Niveau inconnu : {level} (disponibles : {list(LOD_LEVELS)})"},
+                            status_code=400)
     try:
-        vertices, faces = load_mesh(path)
-        return JSONResponse({"vertices": vertices, "faces": faces})
+        lod = get_lod(path, level)
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=400)
 
+    info = {"level": level, "levels": list(LOD_LEVELS), "n_vertices_full": len(lod["mapping"])}
+    mapping = lod["mapping"] if with_mapping else None
+    if fmt == "binary":
+        return binary_mesh_response(lod["vertices"], lod["faces"], mapping, info)
 
-@router.post("/upload-mesh")
-async def upload_mesh(payload: dict = Body(...)):
-    results = []
-    mesh_paths = payload.get("mesh_paths", [])
+    body = {"vertices": lod["vertices"].tolist(), "faces": lod["faces"].tolist(), "lod": info}
+    if mapping is not None:
+        body["mapping"] = mapping.tolist()
+    return JSONResponse(body)
+
+
+@router.post("/load-mesh-lod")
+async def load_mesh_lod(req: MeshLODRequest):
+    """
+    Un niveau de la pyramide LOD du maillage (calculé puis mis en cache au
+    premier appel). Le client charge le niveau grossier puis affine.
+    """
+    return await run_blocking(_load_lod_response, req.path, req.level, req.format, req.mapping)
+
+
+@router.get("/load-mesh-lod")
+async def get_mesh_lod(request: Request, path: str = Query(...), level: float = LOD_LEVELS[0],
+                       format: Literal["json", "binary"] = "binary", mapping: bool = False):
+    """Variante GET de /load-mesh-lod, revalidable (ETag du maillage source et du niveau)."""
+    return await cached_response(request, [path], ("lod", level, LOD_LEVELS, format, mapping),
+                                 _load_lod_response, path, level, format, mapping)
 
+
+def convert_meshes(job_id: str, mesh_paths: list) -> None:
+    """Conversion parallèle des maillages en JSON Three.js."""
+    converted, errors = run_in_pool(job_id, [
+        (mesh_path, generate_threejs_json, (Path(mesh_path).resolve(), MESH_OUTPUT.resolve()))
+        for mesh_path in mesh_paths
+    ])
+
+    results = []
     for mesh_path in mesh_paths:
-        try:
-            json_path = generate_threejs_json(Path(mesh_path), MESH_OUTPUT)
+        if mesh_path in converted:
             results.append({
                 "mesh_path": mesh_path,
-                "json": json_path.name
+                "json": converted[mesh_path].name
             })
-        except Exception as e:
+        else:
             results.append({
                 "mesh_path": mesh_path,
-                "error": str(e)
+                "error": errors[mesh_path]
             })
 
-    return results
+    finish_job(job_id, results)
+
+
+@router.post("/upload-mesh")
+def upload_mesh(background_tasks: BackgroundTasks, payload: dict = Body(...)):
+    """
+    Lance la conversion en tâche de fond et renvoie immédiatement un job_id ;
+    les résultats sont disponibles via GET /progress/{job_id} ("results").
+    """
+    mesh_paths = payload.get("mesh_paths", [])
+
+    job_id = create_job(len(mesh_paths))
+    background_tasks.add_task(run_job, job_id, convert_meshes, mesh_paths)
+
+    return {"status": "started", "job_id": job_id}
+
+
+@router.post("/invalidate-mesh-cache")
+def invalidate_mesh_cache(payload: dict = Body(...)):
+    """
+    Supprime les JSON Three.js en cache des maillages donnés
+    (ou tout le cache si "mesh_paths" est vide).
+    """
+    mesh_paths = payload.get("mesh_paths", [])
+    if not mesh_paths:
+        removed = invalidate_threejs_json(MESH_OUTPUT)
+        return {"removed": [p.name for p in removed], "errors": []}
+
+    removed = []
+    errors = []
+    for mesh_path in mesh_paths:
+        try:
+            removed += [p.name for p in invalidate_threejs_json(MESH_OUTPUT, Path(mesh_path))]
+        except Exception as e:
+            errors.append({"mesh_path": mesh_path, "error": str(e)})
+
+    return {"removed": removed, "errors": errors}
 
 
 @router.post("/delete-meshes")
@@ -61,17 +199,19 @@ def delete_meshes(ids: List[str] = Body(...)):
     errors = []
 
     for mesh_id in ids:
-        matching_files = list(UPLOAD_DIR.glob(f"{mesh_id}_*"))
-        if not matching_files:
-            errors.append({"id": mesh_id, "error": "Non trouvé"})
-            continue
-
-        for f in matching_files:
-            try:
-                f.unlink()
-                deleted.append(mesh_id)
-            except Exception as e:
-                errors.append({"id": mesh_id, "error": str(e)})
+        try:
+            # un import dédupliqué partage l'id : seule la référence de
+            # l'appelant est retirée, le fichier part avec la dernière
+            entry, refs = upload_store.release(mesh_id)
+            if entry is None:
+                errors.append({"id": mesh_id, "error": "Non trouvé"})
+                continue
+            # un fichier simplement indexé reste à sa place d'origine
+            if refs == 0 and entry["metadata"].get("mode") != "register":
+                Path(entry["path"]).unlink(missing_ok=True)
+            deleted.append(mesh_id)
+        except Exception as e:
+            errors.append({"id": mesh_id, "error": str(e)})
 
     return {
         "deleted": deleted,
@@ -1,8 +1,11 @@
 # routes/normals.py
 from fastapi import APIRouter, Body
+from fastapi.responses import JSONResponse
 import os, json
 from pathlib import Path
-from tools.parser import load_normals_csv
+from tools.parser import load_normals_array
+
+from .executor import run_blocking
 
 router = APIRouter()
 
@@ -12,17 +15,15 @@ NORMAL_OUTPUT.mkdir(parents=True, exist_ok=True)
 
 
 # ------- 1) Charger un CSV (ou plusieurs) et renvoyer les normales ---------
-@router.post("/load-normals-paths")
-def load_normals_from_paths(payload: dict = Body(...)):
-    paths: list[str] = payload.get("paths", [])
+def _read_normals(paths: list[str]) -> JSONResponse:
     out = []
     for p in paths:
         try:
-            normals = load_normals_csv(p)
+            normals = load_normals_array(p)
             out.append({
                 "name": os.path.basename(p),
                 "path": p,
-                "normals": normals
+                "normals": normals.tolist()
             })
         except Exception as e:
             out.append({
@@ -30,7 +31,13 @@ def load_normals_from_paths(payload: dict = Body(...)):
                 "path": p,
                 "error": str(e)
             })
-    return out
+    return JSONResponse(out)
+
+
+@router.post("/load-normals-paths")
+async def load_normals_from_paths(payload: dict = Body(...)):
+    paths: list[str] = payload.get("paths", [])
+    return await run_blocking(_read_normals, paths)
 
 
 # ------- 2) Associer des CSV de normales à des meshes ----------------------
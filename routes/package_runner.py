@@ -0,0 +1,363 @@
+"""Exécution parallèle des fonctions de package (/run-function-batch/).
+
+Chaque sujet d'un job est une tâche du pool de processus ``PACKAGE_WORKERS`` :
+les sujets d'une cohorte tournent en parallèle. L'état de chaque sujet est
+persisté dans ``job_store`` (SQLite) par le worker lui-même ; les messages de
+``progress_callback`` remontent au serveur par une file partagée et alimentent
+le registre de progression de ``routes.jobs``.
+
+Les sujets qui écrivent dans le même dossier de sortie (lh / rh d'un même
+sujet) sont exécutés l'un après l'autre, jamais simultanément.
+
+Annulation : les sujets en attente ne sont jamais lancés ; un sujet en cours
+s'interrompt au prochain appel de ``progress_callback``. Le job n'est clos
+qu'une fois tous ses workers revenus.
+"""
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from threading import Lock, RLock, Thread
+from typing import Any, Deque, Dict, List, Set, Tuple
+import importlib
+import json
+import multiprocessing
+import os
+import time
+
+import yaml
+
+from tools.asset_manifest import update_manifest
+
+from . import job_store
+from .assets import invalidate_manifest
+from .jobs import create_job, finish_job, job_log, progress_lock, progress_registry, set_progress
+
+# Nombre de sujets traités simultanément
+PACKAGE_WORKERS = int(os.environ.get("CORTEXVISU_PACKAGE_WORKERS", max(1, (os.cpu_count() or 2) // 2)))
+
+# Répertoire racine où les résultats sont écrits
+PUBLIC_DIR = Path("public")
+
+# Intervalle minimal entre deux vérifications d'annulation dans un worker (s)
+CANCEL_CHECK_INTERVAL = 1.0
+
+_pool: ProcessPoolExecutor | None = None
+_queue = None
+_lock = Lock()
+
+# État des jobs en cours, protégé par _state_lock :
+#   _futures   (job_id, idx) → future soumise au pool
+#   _fractions job_id → avancement de chaque sujet
+#   _busy      dossiers de sortie occupés par un sujet en cours
+#   _waiting   dossier de sortie → sujets en attente de ce dossier
+_state_lock = RLock()
+_futures: Dict[tuple, Future] = {}
+_fractions: Dict[str, Dict[int, float]] = {}
+_busy: Set[Path] = set()
+_waiting: Dict[Path, Deque[Tuple[str, int, tuple]]] = {}
+
+# File de progression côté worker (initialisée par _init_worker)
+_progress_queue = None
+
+
+class JobCancelled(Exception):
+    """Levée dans le worker quand le sujet a été annulé pendant son exécution."""
+
+
+# ---------------------------------------------------------------------------
+# Côté worker
+# ---------------------------------------------------------------------------
+def _init_worker(queue) -> None:
+    global _progress_queue
+    _progress_queue = queue
+
+
+def _jsonable(value: Any) -> Any:
+    try:
+        json.dumps(value)
+        return value
+    except (TypeError, ValueError):
+        return repr(value)
+
+
+def run_subject(db_path: str, job_id: str, idx: int, package: str, function: str,
+                yaml_key: str | None, step_cfg: Dict[str, Any], mesh_path: str,
+                out_dir: str) -> Tuple[Dict[str, Any], str]:
+    """
+    Exécute la fonction du package sur un sujet (dans un processus worker).
+
+    Returns:
+        (entrée de résultat, message final) : le message final est journalisé
+        par le serveur à la réception du résultat, avant la clôture du job
+        (la file de progression n'est pas ordonnée avec les résultats)
+    """
+    job_store.JOB_DB = Path(db_path)
+    if not job_store.mark_running(job_id, idx):
+        return {}, ""                                 # annulé avant démarrage
+
+    mesh_path = Path(mesh_path)
+    subject = mesh_path.parent.parent.name
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    def emit(p: float, msg: str = "") -> None:
+        _progress_queue.put((job_id, idx, p, msg))
+
+    cfg_dict = {yaml_key: step_cfg}
+    cfg_file = out_dir / "config_generated.yaml"
+    with cfg_file.open("w") as f:
+        yaml.safe_dump(cfg_dict, f)
+
+    entry = {
+        "subject": subject,
+        "mesh": mesh_path.name,
+        "config": str(cfg_file),
+        "output": str(out_dir),
+        "result": None,
+    }
+
+    last_check = [time.monotonic()]
+
+    def progress_callback(p: float, msg: str = ""):
+        emit(p, msg)
+        now = time.monotonic()
+        if now - last_check[0] >= CANCEL_CHECK_INTERVAL:
+            last_check[0] = now
+            if job_store.subject_status(job_id, idx) == job_store.CANCELLED:
+                raise JobCancelled()
+
+    try:
+        emit(0, f"[{subject}] Début exécution sur {mesh_path.name}")
+        registry = importlib.import_module(f"{package}.api_registry")
+        func = registry.EXPORTED_FUNCTIONS[function]["function"]
+        result = func(
+            str(mesh_path.parent.parent),
+            str(out_dir),
+            cfg_dict,
+            progress_callback=progress_callback
+        )
+        entry["result"] = _jsonable(result)
+        update_manifest(out_dir)
+        job_store.mark_finished(job_id, idx, job_store.DONE, result=entry)
+        message = f"[{subject}] Terminé"
+
+    except JobCancelled:
+        job_store.mark_finished(job_id, idx, job_store.CANCELLED, result=entry)
+        message = f"[{subject}] Annulé"
+
+    except Exception as e:
+        entry["error"] = str(e)
+        job_store.mark_finished(job_id, idx, job_store.FAILED, result=entry, error=str(e))
+        message = f"[{subject}] Erreur: {e}"
+
+    return entry, message
+
+
+# ---------------------------------------------------------------------------
+# Côté serveur
+# ---------------------------------------------------------------------------
+def _dispatch_progress(queue) -> None:
+    """Thread : relaie les messages des workers vers le registre de progression."""
+    while True:
+        try:
+            job_id, idx, p, msg = queue.get()
+            with progress_lock:
+                running = progress_registry.get(job_id, {}).get("status") == "running"
+            with _state_lock:
+                fractions = _fractions.get(job_id)
+                if not running or fractions is None:
+                    continue
+                fractions[idx] = max(p, fractions.get(idx, 0))
+            set_progress(job_id, _done_fraction(job_id), msg)
+        except Exception as e:              # job évincé entre-temps… : le relais continue
+            print(f"[package_runner] message de progression ignoré : {e}")
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool, _queue
+    with _lock:
+        if _pool is None:
+            ctx = multiprocessing.get_context("spawn")
+            _queue = ctx.Queue()
+            _pool = ProcessPoolExecutor(
+                max_workers=PACKAGE_WORKERS,
+                mp_context=ctx,
+                initializer=_init_worker,
+                initargs=(_queue,),
+            )
+            Thread(target=_dispatch_progress, args=(_queue,), daemon=True).start()
+        return _pool
+
+
+def _done_fraction(job_id: str) -> float:
+    with _state_lock:
+        done = sum(_fractions.get(job_id, {}).values())
+    with progress_lock:
+        total = progress_registry.get(job_id, {}).get("total") or 1
+    return min(1.0, done / total)
+
+
+def _output_dir(mesh_path: str) -> Path:
+    return (PUBLIC_DIR / Path(mesh_path).parent.parent.name / "cortexanalyzer").resolve()
+
+
+def _in_flight(job_id: str) -> bool:
+    """Vrai si un sujet du job est soumis au pool ou attend son dossier de sortie."""
+    with _state_lock:
+        return (any(jid == job_id for jid, _ in _futures)
+                or any(jid == job_id for queue in _waiting.values() for jid, _, _ in queue))
+
+
+def _in_flight_indices(job_id: str) -> Set[int]:
+    with _state_lock:
+        return ({idx for jid, idx in _futures if jid == job_id}
+                | {idx for queue in _waiting.values() for jid, idx, _ in queue if jid == job_id})
+
+
+def _submit(job_id: str, idx: int, out_dir: Path, args: tuple) -> None:
+    """Soumet un sujet, ou le met en attente si son dossier de sortie est occupé."""
+    with _state_lock:
+        if out_dir in _busy:
+            _waiting.setdefault(out_dir, deque()).append((job_id, idx, args))
+            return
+        _busy.add(out_dir)
+        # enregistrée avant le callback : un callback immédiat la retrouve
+        fut = _get_pool().submit(run_subject, *args)
+        _futures[(job_id, idx)] = fut
+    fut.add_done_callback(partial(_on_subject_done, job_id, idx, out_dir))
+
+
+def _release(out_dir: Path) -> None:
+    """Libère ``out_dir`` et soumet le sujet suivant qui l'attendait."""
+    with _state_lock:
+        _busy.discard(out_dir)
+        queue = _waiting.get(out_dir)
+        if not queue:
+            _waiting.pop(out_dir, None)
+            return
+        job_id, idx, args = queue.popleft()
+    _submit(job_id, idx, out_dir, args)
+
+
+def _on_subject_done(job_id: str, idx: int, out_dir: Path, fut: Future) -> None:
+    with _state_lock:
+        _futures.pop((job_id, idx), None)
+        fractions = _fractions.get(job_id)
+        if fractions is not None:
+            fractions[idx] = 1.0
+    invalidate_manifest(out_dir)
+
+    message = ""
+    if not fut.cancelled():
+        if fut.exception() is not None:
+            # le worker lui-même a échoué (processus tué, pool cassé…)
+            job_store.mark_finished(job_id, idx, job_store.FAILED, error=str(fut.exception()))
+            message = f"[{idx}] Erreur worker: {fut.exception()}"
+        else:
+            message = fut.result()[1]
+
+    _release(out_dir)
+
+    with progress_lock:
+        tracked = progress_registry.get(job_id, {}).get("status") == "running"
+    if tracked:
+        set_progress(job_id, _done_fraction(job_id), message)
+
+    # clôture seulement quand plus aucun worker du job ne tourne
+    if not _in_flight(job_id):
+        _close_if_complete(job_id)
+
+
+def _close_if_complete(job_id: str) -> None:
+    """Clôt le job s'il est terminé (une seule fois, même appelé en concurrence)."""
+    if not job_store.finish_job_if_complete(job_id):
+        return
+    with _state_lock:
+        closing = _fractions.pop(job_id, None) is not None
+    with progress_lock:
+        tracked = progress_registry.get(job_id, {}).get("status") == "running"
+    if closing and tracked:
+        finish_job(job_id, job_results(job_id))
+
+
+def job_results(job_id: str) -> List[Dict[str, Any]]:
+    job = job_store.get_job(job_id)
+    return [s["result"] for s in job["subjects"] if s["result"]] if job else []
+
+
+def submit_subjects(job_id: str, indices: List[int]) -> None:
+    """Soumet au pool les sujets ``indices`` (déjà en pending) du job."""
+    job = job_store.get_job(job_id)
+    subjects = job["subjects"]
+
+    with progress_lock:
+        known = job_id in progress_registry and progress_registry[job_id]["status"] == "running"
+    if not known:
+        create_job(len(subjects), job_id=job_id)
+    with _state_lock:
+        fractions = _fractions.setdefault(job_id, {})
+        for s in subjects:
+            if s["status"] in job_store.FINAL:
+                fractions[s["idx"]] = 1.0
+        for idx in indices:
+            fractions[idx] = 0.0
+
+    db_path = str(job_store.JOB_DB.resolve())
+    for idx in indices:
+        mesh_path = subjects[idx]["mesh_path"]
+        out_dir = _output_dir(mesh_path)
+        args = (db_path, job_id, idx, job["package"], job["function"],
+                job["yaml_key"], job["config"], mesh_path, str(out_dir))
+        _submit(job_id, idx, out_dir, args)
+
+
+def start_job(job_id: str, package: str, function: str, yaml_key: str | None,
+              step_cfg: Dict[str, Any], mesh_paths: List[str]) -> None:
+    job_store.create_job(job_id, package, function, yaml_key, step_cfg, mesh_paths)
+    submit_subjects(job_id, list(range(len(mesh_paths))))
+
+
+def cancel_job(job_id: str) -> int:
+    """Annule les sujets en attente ou en cours ; renvoie leur nombre."""
+    n = job_store.cancel_subjects(job_id)
+    with _state_lock:
+        for queue in _waiting.values():
+            for item in [item for item in queue if item[0] == job_id]:
+                queue.remove(item)
+        futures = [fut for (jid, _), fut in _futures.items() if jid == job_id]
+    # hors verrou : l'annulation appelle aussitôt _on_subject_done
+    for fut in futures:
+        fut.cancel()
+    with progress_lock:
+        tracked = job_id in progress_registry
+    if tracked:
+        job_log(job_id, f"Annulation demandée ({n} sujet(s))")
+    if not _in_flight(job_id):
+        _close_if_complete(job_id)
+    return n
+
+
+def retry_job(job_id: str) -> List[int]:
+    """
+    Relance les sujets en échec ou annulés ; renvoie leurs indices. Un sujet
+    annulé dont le worker tourne encore n'est pas relancé.
+    """
+    indices = job_store.reset_subjects(job_id, (job_store.FAILED, job_store.CANCELLED),
+                                       exclude=_in_flight_indices(job_id))
+    if indices:
+        submit_subjects(job_id, indices)
+    return indices
+
+
+def resume_jobs() -> List[str]:
+    """Au démarrage : relance les sujets interrompus des jobs non terminés."""
+    resumed = []
+    for job_id in job_store.unfinished_jobs():
+        indices = job_store.reset_subjects(job_id, (job_store.PENDING, job_store.RUNNING))
+        if indices:
+            submit_subjects(job_id, indices)
+            resumed.append(job_id)
+        else:
+            job_store.finish_job_if_complete(job_id)
+    return resumed
@@ -0,0 +1,56 @@
+"""Connexions SQLite partagées par les index persistants (jobs, imports, dossiers).
+
+Chaque opération ouvre une connexion courte : les modules restent utilisables
+depuis les threads du serveur comme depuis les processus workers. Le schéma
+(et une éventuelle migration) n'est appliqué qu'une fois par processus et par
+base, et non à chaque connexion.
+"""
+from contextlib import contextmanager
+from pathlib import Path
+from threading import Lock
+from typing import Callable, Iterator
+import sqlite3
+
+# Bases dont le schéma a été appliqué par ce processus (chemins absolus)
+_ready: set = set()
+_ready_lock = Lock()
+
+
+def _ensure_schema(conn: sqlite3.Connection, db_path: Path, schema: str,
+                   migrate: Callable[[sqlite3.Connection], None] | None) -> None:
+    key = str(db_path.resolve())
+    with _ready_lock:
+        if key in _ready:
+            return
+        conn.executescript(schema)
+        if migrate is not None:
+            with conn:
+                migrate(conn)
+        _ready.add(key)
+
+
+@contextmanager
+def connect(db_path: Path, schema: str,
+            migrate: Callable[[sqlite3.Connection], None] | None = None
+            ) -> Iterator[sqlite3.Connection]:
+    """
+    Connexion courte à ``db_path`` : commit en sortie de bloc, puis fermeture.
+
+    Args:
+        schema: script ``CREATE … IF NOT EXISTS`` appliqué à la première connexion
+        migrate: appelée ensuite une fois (ex. ``ALTER TABLE`` d'une base ancienne)
+    """
+    db_path = Path(db_path)
+    if not db_path.exists():
+        # base créée (ou supprimée depuis) : schéma à (ré)appliquer
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        with _ready_lock:
+            _ready.discard(str(db_path.resolve()))
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    try:
+        _ensure_schema(conn, db_path, schema, migrate)
+        with conn:
+            yield conn
+    finally:
+        conn.close()
@@ -1,9 +1,18 @@
-from fastapi import APIRouter, Body
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Body, Query, Request
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
 from pathlib import Path
+from typing import List, Literal
 import os
 import json
-from tools.parser import load_scalar_data
+import struct
+import numpy as np
+from tools.mesh_lod import LOD_LEVELS, get_lod, resample_texture
+from tools.gifti_reader import gifti_index
+from tools.parser import load_scalar_array
+
+from .executor import run_blocking
+from .http_cache import cached_response
 
 router = APIRouter()
 
@@ -11,18 +20,90 @@ TEXTURE_OUTPUT = Path("public/textures")
 ASSOCIATIONS_FILE = TEXTURE_OUTPUT / "associations.json"
 TEXTURE_OUTPUT.mkdir(parents=True, exist_ok=True)
 
+# Encodages binaires : type stocké et, pour les entiers, code réservé aux NaN
+ENCODINGS = {
+    "float32": ("<f4", None),
+    "float16": ("<f2", None),
+    "uint16": ("<u2", 0xFFFF),
+    "uint8": ("u1", 0xFF),
+}
 
-@router.post("/upload-texture")
-async def upload_texture(payload: dict = Body(...)):
+# Alignement des blocs (octets) : permet des TypedArray sans copie côté client
+BLOCK_ALIGN = 4
+
+# Préambule du corps binaire : longueur (octets) de la description JSON qui suit
+_PREAMBLE = struct.Struct("<I")
+
+
+class TextureBatchRequest(BaseModel):
+    paths: List[str]
+    encoding: Literal["float32", "float16", "uint16", "uint8"] = "float32"
+    # rééchantillonnage sur un niveau LOD du maillage (voir /load-mesh-lod)
+    mesh: str | None = None
+    level: float = 1.0
+    # darrays lus dans chaque fichier (cartes / instants d'une texture multiple)
+    darrays: List[int] = [0]
+
+
+def encode_scalars(scalars: np.ndarray, encoding: str):
+    """
+    Encode une texture. Pour uint8 / uint16 : quantification linéaire
+    ``valeur = code * scale + offset`` sur [min, max], le code maximal étant
+    réservé aux NaN.
+
+    Valeurs non finies, identiques pour tous les encodages : NaN et ±inf
+    deviennent NaN (code réservé en uint8 / uint16) et sont exclus de
+    min / max. En float16, une valeur finie hors de ±65504 est bornée à ±65504.
+
+    Returns:
+        (octets, description) : la description donne dtype, scale, offset,
+        min, max et l'erreur absolue maximale réellement introduite.
+    """
+    values = np.asarray(scalars, dtype=np.float64).ravel()
+    dtype, nan_code = ENCODINGS[encoding]
+    finite = np.isfinite(values)
+    vmin = float(values[finite].min()) if finite.any() else 0.0
+    vmax = float(values[finite].max()) if finite.any() else 0.0
+
+    if nan_code is None:
+        limit = np.finfo(dtype).max                # float16 : ±65504, pas d'infini créé
+        encoded = np.where(finite, np.clip(values, -limit, limit), np.nan).astype(dtype)
+        decoded = encoded.astype(np.float64)
+        scale, offset = 1.0, 0.0
+    else:
+        levels = nan_code                      # codes 0 … nan_code-1
+        scale = (vmax - vmin) / (levels - 1) if vmax > vmin else 1.0
+        offset = vmin
+        codes = np.rint((np.where(finite, values, vmin) - offset) / scale)
+        encoded = np.where(finite, np.clip(codes, 0, levels - 1), nan_code).astype(dtype)
+        decoded = encoded * scale + offset
+
+    error = np.abs(decoded[finite] - values[finite])
+    desc = {
+        "dtype": np.dtype(dtype).name,
+        "count": int(values.size),
+        "scale": scale,
+        "offset": offset,
+        "nan_code": nan_code,
+        "min": vmin,
+        "max": vmax,
+        "max_abs_error": float(error.max()) if error.size else 0.0,
+    }
+    return encoded.tobytes(), desc
+
+
+# ---------------------------------------------------------------------------
+# Traitements bloquants (exécutés via run_blocking, sérialisation comprise)
+# ---------------------------------------------------------------------------
+def _read_textures(texture_paths: list) -> JSONResponse:
     result = []
 
-    texture_paths = payload.get("texture_paths", [])
     for texture_path in texture_paths:
         try:
-            scalars = load_scalar_data(texture_path)
+            scalars = load_scalar_array(texture_path)
             result.append({
                 "texture_path": texture_path,
-                "scalars": scalars  
+                "scalars": scalars.tolist()
             })
         except Exception as e:
             result.append({
@@ -33,18 +114,17 @@ async def upload_texture(payload: dict = Body(...)):
     return JSONResponse(result)
 
 
-@router.post("/load-texture-paths")
-def load_textures_from_paths(payload: dict = Body(...)):
-    paths = payload.get("paths", [])
+def _read_textures_from_paths(paths: list, darray: int = 0) -> JSONResponse:
     result = []
 
     for path in paths:
         try:
-            scalars = load_scalar_data(path)
+            scalars = load_scalar_array(path, darray)
             result.append({
                 "name": os.path.basename(path),
                 "path": path,
-                "scalars": scalars
+                "darray": darray,
+                "scalars": scalars.tolist()
             })
         except Exception as e:
             result.append({
@@ -53,13 +133,146 @@ def load_textures_from_paths(payload: dict = Body(...)):
                 "error": str(e)
             })
 
-    return result
+    return JSONResponse(result)
+
+
+def _read_textures_batch(paths: list, encoding: str, mesh: str | None = None,
+                         level: float = 1.0, darrays: list = (0,)) -> Response:
+    """
+    Toutes les textures en un seul corps binaire :
+
+      • préambule : longueur ``n`` (uint32 little-endian) puis ``n`` octets de
+        description JSON (pour chaque texture : byte_offset, dtype, scale,
+        offset de quantification, erreur maximale introduite par l'encodage)
+      • blocs encodés concaténés, à partir de ``4 + n`` arrondi à
+        BLOCK_ALIGN ; les ``byte_offset`` sont relatifs à ce début et alignés
+
+    La description est dans le corps et non dans un en-tête HTTP, dont la
+    taille est limitée par les proxies et serveurs (une centaine de darrays
+    dépasse vite 8 Kio).
+
+    Avec ``mesh`` et ``level`` < 1, chaque texture est d'abord moyennée sur
+    les sommets du niveau LOD correspondant.
+
+    Un bloc est produit par (fichier, darray) : seuls les darrays demandés
+    sont décodés.
+    """
+    blocks = []
+    textures = []
+    position = 0
+    try:
+        lod = get_lod(mesh, level) if mesh and level < 1 else None
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    for path, darray in ((p, d) for p in paths for d in darrays):
+        entry = {"name": os.path.basename(path), "path": path, "darray": darray}
+        try:
+            scalars = load_scalar_array(path, darray)
+            if lod is not None:
+                if len(scalars) != len(lod["mapping"]):
+                    raise ValueError(f"{len(scalars)} valeurs pour {len(lod['mapping'])} sommets")
+                scalars = resample_texture(scalars, lod["mapping"], len(lod["vertices"]))
+            data, desc = encode_scalars(scalars, encoding)
+        except Exception as e:
+            textures.append({**entry, "error": str(e)})
+            continue
+
+        pad = -position % BLOCK_ALIGN
+        if pad:
+            blocks.append(b"\0" * pad)
+            position += pad
+        textures.append({**entry, **desc, "byte_offset": position})
+        blocks.append(data)
+        position += len(data)
+
+    layout = {"encoding": encoding, "byteorder": "little", "level": level if lod else 1.0,
+              "textures": textures}
+    description = json.dumps(layout).encode()
+    preamble = _PREAMBLE.pack(len(description)) + description
+    preamble += b"\0" * (-len(preamble) % BLOCK_ALIGN)
+    return Response(
+        content=preamble + b"".join(blocks),
+        media_type="application/octet-stream",
+    )
+
+
+def _write_associations(mapping: dict) -> None:
+    with open(ASSOCIATIONS_FILE, "w") as f:
+        json.dump(mapping, f, indent=2)
+
+
+# ---------------------------------------------------------------------------
+# Routes
+# ---------------------------------------------------------------------------
+@router.post("/upload-texture")
+async def upload_texture(payload: dict = Body(...)):
+    return await run_blocking(_read_textures, payload.get("texture_paths", []))
+
+
+@router.post("/load-texture-paths")
+async def load_textures_from_paths(payload: dict = Body(...)):
+    return await run_blocking(_read_textures_from_paths, payload.get("paths", []),
+                              int(payload.get("darray", 0)))
+
+
+@router.get("/load-texture-paths")
+async def get_textures_from_paths(request: Request, paths: List[str] = Query(...),
+                                  darray: int = 0):
+    """Variante GET, revalidable (ETag des textures sources)."""
+    return await cached_response(request, paths, ("textures-json", darray, *paths),
+                                 _read_textures_from_paths, paths, darray)
+
+
+@router.post("/load-textures-batch")
+async def load_textures_batch(req: TextureBatchRequest):
+    """Plusieurs textures d'un même maillage en une réponse binaire (voir _read_textures_batch)."""
+    if req.mesh and req.level < 1 and req.level not in LOD_LEVELS:
+        return JSONResponse({"error": f"Niveau inconnu : {req.level}"}, status_code=400)
+    return await run_blocking(_read_textures_batch, req.paths, req.encoding, req.mesh, req.level,
+                              req.darrays)
+
+
+@router.get("/load-textures-batch")
+async def get_textures_batch(request: Request, paths: List[str] = Query(...),
+                             encoding: Literal["float32", "float16", "uint16", "uint8"] = "float32",
+                             mesh: str | None = None, level: float = 1.0,
+                             darrays: List[int] = Query([0])):
+    """Variante GET de /load-textures-batch, revalidable (ETag des textures et du maillage)."""
+    if mesh and level < 1 and level not in LOD_LEVELS:
+        return JSONResponse({"error": f"Niveau inconnu : {level}"}, status_code=400)
+    sources = [*paths, mesh] if mesh and level < 1 else paths
+    return await cached_response(request, sources,
+                                 ("textures", encoding, level, LOD_LEVELS, darrays, *paths),
+                                 _read_textures_batch, paths, encoding, mesh, level, darrays)
+
+
+def _texture_darrays(path: str) -> JSONResponse:
+    try:
+        index = gifti_index(path)
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    return JSONResponse({
+        "path": path,
+        "n_darrays": len(index),
+        "darrays": [
+            {"index": i, "intent": d["intent"], "dtype": d["dtype"].name,
+             "shape": list(d["shape"]), "encoding": d["encoding"]}
+            for i, d in enumerate(index)
+        ],
+    })
+
+
+@router.get("/texture-darrays")
+async def texture_darrays(path: str = Query(...)):
+    """Darrays d'une texture GIFTI (intent, dtype, forme), sans décoder les données."""
+    return await run_blocking(_texture_darrays, path)
 
 
 @router.post("/associate-textures")
 async def associate_textures(payload: dict = Body(...)):
     mapping = {}
-    
+
     meshes = payload.get("meshes", [])
     textures = payload.get("textures", [])
 
@@ -74,7 +287,7 @@ async def associate_textures(payload: dict = Body(...)):
         if associated_textures:
             mapping[mesh_id] = associated_textures
 
-    with open(ASSOCIATIONS_FILE, "w") as f:
-        json.dump(mapping, f, indent=2)
+    await run_blocking(_write_associations, mapping)
 
     return {"status": "success", "mapping": mapping}
+
@@ -0,0 +1,181 @@
+"""Index persistant (SQLite) des maillages importés dans ``uploads/``.
+
+Chaque import enregistre ``id → chemin, nom, taille, sha256, métadonnées`` ;
+les routes retrouvent un maillage par son id en une requête indexée au lieu
+de parcourir le dossier (``UPLOAD_DIR.glob``), et la suppression met l'index
+à jour.
+
+Un import dédupliqué partage l'id d'un import existant : ``refs`` compte ces
+références, et ``release`` ne retire l'entrée qu'à la dernière.
+
+Les fichiers déjà présents dans ``uploads/`` avant la création de l'index
+sont rattrapés une fois par ``sync_directory``, lancé en tâche de fond au
+démarrage : ces imports sont retrouvés dès que leur hachage est terminé.
+"""
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+import json
+import os
+import re
+import sqlite3
+import time
+
+from tools.conversion_cache import file_digest
+
+from .sqlite_store import connect
+
+UPLOAD_DIR = Path("uploads")
+UPLOAD_DB = Path(os.environ.get("CORTEXVISU_UPLOAD_DB", "cache/uploads.sqlite"))
+
+# Nom des fichiers importés : <uuid>_<nom d'origine>
+_UPLOAD_RE = re.compile(r"^([0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})_(.+)$")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS uploads (
+    id        TEXT PRIMARY KEY,
+    path      TEXT NOT NULL,
+    name      TEXT NOT NULL,
+    size      INTEGER NOT NULL,
+    sha256    TEXT NOT NULL,
+    metadata  TEXT,
+    created   REAL NOT NULL,
+    refs      INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS uploads_sha256 ON uploads (sha256);
+"""
+
+
+def _migrate(conn: sqlite3.Connection) -> None:
+    columns = {r["name"] for r in conn.execute("PRAGMA table_info(uploads)")}
+    if "refs" not in columns:                 # index créé avant le comptage des références
+        conn.execute("ALTER TABLE uploads ADD COLUMN refs INTEGER NOT NULL DEFAULT 1")
+
+
+def _connect():
+    return connect(UPLOAD_DB, _SCHEMA, _migrate)
+
+
+def _row(row: sqlite3.Row | None) -> Dict[str, Any] | None:
+    if row is None:
+        return None
+    entry = dict(row)
+    entry["metadata"] = json.loads(entry["metadata"]) if entry["metadata"] else {}
+    return entry
+
+
+def register(mesh_id: str, path: str | Path, name: str,
+             metadata: Dict[str, Any] | None = None) -> Dict[str, Any]:
+    """Ajoute (ou remplace) l'entrée ``mesh_id`` et la renvoie."""
+    path = Path(path).resolve()
+    entry = {
+        "id": mesh_id,
+        "path": str(path),
+        "name": name,
+        "size": path.stat().st_size,
+        "sha256": file_digest(path),
+        "metadata": metadata or {},
+        "created": time.time(),
+    }
+    with _connect() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO uploads (id, path, name, size, sha256, metadata, created) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (mesh_id, entry["path"], name, entry["size"], entry["sha256"],
+             json.dumps(entry["metadata"]), entry["created"]),
+        )
+    return entry
+
+
+def get(mesh_id: str) -> Dict[str, Any] | None:
+    with _connect() as conn:
+        row = conn.execute("SELECT * FROM uploads WHERE id = ?", (mesh_id,)).fetchone()
+    return _row(row)
+
+
+def get_many(mesh_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Entrées connues parmi ``mesh_ids``, par id."""
+    if not mesh_ids:
+        return {}
+    marks = ",".join("?" * len(mesh_ids))
+    with _connect() as conn:
+        rows = conn.execute(
+            f"SELECT * FROM uploads WHERE id IN ({marks})", tuple(mesh_ids)
+        ).fetchall()
+    return {r["id"]: _row(r) for r in rows}
+
+
+def find_by_hash(sha256: str) -> Dict[str, Any] | None:
+    """
+    Premier import dont le contenu a ce sha256 (déduplication), revalidé :
+    une entrée dont le fichier a disparu est retirée, une entrée dont le
+    fichier a changé depuis l'import (lien physique vers une source modifiée,
+    fichier indexé en mode "register") est ré-empreintée et écartée.
+    """
+    while True:
+        with _connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM uploads WHERE sha256 = ? ORDER BY created LIMIT 1", (sha256,)
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            # file_digest ne relit le fichier que si sa taille ou son mtime a changé
+            current = file_digest(row["path"])
+            size = os.stat(row["path"]).st_size
+        except OSError:
+            with _connect() as conn:
+                conn.execute("DELETE FROM uploads WHERE id = ?", (row["id"],))
+            continue
+        if current == sha256:
+            return _row(row)
+        with _connect() as conn:
+            conn.execute("UPDATE uploads SET sha256 = ?, size = ? WHERE id = ?",
+                         (current, size, row["id"]))
+
+
+def acquire(mesh_id: str) -> Dict[str, Any] | None:
+    """Ajoute une référence à ``mesh_id`` (import dédupliqué) ; renvoie l'entrée."""
+    with _connect() as conn:
+        conn.execute("UPDATE uploads SET refs = refs + 1 WHERE id = ?", (mesh_id,))
+        row = conn.execute("SELECT * FROM uploads WHERE id = ?", (mesh_id,)).fetchone()
+    return _row(row)
+
+
+def release(mesh_id: str) -> Tuple[Dict[str, Any] | None, int]:
+    """
+    Retire une référence à ``mesh_id`` ; l'entrée n'est supprimée de l'index
+    qu'à la dernière. Renvoie (entrée ou None, références restantes) : le
+    fichier ne doit être supprimé que s'il n'en reste aucune.
+    """
+    with _connect() as conn:
+        row = conn.execute("SELECT * FROM uploads WHERE id = ?", (mesh_id,)).fetchone()
+        if row is None:
+            return None, 0
+        if row["refs"] > 1:
+            conn.execute("UPDATE uploads SET refs = refs - 1 WHERE id = ?", (mesh_id,))
+        else:
+            conn.execute("DELETE FROM uploads WHERE id = ?", (mesh_id,))
+    return _row(row), row["refs"] - 1
+
+
+def sync_directory(upload_dir: Path = UPLOAD_DIR) -> int:
+    """
+    Indexe les fichiers ``<uuid>_<nom>`` de ``upload_dir`` absents de l'index
+    et retire les entrées dont le fichier a disparu. Renvoie le nombre d'ajouts.
+    """
+    upload_dir = Path(upload_dir)
+    with _connect() as conn:
+        known = {r["id"]: r["path"] for r in conn.execute("SELECT id, path FROM uploads")}
+    stale = [mesh_id for mesh_id, path in known.items() if not Path(path).exists()]
+    if stale:
+        with _connect() as conn:
+            conn.executemany("DELETE FROM uploads WHERE id = ?", [(i,) for i in stale])
+
+    added = 0
+    if upload_dir.exists():
+        for entry in os.scandir(upload_dir):
+            match = _UPLOAD_RE.match(entry.name)
+            if match and entry.is_file() and match.group(1) not in known:
+                register(match.group(1), entry.path, match.group(2))
+                added += 1
+    return added
@@ -228,43 +228,48 @@ runBtn.onclick = async () => {
     const data = await res.json();
     job_id = data.job_id;
 
-    // Polling de la progression
-    const poll = setInterval(async () => {
-      try {
-        const progressRes = await fetch(`/api/progress/${job_id}`);
-        if (!progressRes.ok) throw new Error('Erreur progression');
-
-        const { progress, eta, elapsed, logs } = await progressRes.json();
-
-        // MAJ interface
-        progressBar.value = progress;
-        progressText.textContent = `Progression : ${progress}% • Estimé : ${eta} • Écoulé : ${elapsed}`;
-        logBox.textContent = logs.join('\n');
+    // Flux SSE de la progression (push serveur, plus de polling)
+    const source = new EventSource(`/api/progress/${job_id}/stream`);
+
+    const render = ({ progress, eta, elapsed, logs }) => {
+      progressBar.value = progress;
+      progressText.textContent = `Progression : ${progress}% • Estimé : ${eta} • Écoulé : ${elapsed}`;
+      if (logs.length) {
+        logBox.textContent += (logBox.textContent ? '\n' : '') + logs.join('\n');
         logBox.scrollTop = logBox.scrollHeight;
+      }
+    };
 
-        if (progress >= 100) {
-          clearInterval(poll);
+    source.addEventListener('progress', (e) => render(JSON.parse(e.data)));
 
-          // Re-fetch des résultats finaux
-          const finalRes = await fetch(`/api/progress/${job_id}`);
-          const finalData = await finalRes.json();
-          results = finalData.results || [];
+    source.addEventListener('done', async (e) => {
+      source.close();
+      const finalData = JSON.parse(e.data);
+      render(finalData);
+      runBtn.disabled = false;
 
-          for (const r of results) {
-            await refreshMeshAssets({ path: r.output });
-          }
+      if (finalData.status === 'expired') {
+        progressText.textContent = 'Job inconnu ou expiré';
+        return;
+      }
 
-          progressText.textContent = `Terminé (${progress}%) • Durée totale : ${elapsed}`;
-          runBtn.disabled = false;
-        }
+      results = finalData.results || [];
 
-      } catch (e) {
-        clearInterval(poll);
-        progressText.textContent = 'Erreur durant le traitement';
-        console.error('Erreur polling :', e);
-        runBtn.disabled = false;
+      for (const r of results) {
+        await refreshMeshAssets({ path: r.output });
       }
-    }, 500);
+
+      progressText.textContent = `Terminé (${finalData.progress}%) • Durée totale : ${finalData.elapsed}`;
+    });
+
+    // Coupure transitoire : EventSource se reconnecte seul (Last-Event-ID) ;
+    // on n'abandonne que si le navigateur a fermé le flux
+    source.onerror = (e) => {
+      if (source.readyState !== EventSource.CLOSED) return;
+      progressText.textContent = 'Erreur durant le traitement';
+      console.error('Erreur flux de progression :', e);
+      runBtn.disabled = false;
+    };
   } catch (err) {
     progressText.textContent = 'Erreur lors de l’envoi de la tâche.';
     alert('Erreur : ' + err.message);
@@ -2,7 +2,7 @@
 // Gestion de la sélection d’un maillage et de l’application de textures + normales
 // -----------------------------------------------------------------------------
 
-import { createMesh } from '../../viewer/viewer.js';
+import { createMesh, refineMesh } from '../../viewer/viewer.js';
 import {
   getScene,
   getMeshes,
@@ -13,6 +13,7 @@ import { toggleEdges } from '../../viewer/viewer.js';
 import { updateInfoPanel } from '../../utils/sceneState.js';
 import { applyNormalsToMesh } from '../../viewer/utilsNormals.js';
 import { refreshMeshAssets } from '../../utils/refreshMeshAssets.js';
+import { fetchMeshProgressive } from '../../services/MeshService.js';
 
 // -----------------------------------------------------------------------------
 // API publique : initialisation des listeners des listes déroulantes
@@ -31,35 +32,32 @@ export function bindMeshSelection() {
     if (!selectedPath) return;
 
     try {
-      // 1. Récupération du maillage auprès de l’API backend
-      const res = await fetch('http://localhost:8000/api/load-mesh-from-path', {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ path: selectedPath })
-      });
-
-      const meshData = await res.json();
-      if (meshData.error) {
-        console.error('Erreur backend:', meshData.error);
-        return;
-      }
-
-      // 2. Retire le mesh courant de la scène
+      // 1. Récupération progressive auprès de l’API backend (format binaire) :
+      //    le niveau grossier s’affiche tout de suite, puis chaque niveau plus
+      //    fin remplace la géométrie jusqu’à la pleine résolution
       const currentMesh = getCurrentMesh();
-      if (currentMesh) scene.remove(currentMesh);
-
-      // 3. Ajoute les métadonnées locales au mesh
       const selectedMesh = meshes.find(m => m.path === selectedPath);
-      const enriched = {
-        ...meshData,
-        id:   selectedMesh?.id,
-        name: selectedMesh?.name,
-        path: selectedMesh?.path
-      };
-
-      const newMesh = createMesh(enriched);
-      newMesh.userData.meta = selectedMesh;
-      scene.add(newMesh);
+      let newMesh = null;
+
+      await fetchMeshProgressive(selectedPath, (meshData) => {
+        if (newMesh) {
+          refineMesh(newMesh, meshData);
+          return;
+        }
+
+        // 2. Retire le mesh courant de la scène
+        if (currentMesh) scene.remove(currentMesh);
+
+        // 3. Ajoute les métadonnées locales au mesh
+        newMesh = createMesh({
+          ...meshData,
+          id:   selectedMesh?.id,
+          name: selectedMesh?.name,
+          path: selectedMesh?.path
+        });
+        newMesh.userData.meta = selectedMesh;
+        scene.add(newMesh);
+      });
 
       // 4. Désactive les arêtes par défaut
       const edgeToggle = document.getElementById('edges-toggle');
@@ -0,0 +1,144 @@
+// src/services/MeshService.js
+// ------------------------------------------------------------
+// Service réseau pour récupérer un maillage en binaire depuis le
+// backend FastAPI. Les vertices (float32) et faces (uint32) sont
+// lus directement dans l'ArrayBuffer reçu, sans copie ni JSON.
+// ------------------------------------------------------------
+
+/**
+ * Télécharge un maillage au format binaire.
+ * @param {string} path - Chemin du fichier .gii côté serveur.
+ * @param {string} [baseURL="http://localhost:8000"] - Base de l'API.
+ * @returns {Promise<{vertices: Float32Array, faces: Uint32Array}>}
+ */
+export async function fetchMesh(path, baseURL = "http://localhost:8000") {
+  // 1. Appel REST (GET : revalidé par le cache HTTP du navigateur) --
+  const params = new URLSearchParams({ path, format: "binary" });
+  const res = await fetch(`${baseURL}/api/load-mesh-from-path?${params}`);
+  return readBinaryMesh(res);
+}
+
+/**
+ * Télécharge un niveau de la pyramide LOD (fraction de sommets conservée).
+ * @param {string} path - Chemin du fichier .gii côté serveur.
+ * @param {number} level - Niveau (ex. 0.1, 0.25, 1.0).
+ * @param {boolean} [mapping=false] - Joindre le mapping sommet d'origine → niveau.
+ * @returns {Promise<{vertices: Float32Array, faces: Uint32Array,
+ *          mapping?: Uint32Array, lod: {level, levels, n_vertices_full}}>}
+ */
+export async function fetchMeshLOD(path, level, mapping = false, baseURL = "http://localhost:8000") {
+  const params = new URLSearchParams({ path, mapping, format: "binary" });
+  if (level !== undefined) params.set("level", level);
+  const res = await fetch(`${baseURL}/api/load-mesh-lod?${params}`);
+  return readBinaryMesh(res);
+}
+
+/**
+ * Chargement progressif : niveau le plus grossier d'abord, puis chaque
+ * niveau plus fin. ``onLevel(meshData)`` est appelé à chaque niveau reçu.
+ * @returns {Promise<object>} le niveau le plus fin.
+ */
+export async function fetchMeshProgressive(path, onLevel, baseURL = "http://localhost:8000") {
+  let data = await fetchMeshLOD(path, undefined, false, baseURL);
+  await onLevel(data);
+  for (const level of data.lod.levels.filter(l => l > data.lod.level)) {
+    data = await fetchMeshLOD(path, level, false, baseURL);
+    await onLevel(data);
+  }
+  return data;
+}
+
+/** Lit une réponse binaire décrite par l'en-tête X-Mesh-Layout. */
+async function readBinaryMesh(res) {
+  if (!res.ok) {
+    const payload = await res.json().catch(() => ({}));
+    throw new Error(payload.error || `HTTP ${res.status}: ${res.statusText}`);
+  }
+
+  // 2. Description des blocs (shape / dtype / offset) -------------
+  const layout = JSON.parse(res.headers.get("X-Mesh-Layout"));
+  const buffer = await res.arrayBuffer();
+
+  // 3. Vues typées sur le buffer (zéro copie) ---------------------
+  const [nv, dv] = layout.vertices.shape;
+  const [nf, df] = layout.faces.shape;
+  const mesh = {
+    vertices: new Float32Array(buffer, layout.vertices.offset, nv * dv),
+    faces: new Uint32Array(buffer, layout.faces.offset, nf * df)
+  };
+  if (layout.mapping) {
+    mesh.mapping = new Uint32Array(buffer, layout.mapping.offset, layout.mapping.shape[0]);
+  }
+  if (layout.lod) mesh.lod = layout.lod;
+  return mesh;
+}
+
+/**
+ * Télécharge un maillage au format compressé CVMZ (voir
+ * tools/mesh_compression.py) et le décode. Seul le codec gzip est
+ * décodable nativement par le navigateur (DecompressionStream).
+ * @returns {Promise<{vertices: Float32Array, faces: Uint32Array}>}
+ */
+export async function fetchMeshCompressed(path, baseURL = "http://localhost:8000") {
+  const params = new URLSearchParams({ path, format: "compressed" });
+  const res = await fetch(`${baseURL}/api/load-mesh-from-path?${params}`);
+  if (!res.ok) {
+    const payload = await res.json().catch(() => ({}));
+    throw new Error(payload.error || `HTTP ${res.status}: ${res.statusText}`);
+  }
+  return decodeCVMZ(await res.arrayBuffer());
+}
+
+/** Regroupe 4 plans d'octets (poids faibles d'abord) en entiers u32 dézigzagués. */
+function readZigzagPlanes(bytes, offset, count) {
+  const out = new Int32Array(count);
+  for (let i = 0; i < count; i++) {
+    const z = (bytes[offset + i]
+      | (bytes[offset + count + i] << 8)
+      | (bytes[offset + 2 * count + i] << 16)
+      | (bytes[offset + 3 * count + i] << 24)) >>> 0;
+    out[i] = (z >>> 1) ^ -(z & 1);
+  }
+  return out;
+}
+
+async function decodeCVMZ(buffer) {
+  const header = new DataView(buffer, 0, 8);
+  const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+  if (magic !== "CVMZ" || header.getUint8(4) !== 1) throw new Error("Données CVMZ invalides");
+  if (header.getUint8(5) !== 1) throw new Error("Codec CVMZ non supporté par le navigateur");
+
+  const stream = new Blob([buffer.slice(8)]).stream()
+    .pipeThrough(new DecompressionStream("gzip"));
+  const raw = await new Response(stream).arrayBuffer();
+  const view = new DataView(raw);
+  const bytes = new Uint8Array(raw);
+
+  const nv = view.getUint32(0, true);
+  const nf = view.getUint32(4, true);
+  const min = [0, 1, 2].map(i => view.getFloat32(8 + 4 * i, true));
+  const step = [0, 1, 2].map(i => view.getFloat32(20 + 4 * i, true));
+  let at = 32;
+
+  // positions : cumul des deltas par axe, puis déquantification
+  const dq = readZigzagPlanes(bytes, at, 3 * nv);
+  const vertices = new Float32Array(3 * nv);
+  const q = [0, 0, 0];
+  for (let i = 0; i < nv; i++) {
+    for (let k = 0; k < 3; k++) {
+      q[k] += dq[3 * i + k];
+      vertices[3 * i + k] = min[k] + q[k] * step[k];
+    }
+  }
+  at += 12 * nv;
+
+  // indices : cumul des deltas
+  const di = readZigzagPlanes(bytes, at, 3 * nf);
+  const faces = new Uint32Array(3 * nf);
+  let idx = 0;
+  for (let i = 0; i < 3 * nf; i++) {
+    idx += di[i];
+    faces[i] = idx;
+  }
+  return { vertices, faces };
+}
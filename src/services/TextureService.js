@@ -0,0 +1,86 @@
+// src/services/TextureService.js
+// ------------------------------------------------------------
+// Récupère plusieurs textures d'un maillage en une seule requête
+// binaire (/api/load-textures-batch) et les décode en Float32Array.
+// Encodages : float32, float16, uint16 / uint8 quantifiés
+// (valeur = code * scale + offset, code maximal = NaN).
+// NaN et ±Infinity sont reçus comme NaN quel que soit l'encodage.
+// Corps : longueur n (uint32 LE), n octets de description JSON, puis les
+// blocs à partir de 4 + n arrondi à 4 (byte_offset relatifs à ce début).
+// ------------------------------------------------------------
+
+/** Convertit des demi-flottants IEEE 754 (Uint16Array) en Float32Array. */
+function decodeFloat16(halves) {
+  const out = new Float32Array(halves.length);
+  for (let i = 0; i < halves.length; i++) {
+    const h = halves[i];
+    const sign = h & 0x8000 ? -1 : 1;
+    const exp = (h >> 10) & 0x1f;
+    const frac = h & 0x03ff;
+    if (exp === 0) out[i] = sign * frac * 2 ** -24;                 // sous-normal
+    else if (exp === 0x1f) out[i] = frac ? NaN : sign * Infinity;
+    else out[i] = sign * (1 + frac / 1024) * 2 ** (exp - 15);
+  }
+  return out;
+}
+
+/** Décode le bloc d'une texture décrite dans le préambule (données à partir de `base`). */
+function decodeTexture(buffer, base, desc) {
+  const { dtype, count, scale, offset, nan_code: nanCode } = desc;
+  const at = base + desc.byte_offset;
+  switch (dtype) {
+    case 'float32':
+      return new Float32Array(buffer, at, count);                   // zéro copie
+    case 'float16':
+      return decodeFloat16(new Uint16Array(buffer, at, count));
+    case 'uint16':
+    case 'uint8': {
+      const codes = dtype === 'uint16'
+        ? new Uint16Array(buffer, at, count)
+        : new Uint8Array(buffer, at, count);
+      const out = new Float32Array(count);
+      for (let i = 0; i < count; i++) {
+        out[i] = codes[i] === nanCode ? NaN : codes[i] * scale + offset;
+      }
+      return out;
+    }
+    default:
+      throw new Error(`Encodage inconnu : ${dtype}`);
+  }
+}
+
+/**
+ * Télécharge et décode un lot de textures.
+ * @param {string[]} paths - Chemins des textures .gii côté serveur.
+ * @param {string} [encoding="float32"] - float32 | float16 | uint16 | uint8
+ * @param {string} [baseURL="http://localhost:8000"] - Base de l'API.
+ * @param {number[]} [darrays=[0]] - Darrays (cartes) lus dans chaque fichier.
+ * @returns {Promise<Array<{name, path, darray, scalars?: Float32Array, min?, max?,
+ *          maxAbsError?, error?}>>}
+ */
+export async function fetchTextures(paths, encoding = 'float32', baseURL = 'http://localhost:8000',
+                                    darrays = [0]) {
+  // GET : une texture déjà reçue est revalidée par ETag (304, sans corps)
+  const params = new URLSearchParams({ encoding });
+  paths.forEach(p => params.append('paths', p));
+  darrays.forEach(d => params.append('darrays', d));
+  const res = await fetch(`${baseURL}/api/load-textures-batch?${params}`);
+  if (!res.ok) throw new Error(`HTTP ${res.status}: ${res.statusText}`);
+
+  const buffer = await res.arrayBuffer();
+  const length = new DataView(buffer).getUint32(0, true);
+  const layout = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 4, length)));
+  const base = Math.ceil((4 + length) / 4) * 4;
+
+  return layout.textures.map(desc => desc.error
+    ? { name: desc.name, path: desc.path, darray: desc.darray, error: desc.error }
+    : {
+        name: desc.name,
+        path: desc.path,
+        darray: desc.darray,
+        scalars: decodeTexture(buffer, base, desc),
+        min: desc.min,
+        max: desc.max,
+        maxAbsError: desc.max_abs_error
+      });
+}
@@ -81,19 +81,38 @@ function initResizeHandler(container, camera, renderer) {
   });
 }
 
-export function buildGeometry(data) {
+export function buildGeometry(data, center = null) {
   const geometry = new THREE.BufferGeometry();
-  geometry.setAttribute('position', new THREE.Float32BufferAttribute(data.vertices.flat(), 3));
-  geometry.setIndex(data.faces.flat());
+  // TypedArray (réponse binaire) utilisés tels quels, sinon listes JSON imbriquées
+  const positions = ArrayBuffer.isView(data.vertices)
+    ? data.vertices
+    : new Float32Array(data.vertices.flat());
+  geometry.setAttribute('position', new THREE.BufferAttribute(positions, 3));
+  geometry.setIndex(ArrayBuffer.isView(data.faces)
+    ? new THREE.BufferAttribute(data.faces, 1)
+    : data.faces.flat());
   geometry.computeVertexNormals();
   geometry.computeBoundingSphere();
 
-  const center = geometry.boundingSphere.center;
-  geometry.translate(-center.x, -center.y, -center.z);
+  // centre imposé (niveaux LOD successifs d'un même maillage) ou propre
+  const c = center ?? geometry.boundingSphere.center.clone();
+  geometry.translate(-c.x, -c.y, -c.z);
+  geometry.userData.center = c;
 
   return geometry;
 }
 
+/**
+ * Remplace la géométrie d'un mesh par un niveau plus fin du même maillage,
+ * en conservant le centrage du niveau précédent.
+ */
+export function refineMesh(mesh, data) {
+  const previous = mesh.geometry;
+  mesh.geometry = buildGeometry(data, previous.userData.center);
+  previous.dispose();
+  return mesh;
+}
+
 export function createMesh(meshData, scalars = null, cmapName = 'viridis', min = null, max = null) {
   const geometry = buildGeometry(meshData);
 
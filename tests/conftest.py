@@ -0,0 +1,38 @@
+import nibabel as nb
+import numpy as np
+import pytest
+
+
+def write_surface(path):
+    """Écrit un tétraèdre GIFTI et renvoie (coords, faces)."""
+    coords = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [0, 0, 1]], dtype=np.float32)
+    faces = np.array([[0, 1, 2], [0, 1, 3], [0, 2, 3], [1, 2, 3]], dtype=np.int32)
+    img = nb.gifti.GiftiImage(darrays=[
+        nb.gifti.GiftiDataArray(coords, intent="NIFTI_INTENT_POINTSET"),
+        nb.gifti.GiftiDataArray(faces, intent="NIFTI_INTENT_TRIANGLE"),
+    ])
+    nb.save(img, str(path))
+    return coords, faces
+
+
+def write_texture(path, *maps):
+    """Écrit une texture GIFTI avec un darray float32 par carte."""
+    img = nb.gifti.GiftiImage(darrays=[
+        nb.gifti.GiftiDataArray(np.asarray(m, dtype=np.float32)) for m in maps
+    ])
+    nb.save(img, str(path))
+
+
+def read_texture_batch(body):
+    """(description, blocs) d'un corps /load-textures-batch."""
+    import json
+    length = int.from_bytes(body[:4], "little")
+    layout = json.loads(body[4:4 + length])
+    return layout, body[(4 + length + 3) // 4 * 4:]
+
+
+@pytest.fixture
+def surface(tmp_path):
+    path = tmp_path / "lh.white.gii"
+    coords, faces = write_surface(path)
+    return path, coords, faces
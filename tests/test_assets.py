@@ -0,0 +1,49 @@
+import json
+
+import numpy as np
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from conftest import write_surface, write_texture
+
+
+def test_mesh_assets_served_from_manifest(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data/sub-01/surf").mkdir(parents=True)
+    write_surface(tmp_path / "data/sub-01/surf/lh.white.gii")
+    out_dir = tmp_path / "public/sub-01/cortexanalyzer"
+    out_dir.mkdir(parents=True)
+    write_texture(out_dir / "curv.gii", [-1.0, 0.5, 2.0, np.nan])
+    (out_dir / "normals.csv").write_text("nx,ny,nz\n0,0,1\n0,1,0\n1,0,0\n0,0,-1\n")
+
+    from routes import assets
+    from tools import asset_manifest
+
+    app = FastAPI()
+    app.include_router(assets.router, prefix="/api")
+    client = TestClient(app)
+    assets.invalidate_manifest()
+
+    res = client.get("/api/mesh-assets/", params={"mesh": "data/sub-01/surf/lh.white.gii"}).json()
+    tex, = res["textures"]
+    assert (tex["name"], tex["n_vertices"], tex["dtype"]) == ("curv.gii", 4, "float32")
+    assert (tex["min"], tex["max"]) == (-1.0, 2.0)
+    assert len(tex["sha256"]) == 64
+    assert res["normals"][0]["n_vertices"] == 4
+    assert json.loads((out_dir / "manifest.json").read_text())["assets"].keys() == {"curv.gii", "normals.csv"}
+
+    # nouvelle sortie : invisible tant que le cache n'est pas invalidé,
+    # puis seul le nouveau fichier est relu
+    write_texture(out_dir / "depth.gii", [0, 1, 2, 3])
+    described = []
+    real_describe = asset_manifest.describe_asset
+    monkeypatch.setattr(asset_manifest, "describe_asset",
+                        lambda p: described.append(p.name) or real_describe(p))
+
+    res = client.get("/api/mesh-assets/", params={"mesh": "data/sub-01/surf/lh.white.gii"}).json()
+    assert len(res["textures"]) == 1
+
+    assets.invalidate_manifest(out_dir)
+    res = client.get("/api/mesh-assets/", params={"mesh": "data/sub-01/surf/lh.white.gii"}).json()
+    assert [t["name"] for t in res["textures"]] == ["curv.gii", "depth.gii"]
+    assert described == ["depth.gii"]
@@ -0,0 +1,55 @@
+import numpy as np
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from scipy.spatial import ConvexHull
+
+from conftest import write_surface
+
+
+def _sphere(n=2000, radius=2.0):
+    i = np.arange(n) + 0.5
+    phi = np.arccos(1 - 2 * i / n)
+    theta = np.pi * (1 + 5 ** 0.5) * i
+    v = radius * np.stack([np.cos(theta) * np.sin(phi),
+                           np.sin(theta) * np.sin(phi),
+                           np.cos(phi)], axis=1)
+    return v, ConvexHull(v).simplices
+
+
+def test_sphere_curvatures():
+    from tools.curvature import compute_curvature_arrays
+
+    radius = 2.0
+    vertices, faces = _sphere(radius=radius)
+    curv = compute_curvature_arrays(vertices, faces, vertices / radius)
+
+    np.testing.assert_allclose(np.median(curv["mean"]), 1 / radius, rtol=1e-3)
+    np.testing.assert_allclose(np.median(curv["gaussian"]), 1 / radius**2, rtol=1e-2)
+    np.testing.assert_allclose(curv["mean"], 1 / radius, rtol=0.05)
+    assert (curv["k1"] >= curv["k2"]).all()
+
+
+def test_compute_curvature_route_per_mesh_output(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "uploads").mkdir()
+    write_surface(tmp_path / "uploads" / "a_lh.white.gii")
+    coords, _ = write_surface(tmp_path / "uploads" / "b_rh.white.gii")
+
+    from routes import compute_curvature, upload_store
+
+    upload_store.register("a", "uploads/a_lh.white.gii", "lh.white.gii")
+    upload_store.register("b", "uploads/b_rh.white.gii", "rh.white.gii")
+
+    app = FastAPI()
+    app.include_router(compute_curvature.router, prefix="/api")
+    client = TestClient(app)
+
+    res = client.post("/api/compute-curvature", data={"mesh_ids": ["a", "b", "missing"]})
+    assert res.status_code == 200
+    body = res.json()
+    assert [r["id"] for r in body] == ["a", "b"]
+    assert all(len(r["scalars"]) == len(coords) for r in body)
+
+    # même contenu → même fichier en cache, recalcul inutile
+    outputs = list((tmp_path / "public" / "curvature").glob("*_curvature.gii"))
+    assert len(outputs) == 1
@@ -0,0 +1,41 @@
+import asyncio
+import time
+
+import httpx
+import numpy as np
+from fastapi import FastAPI
+
+
+def test_concurrent_requests_stay_fast_during_large_load(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "public/textures").mkdir(parents=True)
+    from routes import texture
+
+    def slow_load(path):
+        time.sleep(1.0)                     # simule le décodage d'une grosse texture
+        return np.zeros(10, dtype=np.float32)
+
+    monkeypatch.setattr(texture, "load_scalar_array", slow_load)
+
+    app = FastAPI()
+    app.include_router(texture.router, prefix="/api")
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            t0 = time.perf_counter()
+            slow = asyncio.create_task(client.post(
+                "/api/upload-texture", json={"texture_paths": ["big.gii"]}))
+            await asyncio.sleep(0.1)        # le chargement est en cours
+            fast_res = await client.post(
+                "/api/associate-textures", json={"meshes": [], "textures": []})
+            # latence mesurée depuis l'instant prévu d'envoi de la requête rapide
+            fast_latency = time.perf_counter() - t0 - 0.1
+            slow_res = await slow
+            return slow_res, fast_res, fast_latency, time.perf_counter() - t0
+
+    slow_res, fast_res, fast_latency, total = asyncio.run(scenario())
+
+    assert slow_res.status_code == 200 and fast_res.status_code == 200
+    assert total >= 1.0
+    assert fast_latency < 0.5
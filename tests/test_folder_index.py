@@ -0,0 +1,85 @@
+import os
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+
+def _touch(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("x")
+
+
+def test_incremental_refresh(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    from routes import folder_index
+
+    root = tmp_path / "bids"
+    for sub in ("01", "02"):
+        _touch(root / f"sub-{sub}" / "anat" / f"sub-{sub}_hemi-L.surf.gii")
+        _touch(root / f"sub-{sub}" / "anat" / "normals.csv")
+    _touch(root / "README")
+
+    assert folder_index.refresh(root) == 5          # racine + 2 × (sub, anat)
+    assert folder_index.refresh(root) == 0          # rien n'a changé : aucun scandir
+
+    _touch(root / "sub-02" / "anat" / "curv.gii")
+    assert folder_index.refresh(root) == 1          # seul le dossier modifié est relu
+
+    files, total = folder_index.query(root, [".gii"], subject="02")
+    assert total == 2
+    assert files == [os.path.join("sub-02", "anat", "curv.gii"),
+                     os.path.join("sub-02", "anat", "sub-02_hemi-L.surf.gii")]
+
+    for f in (root / "sub-01" / "anat").iterdir():
+        f.unlink()
+    (root / "sub-01" / "anat").rmdir()
+    files, total = folder_index.query(root, ["gii", "csv"])
+    assert total == 3
+    assert all(f.startswith("sub-02") for f in files)
+
+
+def test_symlinks_not_followed_and_subject_from_directory(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    from routes import folder_index
+
+    root = tmp_path / "data"
+    _touch(root / "sub-01" / "a.gii")
+    _touch(root / "sub-02_hemi-L.surf.gii")          # fichier à la racine : pas de sujet
+    os.symlink("..", root / "sub-01" / "loop")
+    _touch(root / "sub-01" / ".normals.csv.npy")      # sidecar caché
+
+    files, total = folder_index.query(root, [".gii"])
+    assert total == 2
+    assert folder_index.query(root, [".npy"])[1] == 0
+    assert folder_index.query(root, [".gii"], subject="01")[0] == [os.path.join("sub-01", "a.gii")]
+    assert folder_index.query(root, [".gii"], subject="02")[1] == 0
+
+
+def test_list_folder_files_paginated(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    from routes import folders
+
+    app = FastAPI()
+    app.include_router(folders.router, prefix="/api")
+    client = TestClient(app)
+
+    for i in range(5):
+        _touch(tmp_path / "data" / f"sub-{i:02d}" / "lh.gii")
+    _touch(tmp_path / "data" / "notes.txt")
+
+    res = client.post("/api/list-folder-files",
+                      json={"path": str(tmp_path / "data"), "offset": 1, "limit": 2}).json()
+    assert res["total"] == 5
+    assert res["files"] == [os.path.join("sub-01", "lh.gii"), os.path.join("sub-02", "lh.gii")]
+
+    # offset / limit nuls : valeurs par défaut ; invalides : 400
+    res = client.post("/api/list-folder-files",
+                      json={"path": str(tmp_path / "data"), "offset": None, "limit": None}).json()
+    assert len(res["files"]) == 5
+    for bad in ({"offset": -1}, {"limit": "deux"}, {"limit": -3}, {"offset": 1.5}):
+        res = client.post("/api/list-folder-files", json={"path": str(tmp_path / "data"), **bad})
+        assert res.status_code == 400
+
+    res = client.get("/api/select-folder", params={"subject": "sub-03"}).json()
+    assert res["files"] == [os.path.join("sub-03", "lh.gii")]
+    assert client.get("/api/select-folder").json()["total"] == 6
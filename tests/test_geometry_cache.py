@@ -0,0 +1,30 @@
+import numpy as np
+
+
+def test_geometry_persisted_and_reused(monkeypatch, tmp_path, surface):
+    path, coords, faces = surface
+    from tools import geometry_cache
+
+    monkeypatch.setattr(geometry_cache, "GEOMETRY_CACHE_DIR", tmp_path / "geometry")
+    monkeypatch.setattr(geometry_cache, "_geometries", type(geometry_cache._geometries)())
+
+    geom = geometry_cache.get_geometry(path)
+    assert geometry_cache.get_geometry(path) is geom
+
+    normals = np.asarray(geom.vertex_normals)
+    np.testing.assert_allclose(np.linalg.norm(normals, axis=1), 1)
+
+    assert geom.vertex_faces.shape == (4, 4)
+    assert (geom.vertex_faces.sum(axis=1) == 3).all()
+    assert geom.vertex_adjacency.nnz == 12
+
+    stored = sorted(p.name for p in (tmp_path / "geometry").iterdir())
+    assert any(name.endswith("_vertex_normals.npy") for name in stored)
+
+    # nouveau processus simulé : relu depuis le disque, sans recalcul
+    geometry_cache._geometries.clear()
+    calls = []
+    again = geometry_cache.get_geometry(path)
+    again.cached_array("vertex_normals", lambda: calls.append(1))
+    assert calls == []
+    np.testing.assert_allclose(again.vertex_normals, normals)
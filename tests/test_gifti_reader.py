@@ -0,0 +1,34 @@
+import nibabel as nb
+import numpy as np
+import pytest
+
+from tools.gifti_reader import gifti_index, read_darray, read_darrays
+
+
+@pytest.mark.parametrize("encoding", ["ASCII", "B64BIN", "B64GZ"])
+def test_read_darray_matches_nibabel(tmp_path, encoding):
+    rng = np.random.default_rng(0)
+    arrays = [rng.normal(size=(20, 3)).astype(np.float32),
+              rng.integers(0, 20, (10, 3)).astype(np.int32),
+              rng.integers(0, 255, 7).astype(np.uint8)]
+    path = tmp_path / "multi.gii"
+    nb.save(nb.gifti.GiftiImage(darrays=[
+        nb.gifti.GiftiDataArray(a, encoding=encoding) for a in arrays
+    ]), str(path))
+
+    assert [d["shape"] for d in gifti_index(path)] == [(20, 3), (10, 3), (7,)]
+    reference = nb.load(str(path))
+    for i, darray in enumerate(reference.darrays):
+        arr = read_darray(path, i)
+        assert arr.dtype == darray.data.dtype
+        np.testing.assert_array_equal(arr, darray.data)     # ASCII : précision du fichier
+    np.testing.assert_array_equal(read_darrays(path, [2, 0])[0], arrays[2])
+
+
+def test_read_darray_out_of_range(tmp_path):
+    path = tmp_path / "tex.gii"
+    nb.save(nb.gifti.GiftiImage(darrays=[
+        nb.gifti.GiftiDataArray(np.zeros(4, np.float32))
+    ]), str(path))
+    with pytest.raises(IndexError):
+        read_darray(path, 3)
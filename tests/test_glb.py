@@ -0,0 +1,62 @@
+import struct
+
+import numpy as np
+
+from conftest import write_texture
+from tools.mesh_to_glb import generate_glb, read_glb_json
+
+
+def _accessor_array(glb, gltf, index, dtype):
+    accessor = gltf["accessors"][index]
+    view = gltf["bufferViews"][accessor["bufferView"]]
+    json_len, = struct.unpack_from("<I", glb, 12)
+    bin_start = 12 + 8 + json_len + 8
+    start = bin_start + view["byteOffset"]
+    return np.frombuffer(glb[start:start + view["byteLength"]], dtype=dtype)
+
+
+def test_glb_bundle_contains_mesh_and_textures(tmp_path, surface):
+    path, coords, faces = surface
+    write_texture(tmp_path / "curv.gii", [0.1, 0.2, 0.3, 0.4])
+    write_texture(tmp_path / "wrong_size.gii", [1.0, 2.0])
+
+    glb_path, included = generate_glb(
+        path, [tmp_path / "curv.gii", tmp_path / "wrong_size.gii"], tmp_path / "bundles"
+    )
+    assert included == ["curv"]
+
+    glb = glb_path.read_bytes()
+    magic, version, total = struct.unpack_from("<III", glb, 0)
+    assert (magic, version, total) == (0x46546C67, 2, len(glb))
+
+    gltf = read_glb_json(glb_path)
+    prim = gltf["meshes"][0]["primitives"][0]
+    np.testing.assert_array_equal(
+        _accessor_array(glb, gltf, prim["attributes"]["POSITION"], "<f4").reshape(-1, 3), coords)
+    np.testing.assert_array_equal(
+        _accessor_array(glb, gltf, prim["indices"], "<u4").reshape(-1, 3), faces)
+    np.testing.assert_allclose(
+        _accessor_array(glb, gltf, prim["attributes"]["_CURV"], "<f4"), [0.1, 0.2, 0.3, 0.4],
+        rtol=1e-6)
+
+    again, _ = generate_glb(
+        path, [tmp_path / "curv.gii", tmp_path / "wrong_size.gii"], tmp_path / "bundles"
+    )
+    assert again == glb_path
+
+
+def test_glb_nan_texture_and_same_stem(tmp_path, surface):
+    path, _, _ = surface
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    write_texture(tmp_path / "a/curv.gii", [np.nan, 1.0, np.nan, 3.0])
+    write_texture(tmp_path / "b/curv.gii", [np.nan] * 4)
+
+    glb_path, included = generate_glb(
+        path, [tmp_path / "a/curv.gii", tmp_path / "b/curv.gii"], tmp_path / "bundles"
+    )
+    assert included == ["curv", "curv_2"]
+    gltf = read_glb_json(glb_path)                      # JSON strict : pas de NaN
+    accessors = [gltf["accessors"][t["accessor"]] for t in gltf["meshes"][0]["extras"]["textures"]]
+    assert (accessors[0]["min"], accessors[0]["max"]) == ([1.0], [3.0])
+    assert "min" not in accessors[1] and "max" not in accessors[1]
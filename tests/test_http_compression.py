@@ -0,0 +1,68 @@
+import numpy as np
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from conftest import write_texture
+
+
+def _client(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    from routes import texture
+    from routes.compression import CompressionMiddleware
+    from routes.http_cache import ETagMiddleware
+
+    app = FastAPI()
+    app.add_middleware(ETagMiddleware)
+    app.add_middleware(CompressionMiddleware)
+    app.include_router(texture.router, prefix="/api")
+
+    @app.get("/api/status")
+    def status():
+        return {"values": list(range(1000))}
+
+    return TestClient(app)
+
+
+def test_texture_json_compressed_and_revalidated(monkeypatch, tmp_path):
+    client = _client(monkeypatch, tmp_path)
+    values = np.linspace(0, 1, 5000)
+    write_texture(tmp_path / "curv.gii", values)
+    params = {"paths": ["curv.gii"]}
+
+    first = client.get("/api/load-texture-paths", params=params,
+                       headers={"Accept-Encoding": "gzip"})
+    assert first.status_code == 200
+    assert first.headers["content-encoding"] == "gzip"
+    assert first.headers["etag"].endswith('-gzip"')
+    assert np.allclose(first.json()[0]["scalars"], values)
+
+    cached = client.get("/api/load-texture-paths", params=params,
+                        headers={"Accept-Encoding": "gzip", "If-None-Match": first.headers["etag"]})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["etag"] == first.headers["etag"]
+
+    # la texture change : nouvel ETag, corps renvoyé
+    write_texture(tmp_path / "curv.gii", values * 2)
+    changed = client.get("/api/load-texture-paths", params=params,
+                         headers={"Accept-Encoding": "gzip", "If-None-Match": first.headers["etag"]})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != first.headers["etag"]
+
+
+def test_etag_middleware_on_json(monkeypatch, tmp_path):
+    client = _client(monkeypatch, tmp_path)
+
+    plain = client.get("/api/status", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    etag = plain.headers["etag"]
+
+    cached = client.get("/api/status", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+
+    # 304 d'une réponse compressée : même ETag (suffixé) que le 200
+    gzipped = client.get("/api/status", headers={"Accept-Encoding": "gzip"})
+    assert gzipped.headers["etag"] == etag[:-1] + '-gzip"'
+    cached = client.get("/api/status", headers={"Accept-Encoding": "gzip",
+                                                "If-None-Match": gzipped.headers["etag"]})
+    assert cached.status_code == 304 and cached.headers["etag"] == gzipped.headers["etag"]
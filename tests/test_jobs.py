@@ -0,0 +1,142 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from conftest import write_texture
+
+
+def _client(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    from routes import db_generation, jobs, mesh
+
+    for d in ("public/meshes", "public/textures", "public/bundles"):
+        (tmp_path / d).mkdir(parents=True, exist_ok=True)
+
+    app = FastAPI()
+    app.include_router(mesh.router, prefix="/api")
+    app.include_router(db_generation.router, prefix="/api")
+    app.include_router(jobs.router, prefix="/api")
+    return TestClient(app)
+
+
+def test_generate_database_runs_as_job_with_partial_failures(monkeypatch, tmp_path, surface):
+    path, _, _ = surface
+    write_texture(tmp_path / "curv.gii", [0.1, 0.2, 0.3, 0.4])
+    (tmp_path / "sub-02").mkdir()
+    write_texture(tmp_path / "sub-02" / "curv.gii", [0.5, 0.6, 0.7, 0.8])
+    client = _client(monkeypatch, tmp_path)
+
+    res = client.post("/api/generate-database", json={
+        "meshes": [str(path), str(tmp_path / "missing.gii")],
+        "textures": [str(tmp_path / "curv.gii"), str(tmp_path / "sub-02" / "curv.gii")],
+    })
+    assert res.json()["status"] == "started"
+
+    # TestClient exécute les tâches de fond avant de rendre la main
+    progress = client.get(f"/api/progress/{res.json()['job_id']}").json()
+    assert progress["status"] == "done" and progress["progress"] == 100
+
+    results = progress["results"]
+    assert [m["mesh_path"] for m in results["meshes"]] == [str(path)]
+    # deux textures de même nom : deux JSON distincts, écrits sans fichier temporaire résiduel
+    names = [t["json"] for t in results["textures"]]
+    assert len(set(names)) == 2 and all(n.startswith("curv-") for n in names)
+    assert sorted(p.name for p in (tmp_path / "public/textures").iterdir()) == sorted(
+        names + ["associations.json"])
+    assert results["bundles"][0]["textures"] == ["curv", "curv_2"]
+    assert [e["path"] for e in results["errors"]] == [str(tmp_path / "missing.gii")]
+
+
+def test_upload_mesh_returns_job(monkeypatch, tmp_path, surface):
+    path, _, _ = surface
+    client = _client(monkeypatch, tmp_path)
+
+    job_id = client.post("/api/upload-mesh", json={"mesh_paths": [str(path)]}).json()["job_id"]
+    results = client.get(f"/api/progress/{job_id}").json()["results"]
+    assert results[0]["mesh_path"] == str(path)
+    assert (tmp_path / "public/meshes" / results[0]["json"]).exists()
+
+
+def test_progress_stream_pushes_deltas_until_done(monkeypatch, tmp_path):
+    import json
+    import threading
+    import time
+
+    from routes import jobs
+
+    monkeypatch.setattr(jobs, "SSE_MIN_INTERVAL", 0.01)
+    client = _client(monkeypatch, tmp_path)
+    job_id = jobs.create_job(2)
+    jobs.job_log(job_id, "démarrage")
+
+    def work():
+        time.sleep(0.2)
+        jobs.set_progress(job_id, 0.5, "sujet 1 terminé")
+        time.sleep(0.2)
+        jobs.finish_job(job_id, ["ok"])
+
+    threading.Thread(target=work).start()
+
+    events = []
+    with client.stream("GET", f"/api/progress/{job_id}/stream") as res:
+        assert res.headers["content-type"].startswith("text/event-stream")
+        kind = None
+        for line in res.iter_lines():
+            if line.startswith("event: "):
+                kind = line[len("event: "):]
+            elif line.startswith("data: "):
+                events.append((kind, json.loads(line[len("data: "):])))
+
+    assert events[0][1]["logs"] == ["démarrage"]
+    assert ["sujet 1 terminé"] in [e["logs"] for _, e in events]
+    assert events[-1][0] == "done" and events[-1][1]["results"] == ["ok"]
+    all_logs = [line for _, e in events for line in e["logs"]]
+    assert all_logs == ["démarrage", "sujet 1 terminé"]
+
+
+def test_progress_stream_resumes_and_ends_for_evicted_job(monkeypatch, tmp_path):
+    import asyncio
+
+    from routes import jobs
+
+    client = _client(monkeypatch, tmp_path)
+    job_id = jobs.create_job(1)
+    for i in range(3):
+        jobs.job_log(job_id, f"ligne {i}")
+    jobs.finish_job(job_id, ["ok"])
+
+    # reconnexion : seules les lignes postérieures à Last-Event-ID sont renvoyées
+    res = client.get(f"/api/progress/{job_id}/stream", headers={"Last-Event-ID": "2"})
+    assert "id: 3\n" in res.text and '"logs": ["ligne 2"]' in res.text
+
+    async def collect():
+        return [chunk async for chunk in jobs._progress_events("évincé")]
+
+    (chunk,) = asyncio.run(collect())
+    assert chunk.startswith("event: done\n") and '"status": "expired"' in chunk
+
+
+def test_registry_is_bounded(monkeypatch, tmp_path):
+    from routes import jobs
+
+    monkeypatch.setattr(jobs, "LOG_RING_SIZE", 3)
+    monkeypatch.setattr(jobs, "MAX_FINISHED_JOBS", 2)
+    monkeypatch.setattr(jobs, "JOB_LOG_DIR", tmp_path / "logs")
+    monkeypatch.setattr(jobs, "progress_registry", {})
+
+    job_id = jobs.create_job(1)
+    for i in range(10):
+        jobs.job_log(job_id, f"ligne {i}")
+    assert list(jobs.progress_registry[job_id]["logs"]) == ["ligne 7", "ligne 8", "ligne 9"]
+    assert (tmp_path / "logs" / f"{job_id}.log").read_text().count("\n") == 10
+
+    finished = []
+    for _ in range(4):
+        jid = jobs.create_job(1)
+        jobs.finish_job(jid)
+        finished.append(jid)
+    assert set(jobs.progress_registry) == {job_id, *finished[-2:]}   # job en cours conservé
+
+    monkeypatch.setattr(jobs, "JOB_TTL", 0)
+    jobs.create_job(1)
+    assert job_id in jobs.progress_registry
+    assert not set(finished) & set(jobs.progress_registry)
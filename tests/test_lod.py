@@ -0,0 +1,73 @@
+import json
+
+import nibabel as nb
+import numpy as np
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from scipy.spatial import ConvexHull
+
+from conftest import read_texture_batch, write_texture
+
+
+def _sphere(n=4000):
+    i = np.arange(n) + 0.5
+    phi = np.arccos(1 - 2 * i / n)
+    theta = np.pi * (1 + 5 ** 0.5) * i
+    v = np.stack([np.cos(theta) * np.sin(phi), np.sin(theta) * np.sin(phi), np.cos(phi)], 1)
+    return v, ConvexHull(v).simplices
+
+
+def _write_sphere(path):
+    v, f = _sphere()
+    nb.save(nb.gifti.GiftiImage(darrays=[
+        nb.gifti.GiftiDataArray(v.astype(np.float32), intent="NIFTI_INTENT_POINTSET"),
+        nb.gifti.GiftiDataArray(f.astype(np.int32), intent="NIFTI_INTENT_TRIANGLE"),
+    ]), str(path))
+    return v, f
+
+
+def test_decimate_levels_and_mapping():
+    from tools.mesh_lod import decimate, resample_texture
+
+    v, f = _sphere()
+
+    level = decimate(v, f, v, 0.25)
+    n_level = len(level["vertices"])
+    assert abs(n_level - 1000) < 100
+    assert level["faces"].max() < n_level
+    # chaque sommet du niveau est un sommet d'origine de son propre cluster
+    np.testing.assert_array_equal(level["vertices"], v[level["source"]].astype(np.float32))
+    np.testing.assert_array_equal(level["mapping"][level["source"]], np.arange(n_level))
+
+    resampled = resample_texture(v[:, 2], level["mapping"], n_level)
+    assert np.abs(resampled - level["vertices"][:, 2]).max() < 0.15
+
+
+def test_lod_endpoint_and_resampled_textures(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    v, _ = _write_sphere(tmp_path / "sphere.gii")
+    write_texture(tmp_path / "z.gii", v[:, 2])
+
+    from routes import mesh, texture
+
+    app = FastAPI()
+    app.include_router(mesh.router, prefix="/api")
+    app.include_router(texture.router, prefix="/api")
+    client = TestClient(app)
+
+    res = client.post("/api/load-mesh-lod", json={"path": "sphere.gii", "level": 0.1, "mapping": True})
+    assert res.status_code == 200
+    layout = json.loads(res.headers["X-Mesh-Layout"])
+    assert layout["lod"]["level"] == 0.1 and layout["lod"]["n_vertices_full"] == len(v)
+    n_level = layout["vertices"]["shape"][0]
+    assert n_level < len(v) // 5
+    mapping = np.frombuffer(res.content, dtype="<u4", offset=layout["mapping"]["offset"],
+                            count=layout["mapping"]["shape"][0])
+    assert len(mapping) == len(v) and mapping.max() == n_level - 1
+
+    assert client.post("/api/load-mesh-lod", json={"path": "sphere.gii", "level": 0.3}).status_code == 400
+
+    tex = client.post("/api/load-textures-batch",
+                      json={"paths": ["z.gii"], "mesh": "sphere.gii", "level": 0.1})
+    desc = read_texture_batch(tex.content)[0]["textures"][0]
+    assert desc["count"] == n_level
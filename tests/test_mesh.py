@@ -0,0 +1,107 @@
+import json
+
+import numpy as np
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+
+def _client(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    from routes import mesh
+
+    app = FastAPI()
+    app.include_router(mesh.router, prefix="/api")
+    return TestClient(app)
+
+
+def test_load_mesh_binary_matches_json(monkeypatch, tmp_path, surface):
+    _, coords, faces = surface
+    client = _client(monkeypatch, tmp_path)
+
+    res_json = client.post("/api/load-mesh-from-path", json={"path": "lh.white.gii"})
+    res_bin = client.post("/api/load-mesh-from-path",
+                          json={"path": "lh.white.gii", "format": "binary"})
+
+    assert res_json.status_code == 200 and res_bin.status_code == 200
+    assert res_bin.headers["content-type"] == "application/octet-stream"
+
+    layout = json.loads(res_bin.headers["X-Mesh-Layout"])
+    v = layout["vertices"]
+    f = layout["faces"]
+    vertices = np.frombuffer(res_bin.content, dtype="<f4", count=np.prod(v["shape"]),
+                             offset=v["offset"]).reshape(v["shape"])
+    tris = np.frombuffer(res_bin.content, dtype="<u4", count=np.prod(f["shape"]),
+                         offset=f["offset"]).reshape(f["shape"])
+
+    np.testing.assert_array_equal(vertices, coords)
+    np.testing.assert_array_equal(tris, faces)
+    assert res_json.json()["vertices"] == vertices.tolist()
+    assert res_json.json()["faces"] == tris.tolist()
+
+
+def test_threejs_json_is_cached_and_invalidated(tmp_path, surface):
+    from tools.mesh_to_threejs_json import generate_threejs_json, invalidate_threejs_json
+
+    path, coords, faces = surface
+    out = tmp_path / "meshes"
+
+    first = generate_threejs_json(path, out)
+    second = generate_threejs_json(path, out)
+    assert first == second
+    assert [p.name for p in out.iterdir()] == [first.name]
+
+    data = json.loads(first.read_text())
+    assert data["data"]["attributes"]["position"]["array"] == coords.ravel().tolist()
+    assert data["data"]["index"]["array"] == faces.ravel().tolist()
+
+    assert invalidate_threejs_json(out, path) == [first]
+    assert not first.exists()
+
+
+def test_conversion_cache_evicts_least_recently_used(tmp_path):
+    import os
+    from tools.conversion_cache import ConversionCache
+
+    sources = []
+    for i in range(3):
+        src = tmp_path / f"src{i}.gii"
+        src.write_bytes(bytes([i]) * 10)
+        sources.append(src)
+
+    cache = ConversionCache(tmp_path / "cache", max_bytes=250)
+    paths = []
+    for t, src in enumerate(sources):
+        p = cache.get_or_create(src, ".bin", lambda tmp: tmp.write_bytes(b"x" * 100))
+        os.utime(p, ns=(t * 10**9, t * 10**9))
+        paths.append(p)
+
+    assert not paths[0].exists()
+    assert paths[1].exists() and paths[2].exists()
+
+
+def test_get_cache_shared_per_directory(monkeypatch, tmp_path):
+    from tools.conversion_cache import get_cache
+
+    monkeypatch.chdir(tmp_path)
+    assert get_cache("cache") is get_cache(tmp_path / "cache")
+    assert get_cache("cache") is not get_cache("other")
+
+
+def test_streaming_writer_matches_json_dump(tmp_path, monkeypatch, surface):
+    from tools import mesh_to_threejs_json as m2j
+
+    path, coords, faces = surface
+    monkeypatch.setattr(m2j, "CHUNK_SIZE", 5)
+    out = tmp_path / "mesh.json"
+    m2j.write_threejs_json(path, out)
+
+    expected = {
+        "metadata": m2j.METADATA,
+        "data": {
+            "attributes": {"position": {"itemSize": 3, "type": "Float32Array",
+                                        "array": coords.ravel().tolist(),
+                                        "normalized": False}},
+            "index": {"type": "Uint32Array", "array": faces.ravel().tolist()},
+        },
+    }
+    assert json.loads(out.read_text()) == expected
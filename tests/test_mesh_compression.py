@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from tools.mesh_compression import decode_mesh, encode_mesh, quantization_step, reorder_faces
+
+
+def _surface(n=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    i = np.arange(n) + 0.5
+    phi = np.arccos(1 - 2 * i / n)
+    theta = np.pi * (1 + 5 ** 0.5) * i
+    r = 60 + rng.normal(0, 2, n)                     # surface bosselée, coordonnées en mm
+    v = r[:, None] * np.stack([np.cos(theta) * np.sin(phi),
+                               np.sin(theta) * np.sin(phi), np.cos(phi)], 1)
+    from scipy.spatial import ConvexHull
+    return v.astype(np.float32) + [10, -20, 5], ConvexHull(v).simplices.astype(np.int32)
+
+
+def _canonical(faces):
+    """Triangles comparables indépendamment de l'ordre et de la rotation (orientation gardée)."""
+    r = reorder_faces(faces)
+    return r[np.lexsort(r.T[::-1])]
+
+
+def test_roundtrip_error_bounds():
+    vertices, faces = _surface()
+    data = encode_mesh(vertices, faces)
+    decoded_v, decoded_f = decode_mesh(data)
+
+    _, step = quantization_step(vertices)
+    err = np.abs(decoded_v.astype(np.float64) - vertices)
+    # demi-pas de quantification + arrondi float32 du résultat
+    assert (err <= step / 2 + np.abs(vertices) * 2 ** -23).all()
+    np.testing.assert_array_equal(_canonical(decoded_f), _canonical(faces))
+
+    assert len(data) < (vertices.nbytes + faces.nbytes) / 3
+
+
+def test_degenerate_and_zstd():
+    flat = np.array([[0, 0, 1], [1, 0, 1], [0, 1, 1]], dtype=np.float32)
+    v, f = decode_mesh(encode_mesh(flat, [[0, 1, 2]]))
+    np.testing.assert_array_equal(v, flat)           # étendue nulle en z : exact
+
+    pytest.importorskip("zstandard")
+    vertices, faces = _surface(500)
+    v, _ = decode_mesh(encode_mesh(vertices, faces, codec="zstd"))
+    _, step = quantization_step(vertices)
+    assert (np.abs(v - vertices) <= step).all()
+
+
+def test_compressed_endpoint(monkeypatch, tmp_path, surface):
+    path, coords, faces = surface
+    monkeypatch.chdir(tmp_path)
+    from routes import mesh
+
+    app = FastAPI()
+    app.include_router(mesh.router, prefix="/api")
+    client = TestClient(app)
+
+    res = client.post("/api/load-mesh-from-path", json={"path": str(path), "format": "compressed"})
+    assert res.status_code == 200
+    v, f = decode_mesh(res.content)
+    _, step = quantization_step(coords)
+    assert (np.abs(v - coords) <= step / 2 + 1e-6).all()
+    np.testing.assert_array_equal(_canonical(f), _canonical(faces))
@@ -0,0 +1,121 @@
+import time
+
+from routes import job_store, package_runner
+from routes.jobs import progress_registry
+
+REGISTRY = '''
+import time
+from pathlib import Path
+
+
+def analyze(subject_dir, out_dir, cfg, progress_callback=None):
+    """Échoue sur sub-02 tant que le fichier marqueur n'existe pas."""
+    progress_callback(0.5, "moitié")
+    if subject_dir.endswith("sub-02") and not Path(cfg["step_01_fake"]["marker"]).exists():
+        raise RuntimeError("marqueur absent")
+    (Path(out_dir) / "out.txt").write_text("ok")
+    return {"subject": Path(subject_dir).name}
+
+
+def slow(subject_dir, out_dir, cfg, progress_callback=None):
+    """Refuse de partager son dossier de sortie, puis tourne jusqu'à annulation."""
+    busy = Path(out_dir) / "busy"
+    if busy.exists():
+        raise RuntimeError("dossier de sortie partagé")
+    busy.write_text("")
+    try:
+        for i in range(cfg["step_01_fake"]["steps"]):
+            progress_callback(i / 1000, "")
+            time.sleep(0.05)
+    finally:
+        busy.unlink()
+
+
+EXPORTED_FUNCTIONS = {"analyze": {"function": analyze}, "slow": {"function": slow}}
+'''
+
+
+def _wait_done(job_id, timeout=60):
+    t0 = time.time()
+    while time.time() - t0 < timeout:
+        if progress_registry.get(job_id, {}).get("status") == "done":
+            return progress_registry[job_id]
+        time.sleep(0.05)
+    raise TimeoutError(job_id)
+
+
+def _setup(monkeypatch, tmp_path, name):
+    pkg = tmp_path / "pkgs" / name
+    pkg.mkdir(parents=True)
+    (pkg / "__init__.py").write_text("")
+    (pkg / "api_registry.py").write_text(REGISTRY)
+    monkeypatch.syspath_prepend(str(tmp_path / "pkgs"))
+    monkeypatch.setattr(job_store, "JOB_DB", tmp_path / "jobs.sqlite")
+    monkeypatch.setattr(package_runner, "PUBLIC_DIR", tmp_path / "public")
+    # workers neufs : leur sys.path doit contenir le package de ce test
+    if package_runner._pool is not None:
+        package_runner._pool.shutdown()
+        package_runner._pool = None
+
+
+def test_batch_jobs_persist_retry_and_resume(monkeypatch, tmp_path):
+    _setup(monkeypatch, tmp_path, "fakepkg_runner")
+
+    marker = tmp_path / "marker"
+    meshes = [str(tmp_path / f"data/sub-0{i}/surf/lh.white.gii") for i in (1, 2)]
+    cfg = {"marker": str(marker)}
+
+    # 1) premier passage : sub-02 échoue sans bloquer sub-01
+    package_runner.start_job("job-1", "fakepkg_runner", "analyze", "step_01_fake", cfg, meshes)
+    progress = _wait_done("job-1")
+    assert progress["progress"] == 100
+    assert [r.get("error") for r in progress["results"]] == [None, "marqueur absent"]
+    statuses = [s["status"] for s in job_store.get_job("job-1")["subjects"]]
+    assert statuses == ["done", "failed"]
+    assert (tmp_path / "public/sub-01/cortexanalyzer/out.txt").exists()
+    assert (tmp_path / "public/sub-01/cortexanalyzer/manifest.json").exists()
+
+    # 2) relance des sujets en échec uniquement
+    marker.write_text("")
+    assert package_runner.retry_job("job-1") == [1]
+    _wait_done("job-1")
+    job = job_store.get_job("job-1")
+    assert [s["status"] for s in job["subjects"]] == ["done", "done"]
+    assert [s["attempts"] for s in job["subjects"]] == [1, 2]
+
+    # 3) job interrompu par un redémarrage : repris au démarrage
+    job_store.create_job("job-2", "fakepkg_runner", "analyze", "step_01_fake", cfg, meshes)
+    job_store.mark_running("job-2", 0)
+    assert package_runner.resume_jobs() == ["job-2"]
+    _wait_done("job-2")
+    assert job_store.get_job("job-2")["status"] == "done"
+
+    # 4) annulation avant démarrage
+    job_store.create_job("job-3", "fakepkg_runner", "analyze", "step_01_fake", cfg, meshes)
+    assert package_runner.cancel_job("job-3") == 2
+    assert package_runner.resume_jobs() == []
+    assert job_store.get_job("job-3")["status"] == "done"
+
+
+def test_cancel_running_subjects_sharing_out_dir(monkeypatch, tmp_path):
+    _setup(monkeypatch, tmp_path, "fakepkg_cancel")
+    meshes = [str(tmp_path / f"data/sub-01/surf/{h}.white.gii") for h in ("lh", "rh")]
+
+    # lh et rh écrivent dans le même dossier : exécutés l'un après l'autre
+    package_runner.start_job("job-c", "fakepkg_cancel", "slow", "step_01_fake",
+                             {"steps": 10}, meshes)
+    progress = _wait_done("job-c")
+    assert [r.get("error") for r in progress["results"]] == [None, None]
+    assert "[sub-01] Terminé" in progress["logs"][-1]
+
+    # annulation pendant l'exécution : le job n'est clos qu'au retour du worker
+    package_runner.start_job("job-d", "fakepkg_cancel", "slow", "step_01_fake",
+                             {"steps": 1000}, meshes)
+    while job_store.subject_status("job-d", 0) != job_store.RUNNING:
+        time.sleep(0.05)
+    assert package_runner.cancel_job("job-d") == 2
+    assert package_runner.retry_job("job-d") == [1]       # sujet 0 : worker encore actif
+    package_runner.cancel_job("job-d")
+    progress = _wait_done("job-d")
+    assert [s["status"] for s in job_store.get_job("job-d")["subjects"]] == ["cancelled"] * 2
+    assert any("Annulé" in line for line in progress["logs"])
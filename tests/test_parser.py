@@ -0,0 +1,81 @@
+import os
+
+import numpy as np
+
+from conftest import write_texture
+from tools import parser
+
+
+def test_array_api_keeps_numpy_types(tmp_path, surface):
+    path, coords, faces = surface
+    v, f = parser.load_mesh_arrays(path)
+    assert v.dtype == np.float32 and f.dtype == np.int32
+    np.testing.assert_array_equal(v, coords)
+    np.testing.assert_array_equal(f, faces)
+
+    write_texture(tmp_path / "tex.gii", [0.5, 1.5, -2.0, 3.0])
+    scalars = parser.load_scalar_array(tmp_path / "tex.gii")
+    assert isinstance(scalars, np.ndarray) and scalars.dtype == np.float32
+    assert parser.load_scalar_data(tmp_path / "tex.gii") == scalars.tolist()
+
+
+def test_normals_csv_with_header(tmp_path):
+    csv = tmp_path / "normals.csv"
+    csv.write_text("nx,ny,nz\n0.0,0.0,1.0\n1.0,0.0,-0.0\n")
+    arr = parser.load_normals_array(csv)
+    assert arr.shape == (2, 3)
+    assert parser.load_normals_csv(csv) == arr.tolist()
+
+
+def test_normals_sidecar_written_then_mapped(tmp_path):
+    csv = tmp_path / "normals.csv"
+    csv.write_text("1e-3,0,1\n0,1,0\n-1,0,0\n")       # 1ʳᵉ ligne numérique : pas d'entête
+    arr = parser.load_normals_array(csv)
+    assert arr.shape == (3, 3) and arr[0, 0] == 1e-3
+
+    side = parser.normals_sidecar(csv)
+    st = csv.stat()
+    assert side.name == f".normals.csv.{st.st_size}-{st.st_mtime_ns}.npy" and side.exists()
+    mapped = parser.load_normals_array(csv)
+    assert isinstance(mapped, np.memmap)
+    np.testing.assert_array_equal(mapped, arr)
+
+    # CSV modifié après le sidecar : relu puis sidecar régénéré
+    csv.write_text("nx,ny,nz\n0,0,-1\n")
+    st = side.stat()
+    os.utime(csv, ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+    np.testing.assert_array_equal(parser.load_normals_array(csv), [[0, 0, -1]])
+    assert not side.exists()
+
+    # CSV remplacé (même taille) par un fichier de mtime antérieur (cp -p, rsync -t) : relu aussi
+    older = csv.stat().st_mtime_ns - 10**9
+    csv.write_text("nx,ny,nz\n0,0,+1\n")
+    os.utime(csv, ns=(older, older))
+    np.testing.assert_array_equal(parser.load_normals_array(csv), [[0, 0, 1]])
+    assert len(list(tmp_path.glob(".normals.csv.*.npy"))) == 1
+
+    npy = tmp_path / "vertex_normals.npy"
+    np.save(npy, arr)
+    np.testing.assert_array_equal(parser.load_normals_array(npy), arr)
+
+
+def test_array_cache_hits_invalidation_and_budget(tmp_path, monkeypatch):
+    cache = parser.ArrayCache(max_bytes=64)
+    monkeypatch.setattr(parser, "array_cache", cache)
+    tex = tmp_path / "tex.gii"
+    write_texture(tex, np.arange(8))                     # 32 octets
+
+    first = parser.load_scalar_array(tex)
+    assert parser.load_scalar_array(tex) is first
+    assert not first.flags.writeable
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+    write_texture(tex, np.arange(8) * 2)
+    os.utime(tex, ns=(0, os.stat(tex).st_mtime_ns + 10**9))
+    np.testing.assert_array_equal(parser.load_scalar_array(tex), np.arange(8) * 2)
+
+    other = tmp_path / "other.gii"
+    write_texture(other, np.arange(8))
+    parser.load_scalar_array(other)
+    stats = cache.stats()
+    assert stats["bytes"] <= 64 and stats["evictions"] == 1
@@ -0,0 +1,44 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+
+def _client(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    from routes import folders
+
+    app = FastAPI()
+    app.include_router(folders.router, prefix="/api")
+    return TestClient(app)
+
+
+def test_read_file_range_and_conditional(monkeypatch, tmp_path):
+    client = _client(monkeypatch, tmp_path)
+    data = bytes(range(256)) * 1024
+    (tmp_path / "big.bin").write_bytes(data)
+
+    full = client.get("/api/read-file", params={"path": "big.bin"})
+    assert full.status_code == 200
+    assert full.content == data
+    assert full.headers["accept-ranges"] == "bytes"
+    etag = full.headers["etag"]
+
+    part = client.get("/api/read-file", params={"path": "big.bin"},
+                      headers={"Range": "bytes=1000-1999"})
+    assert part.status_code == 206
+    assert part.content == data[1000:2000]
+    assert part.headers["content-range"] == f"bytes 1000-1999/{len(data)}"
+
+    cached = client.get("/api/read-file", params={"path": "big.bin"},
+                        headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+    since = client.get("/api/read-file", params={"path": "big.bin"},
+                       headers={"If-Modified-Since": full.headers["last-modified"]})
+    assert since.status_code == 304
+
+    legacy = client.post("/api/read-file", json={"path": "big.bin"})
+    assert legacy.content == data
+
+    missing = client.get("/api/read-file", params={"path": "nope.bin"})
+    assert missing.status_code == 400
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from conftest import read_texture_batch, write_texture
+
+
+def _decode(body, desc):
+    codes = np.frombuffer(body, dtype=np.dtype(desc["dtype"]).newbyteorder("<"),
+                          count=desc["count"], offset=desc["byte_offset"])
+    if desc["nan_code"] is None:
+        return codes.astype(np.float64)
+    return np.where(codes == desc["nan_code"], np.nan, codes * desc["scale"] + desc["offset"])
+
+
+@pytest.mark.parametrize("encoding", ["float32", "float16", "uint16", "uint8"])
+def test_textures_batch_roundtrip(monkeypatch, tmp_path, encoding):
+    monkeypatch.chdir(tmp_path)
+    rng = np.random.default_rng(0)
+    maps = {
+        "thickness.gii": rng.uniform(1, 4, 1001).astype(np.float32),
+        "curv.gii": np.append(rng.normal(0, 0.3, 1000), np.nan).astype(np.float32),
+    }
+    for name, values in maps.items():
+        write_texture(tmp_path / name, values)
+
+    from routes import texture
+
+    app = FastAPI()
+    app.include_router(texture.router, prefix="/api")
+    client = TestClient(app)
+
+    res = client.post("/api/load-textures-batch", json={
+        "paths": ["thickness.gii", "curv.gii", "missing.gii"], "encoding": encoding,
+    })
+    assert res.status_code == 200
+    layout, data = read_texture_batch(res.content)
+    assert layout["encoding"] == encoding
+    *ok, missing = layout["textures"]
+    assert "error" in missing
+
+    for desc in ok:
+        assert desc["byte_offset"] % 4 == 0
+        original = maps[desc["name"]].astype(np.float64)
+        decoded = _decode(data, desc)
+        np.testing.assert_array_equal(np.isnan(decoded), np.isnan(original))
+        err = np.nanmax(np.abs(decoded - original))
+        np.testing.assert_allclose(err, desc["max_abs_error"], rtol=1e-6, atol=1e-12)
+        if encoding.startswith("uint"):
+            assert err <= desc["scale"] / 2 + 1e-12
+
+    bytes_per_value = {"float32": 4, "float16": 2, "uint16": 2, "uint8": 1}[encoding]
+    assert len(data) <= 2 * (1001 * bytes_per_value + 4)
+
+
+def test_textures_batch_darray_selection(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    frames = [np.full(50, t, dtype=np.float32) for t in range(5)]
+    write_texture(tmp_path / "bold.gii", *frames)
+
+    from routes import texture
+
+    app = FastAPI()
+    app.include_router(texture.router, prefix="/api")
+    client = TestClient(app)
+
+    info = client.get("/api/texture-darrays", params={"path": "bold.gii"}).json()
+    assert info["n_darrays"] == 5 and info["darrays"][0]["shape"] == [50]
+
+    res = client.get("/api/load-textures-batch",
+                     params={"paths": ["bold.gii"], "darrays": [3, 1], "encoding": "float32"})
+    layout, data = read_texture_batch(res.content)
+    assert [d["darray"] for d in layout["textures"]] == [3, 1]
+    for desc in layout["textures"]:
+        np.testing.assert_array_equal(_decode(data, desc), frames[desc["darray"]])
+
+    res = client.get("/api/load-textures-batch", params={"paths": ["bold.gii"], "darrays": [9]})
+    assert "error" in read_texture_batch(res.content)[0]["textures"][0]
+
+
+@pytest.mark.parametrize("encoding", ["float32", "float16", "uint16", "uint8"])
+def test_non_finite_values_decode_as_nan(encoding):
+    from routes.texture import encode_scalars
+
+    values = np.array([-np.inf, -1e6, 0.0, 1.0, np.nan, np.inf])
+    data, desc = encode_scalars(values, encoding)
+    decoded = _decode(data, {**desc, "byte_offset": 0})
+    np.testing.assert_array_equal(np.isnan(decoded), ~np.isfinite(values))
+    assert desc["min"] == -1e6 and desc["max"] == 1.0
+    if encoding == "float16":
+        assert decoded[1] == -65504
@@ -0,0 +1,110 @@
+import uuid
+from pathlib import Path
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from conftest import write_surface
+
+
+def test_import_registers_and_delete_unregisters(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "uploads").mkdir()
+    (tmp_path / "data").mkdir()
+    write_surface(tmp_path / "data" / "lh.white.gii")
+
+    from routes import folders, mesh, upload_store
+
+    app = FastAPI()
+    app.include_router(folders.router, prefix="/api")
+    app.include_router(mesh.router, prefix="/api")
+    client = TestClient(app)
+
+    res = client.post("/api/import-meshes-from-folder",
+                      json={"folder": str(tmp_path / "data"), "files": ["lh.white.gii"]})
+    mesh_id = res.json()[0]["id"]
+
+    entry = upload_store.get(mesh_id)
+    assert entry["name"] == "lh.white.gii"
+    assert entry["metadata"]["mode"] in ("hardlink", "reflink", "copy")
+    assert upload_store.find_by_hash(entry["sha256"])["id"] == mesh_id
+
+    res = client.post("/api/delete-meshes", json=[mesh_id, "unknown"])
+    assert res.json()["deleted"] == [mesh_id]
+    assert res.json()["errors"] == [{"id": "unknown", "error": "Non trouvé"}]
+    assert upload_store.get(mesh_id) is None
+    assert not list((tmp_path / "uploads").iterdir())
+
+
+def test_sync_directory_indexes_legacy_uploads(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "uploads").mkdir()
+    legacy_id = str(uuid.uuid4())
+    write_surface(tmp_path / "uploads" / f"{legacy_id}_lh.white.gii")
+    (tmp_path / "uploads" / "notes.txt").write_text("ignoré")
+
+    from routes import upload_store
+
+    assert upload_store.sync_directory() == 1
+    assert upload_store.get(legacy_id)["name"] == "lh.white.gii"
+    assert upload_store.sync_directory() == 0
+
+    (tmp_path / "uploads" / f"{legacy_id}_lh.white.gii").unlink()
+    upload_store.sync_directory()
+    assert upload_store.get(legacy_id) is None
+
+
+def test_import_dedupes_and_returns_metadata_only(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "uploads").mkdir()
+    (tmp_path / "data").mkdir()
+    write_surface(tmp_path / "data" / "lh.white.gii")
+    write_surface(tmp_path / "data" / "copy.gii")          # même contenu
+
+    from routes import folders, mesh
+
+    app = FastAPI()
+    app.include_router(folders.router, prefix="/api")
+    app.include_router(mesh.router, prefix="/api")
+    client = TestClient(app)
+
+    res = client.post("/api/import-meshes-from-folder", json={
+        "folder": str(tmp_path / "data"), "files": ["lh.white.gii", "copy.gii"],
+    }).json()
+
+    assert "vertices" not in res[0]
+    assert [r["deduplicated"] for r in res] == [False, True]
+    assert res[0]["id"] == res[1]["id"]
+    assert len(list((tmp_path / "uploads").iterdir())) == 1
+
+    # la géométrie se charge à la demande
+    lazy = client.post("/api/load-mesh-from-path", json={"path": res[0]["path"]}).json()
+    assert len(lazy["vertices"]) == 4
+
+    # id partagé : supprimer une référence laisse le fichier à l'autre
+    client.post("/api/delete-meshes", json=[res[0]["id"]])
+    assert Path(res[0]["path"]).exists()
+    client.post("/api/delete-meshes", json=[res[1]["id"]])
+    assert not Path(res[0]["path"]).exists()
+
+    # un fichier seulement indexé n'est pas supprimé de son emplacement d'origine
+    (tmp_path / "other").mkdir()
+    write_surface(tmp_path / "other" / "rh.white.gii")
+    (tmp_path / "other" / "rh.white.gii").write_bytes(
+        (tmp_path / "other" / "rh.white.gii").read_bytes() + b"\n")
+    reg = client.post("/api/import-meshes-from-folder", json={
+        "folder": str(tmp_path / "other"), "files": ["rh.white.gii"], "mode": "register",
+    }).json()[0]
+    assert reg["path"] == str((tmp_path / "other" / "rh.white.gii").resolve())
+
+    # le fichier indexé change : plus de déduplication sur l'ancien contenu
+    old_content = (tmp_path / "other" / "rh.white.gii").read_bytes()
+    (tmp_path / "data" / "old.gii").write_bytes(old_content)
+    (tmp_path / "other" / "rh.white.gii").write_bytes(old_content + b"\n")
+    again = client.post("/api/import-meshes-from-folder", json={
+        "folder": str(tmp_path / "data"), "files": ["old.gii"],
+    }).json()[0]
+    assert not again["deduplicated"]
+
+    client.post("/api/delete-meshes", json=[reg["id"]])
+    assert (tmp_path / "other" / "rh.white.gii").exists()
@@ -1,20 +1,48 @@
+from contextlib import asynccontextmanager
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from pathlib import Path
 
 from routes import mesh, texture, folders, db_generation, compute_curvature, import_package
 from routes import normals
 from routes import assets
+from routes import jobs
+from routes import package_runner
+from routes import upload_store
+from routes.compression import CompressionMiddleware
+from routes.executor import run_blocking
+from routes.http_cache import CachedStaticFiles, ETagMiddleware
 
-app = FastAPI()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Relance les sujets interrompus par un arrêt du serveur
+    package_runner.resume_jobs()
+    # Indexe les imports antérieurs à l'index (ou ajoutés à la main) en tâche
+    # de fond : le hachage d'un gros dossier uploads/ ne retarde pas le démarrage
+    app.state.upload_sync = asyncio.create_task(run_blocking(upload_store.sync_directory))
+    app.state.upload_sync.add_done_callback(_report_sync)
+    yield
+
+
+def _report_sync(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        print(f"[upload_store] indexation de uploads/ interrompue : {task.exception()}")
+
+
+app = FastAPI(lifespan=lifespan)
+
+# ETag posé sur le corps non compressé, puis compression (brotli / gzip)
+app.add_middleware(ETagMiddleware)
+app.add_middleware(CompressionMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:5173"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Mesh-Layout", "ETag", "Last-Modified", "Content-Range", "Accept-Ranges"],
 )
 
 # Register routers
@@ -26,7 +54,8 @@ app.include_router(folders.router, prefix="/api")
 app.include_router(db_generation.router, prefix="/api")
 app.include_router(compute_curvature.router, prefix="/api")
 app.include_router(import_package.router, prefix="/api")
+app.include_router(jobs.router, prefix="/api")
 
 # Serve frontend static files
-app.mount("/", StaticFiles(directory=Path("dist"), html=True), name="static")
+app.mount("/", CachedStaticFiles(directory=Path("dist"), html=True), name="static")
 
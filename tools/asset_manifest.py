@@ -0,0 +1,100 @@
+"""
+Manifeste des sorties d'analyse d'un sujet (``manifest.json``).
+
+Chaque étape qui écrit dans ``public/<sujet>/cortexanalyzer/`` met à jour le
+manifeste du dossier : pour chaque texture (.gii) et fichier de normales
+(.csv / .npy), le nombre de sommets, le dtype, le min / max et le sha256. Le client
+obtient ainsi toutes ces informations en une requête, sans charger chaque
+fichier.
+
+La mise à jour est incrémentale : une entrée dont la taille et le mtime n'ont
+pas changé est reprise telle quelle du manifeste précédent.
+"""
+import json
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from tools.conversion_cache import file_digest
+from tools.parser import load_normals_array, load_scalar_array
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+# Suffixe → type d'asset
+ASSET_KINDS = {".gii": "texture", ".csv": "normals", ".npy": "normals"}
+
+
+def _stats(arr: np.ndarray) -> dict:
+    finite = arr[np.isfinite(arr)] if arr.dtype.kind == "f" else arr
+    return {
+        "dtype": str(arr.dtype),
+        "min": float(finite.min()) if finite.size else None,
+        "max": float(finite.max()) if finite.size else None,
+    }
+
+
+def describe_asset(path: Path) -> dict:
+    """Entrée de manifeste d'un fichier de sortie (lit le fichier une fois)."""
+    st = path.stat()
+    kind = ASSET_KINDS[path.suffix.lower()]
+    entry = {
+        "name": path.name,
+        "kind": kind,
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "sha256": file_digest(path),
+    }
+    try:
+        if kind == "texture":
+            scalars = load_scalar_array(path)
+            entry.update(n_vertices=int(scalars.shape[0]), **_stats(scalars))
+        else:
+            normals = load_normals_array(path)
+            entry.update(n_vertices=int(normals.shape[0]), **_stats(normals))
+    except Exception as e:
+        entry["error"] = str(e)
+    return entry
+
+
+def read_manifest(out_dir: Path) -> dict | None:
+    try:
+        with open(Path(out_dir) / MANIFEST_NAME, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get("version") == MANIFEST_VERSION else None
+
+
+def update_manifest(out_dir: str | Path) -> dict:
+    """
+    Met à jour (ou crée) le manifeste de ``out_dir`` et le renvoie.
+    Seuls les fichiers nouveaux ou modifiés sont relus.
+    """
+    out_dir = Path(out_dir)
+    existing = read_manifest(out_dir)
+    previous = (existing or {}).get("assets", {})
+
+    assets = {}
+    if out_dir.exists():
+        for entry in os.scandir(out_dir):
+            path = Path(entry.path)
+            if (not entry.is_file() or entry.name.startswith(".")     # sidecars, temporaires
+                    or path.suffix.lower() not in ASSET_KINDS):
+                continue
+            st = entry.stat()
+            old = previous.get(entry.name)
+            if old and old["size"] == st.st_size and old["mtime_ns"] == st.st_mtime_ns:
+                assets[entry.name] = old
+            else:
+                assets[entry.name] = describe_asset(path)
+
+    manifest = {"version": MANIFEST_VERSION, "assets": dict(sorted(assets.items()))}
+    if out_dir.exists() and (existing is None or assets != previous):
+        tmp = out_dir / f".{MANIFEST_NAME}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp, out_dir / MANIFEST_NAME)
+    return manifest
@@ -1,6 +1,5 @@
 import os
 import numpy as np
-import pandas as pd
 from ressources.utils import readgii as uio
 import ressources.slam.io as sio
 import ressources.slam.curvature as scurv
@@ -10,6 +9,7 @@ from joblib import Parallel, delayed
 from tqdm import tqdm
 
 from tools.snapshot import snap_mesh  
+from tools.geometry_cache import get_geometry
 
 # === Paramètres globaux ===
 KMEAN_ROOT = "E:/research_dpfstar/results_rel3_dhcp/dpfstar"
@@ -20,8 +20,9 @@ def save_externals(VertexNormals, externals, subject_name, hemi):
     output_folder = os.path.join(OUTPUT_ROOT, f"hemi_{hemi}", subject_name)
     os.makedirs(output_folder, exist_ok=True)
 
-    normals_path = os.path.join(output_folder, "vertex_normals.csv")
-    pd.DataFrame(VertexNormals).to_csv(normals_path, index=False)
+    # binaire : relu en mmap par tools.parser.load_normals_array
+    normals_path = os.path.join(output_folder, "vertex_normals.npy")
+    np.save(normals_path, np.asarray(VertexNormals, dtype=np.float64))
 
     externals_path = os.path.join(output_folder, f"{subject_name}_externals.gii")
     sio.write_texture(stex.TextureND(darray=externals), externals_path)
@@ -29,17 +30,37 @@ def save_externals(VertexNormals, externals, subject_name, hemi):
     print(f"[✓] Sauvegarde dans : {output_folder}")
     return externals_path, output_folder  # return path for screenshot
 
-def compute_ray_intersection_for_group(mesh, vertices, normals):
-    externals = []
-    for vertex, normal in zip(vertices, normals):
-        ray_origins = np.array([vertex])
-        ray_directions = np.array([normal])
-        locations, _, _ = mesh.ray.intersects_location(ray_origins=ray_origins, ray_directions=ray_directions)
-        externals.append(len(locations) == 1)
-    return externals
+def build_ray_intersector(mesh):
+    """
+    Construit une seule fois la structure d'accélération du lancer de rayons
+    (BVH embree ou R-tree selon le backend trimesh) et renvoie l'intersecteur.
+    Il est ensuite partagé tel quel par tous les threads de calcul.
+    """
+    intersector = mesh.ray
+    # un premier lancer force la construction de la structure, mise en cache sur le maillage
+    intersector.intersects_any(
+        ray_origins=np.asarray(mesh.vertices[:1]),
+        ray_directions=np.array([[0.0, 0.0, 1.0]])
+    )
+    return intersector
+
+
+def compute_ray_intersection_for_group(intersector, vertices, normals):
+    """
+    Lance tous les rayons du groupe en un seul appel vectorisé et compte les
+    impacts par rayon via ``index_ray``. Un sommet est externe si son rayon
+    ne touche le maillage qu'une fois.
+    """
+    _, index_ray, _ = intersector.intersects_location(
+        ray_origins=vertices,
+        ray_directions=normals,
+        multiple_hits=True
+    )
+    hits = np.bincount(index_ray, minlength=len(vertices))
+    return hits == 1
 
 
-def compute_externals(mesh, mesh_path, subject_name, hemi, mask_medial_wall=None, mask_sylvian_valley=None, batch_size=500):
+def compute_externals(mesh, mesh_path, subject_name, hemi, mask_medial_wall=None, mask_sylvian_valley=None, batch_size=20000):
     kmean_path = os.path.join(KMEAN_ROOT, f"hemi_{hemi}", subject_name, "kmean.gii")
     if not os.path.exists(kmean_path):
         raise FileNotFoundError(f"Kmean introuvable : {kmean_path}")
@@ -53,26 +74,33 @@ def compute_externals(mesh, mesh_path, subject_name, hemi, mask_medial_wall=None
     if mask_sylvian_valley is not None and os.path.exists(mask_sylvian_valley):
         mask &= uio.read_gii_file(mask_sylvian_valley)
 
-    VertexNormals, _, _, _, _ = scurv.calcvertex_normals(mesh, mesh.face_normals)
-
-    VertexNormals_masked = VertexNormals[mask]
-    idx_vtxn = np.arange(len(mesh.vertices))[mask]
+    # Normales et structure d'accélération : calculées une fois par maillage
+    # (clé = contenu du fichier), réutilisées d'une analyse à l'autre
+    geometry = get_geometry(mesh_path)
+    VertexNormals = geometry.cached_array(
+        "slam_vertex_normals",
+        lambda: scurv.calcvertex_normals(mesh, mesh.face_normals)[0]
+    )
 
-    def batch_data(arr, batch_size):
-        for i in range(0, len(arr), batch_size):
-            yield arr[i:i + batch_size]
+    idx_vtxn = np.flatnonzero(mask)
+    origins = np.asarray(mesh.vertices)[idx_vtxn]
+    directions = VertexNormals[idx_vtxn]
 
-    vertex_batches = list(batch_data(mesh.vertices[idx_vtxn], batch_size))
-    normal_batches = list(batch_data(VertexNormals_masked, batch_size))
+    # Structure d'accélération construite une fois, partagée en mémoire par
+    # les threads (aucune copie du maillage envoyée aux workers)
+    intersector = geometry.memo("ray_intersector", lambda: build_ray_intersector(mesh))
 
-    results = Parallel(n_jobs=-1)(
-        delayed(compute_ray_intersection_for_group)(mesh, vb, nb)
-        for vb, nb in tqdm(zip(vertex_batches, normal_batches), total=len(vertex_batches), desc="Rayons externals")
+    starts = range(0, len(idx_vtxn), batch_size)
+    results = Parallel(n_jobs=-1, prefer="threads")(
+        delayed(compute_ray_intersection_for_group)(
+            intersector, origins[i:i + batch_size], directions[i:i + batch_size]
+        )
+        for i in tqdm(starts, total=len(starts), desc="Rayons externals")
     )
 
-    externals = [item for sublist in results for item in sublist]
     external_tex = np.zeros(len(mesh.vertices))
-    external_tex[idx_vtxn] = np.array(externals)
+    if results:
+        external_tex[idx_vtxn] = np.concatenate(results)
 
     return VertexNormals, external_tex
 
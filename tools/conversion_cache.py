@@ -0,0 +1,151 @@
+"""
+Cache adressé par contenu pour les conversions de maillages (.gii → artefact).
+
+Chaque artefact est nommé ``<sha256 du fichier source><suffixe>`` : deux appels
+sur le même contenu renvoient le même fichier, sans reconversion.
+La politique LRU repose sur la date de modification des artefacts (mise à jour
+à chaque accès) ; aucun index partagé n'est nécessaire, ce qui reste sûr
+lorsque plusieurs processus convertissent en parallèle.
+"""
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable
+
+# Budget disque par défaut d'un répertoire de cache (octets)
+DEFAULT_MAX_BYTES = int(os.environ.get("CORTEXVISU_CACHE_BYTES", 2 * 1024**3))
+
+_CHUNK = 1024 * 1024
+_ARTIFACT_RE = re.compile(r"^[0-9a-f]{64}[._]")
+
+# (chemin, mtime_ns, taille) → sha256 : évite de relire un fichier inchangé
+_digest_memo: "OrderedDict[tuple, str]" = OrderedDict()
+_DIGEST_MEMO_SIZE = 4096
+_memo_lock = threading.Lock()
+
+
+def file_digest(path: str | Path) -> str:
+    """sha256 du contenu de ``path``, mémorisé par (chemin, mtime, taille)."""
+    path = Path(path).resolve()
+    st = path.stat()
+    key = (str(path), st.st_mtime_ns, st.st_size)
+
+    with _memo_lock:
+        if key in _digest_memo:
+            _digest_memo.move_to_end(key)
+            return _digest_memo[key]
+
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+
+    with _memo_lock:
+        _digest_memo[key] = digest
+        while len(_digest_memo) > _DIGEST_MEMO_SIZE:
+            _digest_memo.popitem(last=False)
+    return digest
+
+
+class ConversionCache:
+    """
+    Répertoire d'artefacts dérivés, borné en taille (éviction LRU).
+
+    Args:
+        directory (Path): dossier où sont écrits les artefacts
+        max_bytes (int): taille totale maximale des artefacts du cache
+    """
+
+    def __init__(self, directory: Path, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def artifact_path(self, source: str | Path, suffix: str) -> Path:
+        return self.directory / f"{file_digest(source)}{suffix}"
+
+    def get_or_create(self, source: str | Path, suffix: str,
+                      build: Callable[[Path], None]) -> Path:
+        """
+        Renvoie l'artefact ``suffix`` de ``source`` ; l'appelle ``build(tmp_path)``
+        pour le produire s'il est absent. L'écriture est atomique (fichier
+        temporaire puis ``os.replace``).
+        """
+        target = self.artifact_path(source, suffix)
+        if target.exists():
+            os.utime(target)                      # marque l'accès (LRU)
+            return target
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(f".{target.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            build(tmp)
+            os.replace(tmp, target)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+
+        self.evict()
+        return target
+
+    def _entries(self):
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and _ARTIFACT_RE.match(entry.name):
+                st = entry.stat()
+                yield Path(entry.path), st.st_size, st.st_mtime_ns
+
+    def evict(self) -> list[Path]:
+        """Supprime les artefacts les moins récemment utilisés au-delà du budget."""
+        removed = []
+        with self._lock:
+            if not self.directory.exists():
+                return removed
+            entries = sorted(self._entries(), key=lambda e: e[2])
+            total = sum(size for _, size, _ in entries)
+            for path, size, _ in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    path.unlink()
+                    removed.append(path)
+                    total -= size
+                except FileNotFoundError:
+                    pass
+        return removed
+
+    def invalidate(self, source: str | Path | None = None) -> list[Path]:
+        """
+        Supprime les artefacts dérivés de ``source`` (tous les suffixes),
+        ou l'intégralité du cache si ``source`` vaut None.
+        """
+        removed = []
+        if not self.directory.exists():
+            return removed
+        prefix = file_digest(source) if source is not None else None
+        with self._lock:
+            for path, _, _ in list(self._entries()):
+                if prefix is None or path.name.startswith(prefix):
+                    path.unlink(missing_ok=True)
+                    removed.append(path)
+        return removed
+
+
+_caches: dict[str, ConversionCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(directory: str | Path) -> ConversionCache:
+    """
+    ``ConversionCache`` de ``directory``, unique dans le processus : tous les
+    modules qui écrivent dans un même répertoire partagent son verrou et son
+    budget d'éviction.
+    """
+    key = str(Path(directory).resolve())
+    with _caches_lock:
+        if key not in _caches:
+            _caches[key] = ConversionCache(Path(directory))
+        return _caches[key]
@@ -1,19 +1,112 @@
 # tools/curvature.py
+"""
+Courbures discrètes d'un maillage triangulé, entièrement vectorisées.
+
+  • courbure moyenne H : opérateur de Laplace-Beltrami cotangent,
+    H = -½ ⟨Δx, n⟩ (positive sur une sphère à normales sortantes)
+  • courbure de Gauss K : défaut angulaire, K = (2π - Σ angles) / A
+  • courbures principales k1 ≥ k2 : H ± √max(H² - K, 0)
+
+A est l'aire de Voronoï mixte de chaque sommet (Meyer et al., 2003). Toutes
+les sommes sur les faces passent par des matrices creuses / ``np.bincount``.
+
+Le résultat est écrit par maillage dans ``CURVATURE_OUTPUT`` sous la forme
+``<sha256 du maillage>_curvature.gii`` (darrays : H, K, k1, k2) : deux
+requêtes sur le même maillage partagent le fichier sans recalcul.
+"""
+from pathlib import Path
+
 import nibabel as nb
 import numpy as np
-import tools.texture as stex
-import tools.parser as parser
-from pathlib import Path
+import scipy.sparse as sp
+
+from tools.conversion_cache import get_cache
+from tools.geometry_cache import get_geometry
+
+CURVATURE_OUTPUT = Path("public/curvature")
+
+# Ordre des darrays dans le fichier de sortie
+CURVATURE_NAMES = ("mean", "gaussian", "k1", "k2")
+
+
+def _corners(vertices: np.ndarray, faces: np.ndarray):
+    """Cotangentes, angles (M×3) et double aire (M) des coins de chaque face."""
+    v = vertices[faces]                                   # M×3×3
+    a = np.roll(v, -1, axis=1) - v                        # coin i → i+1
+    b = np.roll(v, -2, axis=1) - v                        # coin i → i+2
+    dot = np.einsum("mij,mij->mi", a, b)
+    cross = np.linalg.norm(np.cross(a, b), axis=2)
+    safe = np.where(cross > 0, cross, 1)
+    cot = np.where(cross > 0, dot / safe, 0)
+    angles = np.arctan2(cross, dot)
+    return cot, angles, cross[:, 0], a, b
+
+
+def compute_curvature_arrays(vertices: np.ndarray, faces: np.ndarray,
+                             normals: np.ndarray) -> dict:
+    """
+    Args:
+        vertices (N×3), faces (M×3), normals (N×3, unitaires)
+
+    Returns:
+        dict: "mean", "gaussian", "k1", "k2" → tableaux (N,) float64
+    """
+    v = np.asarray(vertices, dtype=np.float64)
+    f = np.asarray(faces, dtype=np.int64)
+    n = len(v)
+
+    cot, angles, double_area, a, b = _corners(v, f)
+
+    # Laplacien cotangent : l'arête opposée au coin i reçoit ½ cot(angle_i)
+    j = np.roll(f, -1, axis=1).ravel()
+    k = np.roll(f, -2, axis=1).ravel()
+    w = 0.5 * cot.ravel()
+    W = sp.coo_matrix((np.concatenate([w, w]),
+                       (np.concatenate([j, k]), np.concatenate([k, j]))),
+                      shape=(n, n)).tocsr()
+    lap = W @ v - np.asarray(W.sum(axis=1)) * v           # Σ w_ij (x_j - x_i)
+
+    # Aire de Voronoï mixte
+    voronoi = (np.einsum("mij,mij->mi", a, a) * np.roll(cot, -2, axis=1)
+               + np.einsum("mij,mij->mi", b, b) * np.roll(cot, -1, axis=1)) / 8
+    area = (double_area / 2)[:, None]
+    obtuse = angles > np.pi / 2
+    any_obtuse = obtuse.any(axis=1, keepdims=True)
+    corner_area = np.where(any_obtuse, np.where(obtuse, area / 2, area / 4), voronoi)
+    A = np.bincount(f.ravel(), weights=corner_area.ravel(), minlength=n)
+    inv_A = np.divide(1.0, A, out=np.zeros(n), where=A > 0)
+
+    # Défaut angulaire (π au lieu de 2π sur le bord)
+    edges = np.sort(np.stack([j, k], axis=1), axis=1)
+    uniq, counts = np.unique(edges, axis=0, return_counts=True)
+    base = np.full(n, 2 * np.pi)
+    base[uniq[counts == 1].ravel()] = np.pi
+    angle_sum = np.bincount(f.ravel(), weights=angles.ravel(), minlength=n)
+    gaussian = (base - angle_sum) * inv_A
+
+    mean = -0.5 * np.einsum("ij,ij->i", lap, normals) * inv_A
+    delta = np.sqrt(np.maximum(mean ** 2 - gaussian, 0))
+
+    return {"mean": mean, "gaussian": gaussian, "k1": mean + delta, "k2": mean - delta}
+
+
+def compute_curvature(mesh_path, output_dir: Path = CURVATURE_OUTPUT) -> Path:
+    """
+    Calcule (ou relit depuis le cache) les courbures de ``mesh_path``.
+
+    Returns:
+        Path: texture .gii propre au maillage (darrays dans l'ordre CURVATURE_NAMES)
+    """
+    def build(tmp: Path):
+        geometry = get_geometry(mesh_path)
+        curv = compute_curvature_arrays(geometry.vertices, geometry.faces,
+                                        geometry.vertex_normals)
+        img = nb.gifti.GiftiImage(darrays=[
+            nb.gifti.GiftiDataArray(curv[name].astype(np.float32),
+                                    meta={"Name": name})
+            for name in CURVATURE_NAMES
+        ])
+        with open(tmp, "wb") as fh:
+            fh.write(img.to_xml())
 
-def compute_curvature(mesh_path):
-    # Exemple fictif 
-    g = nb.load(mesh_path)
-    coords = g.darrays[0].data
-    n_vertices = coords.shape[0]
-
-    curvature = np.random.randn(n_vertices) * 0.05  # simulateur temporaire
-    # Save
-    output_path = Path("public/curvature.gii")
-    parser.write_texture(stex.TextureND(darray=curvature), output_path)
-    
-    return output_path
\ No newline at end of file
+    return get_cache(output_dir).get_or_create(mesh_path, "_curvature.gii", build)
@@ -0,0 +1,158 @@
+"""
+Cache des structures géométriques dérivées d'un maillage.
+
+Normales, adjacences et autres tableaux coûteux à construire sont calculés une
+seule fois par contenu de maillage (sha256) puis persistés dans
+``GEOMETRY_CACHE_DIR`` (``<digest>_<nom>.npy`` / ``.npz``) : les analyses
+suivantes (externals, courbure, export de normales…) les relisent en
+``mmap``. Les objets non sérialisables (intersecteur de rayons / BVH) sont
+gardés en mémoire dans le processus, eux aussi construits une seule fois.
+"""
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+import scipy.sparse as sp
+
+from tools.conversion_cache import ConversionCache, file_digest, get_cache
+from tools.parser import load_mesh_arrays
+
+GEOMETRY_CACHE_DIR = Path(os.environ.get("CORTEXVISU_GEOMETRY_CACHE", "cache/geometry"))
+
+# Nombre de maillages gardés en mémoire dans le processus
+MAX_IN_MEMORY = 8
+
+_geometries: "OrderedDict[str, MeshGeometry]" = OrderedDict()
+_lock = threading.Lock()
+
+
+class MeshGeometry:
+    """
+    Géométrie d'un maillage et ses structures dérivées, calculées à la demande.
+
+    Args:
+        mesh_path (Path): fichier .gii source (clé du cache = son contenu)
+        cache (ConversionCache): répertoire de persistance des tableaux
+    """
+
+    def __init__(self, mesh_path: Path, cache: ConversionCache):
+        self.mesh_path = Path(mesh_path)
+        self.digest = file_digest(mesh_path)
+        self._cache = cache
+        self._memo: dict[str, Any] = {}
+        self._lock = threading.RLock()
+        self.vertices, self.faces = load_mesh_arrays(mesh_path)
+
+    # ------------------------------------------------------------------
+    # Mécanique de cache
+    # ------------------------------------------------------------------
+    def cached_array(self, name: str, build: Callable[[], np.ndarray]) -> np.ndarray:
+        """Tableau ``name`` persisté sur disque (construit par ``build`` au besoin)."""
+        with self._lock:
+            if name not in self._memo:
+                def write(tmp: Path):
+                    with open(tmp, "wb") as f:
+                        np.save(f, np.asarray(build()))
+
+                path = self._cache.get_or_create(self.mesh_path, f"_{name}.npy", write)
+                self._memo[name] = np.load(path, mmap_mode="r")
+            return self._memo[name]
+
+    def cached_sparse(self, name: str, build: Callable[[], sp.spmatrix]) -> sp.csr_matrix:
+        """Matrice creuse ``name`` persistée sur disque (format CSR)."""
+        with self._lock:
+            if name not in self._memo:
+                def write(tmp: Path):
+                    with open(tmp, "wb") as f:
+                        sp.save_npz(f, sp.csr_matrix(build()))
+
+                path = self._cache.get_or_create(self.mesh_path, f"_{name}.npz", write)
+                self._memo[name] = sp.load_npz(path).tocsr()
+            return self._memo[name]
+
+    def memo(self, name: str, build: Callable[[], Any]) -> Any:
+        """Objet ``name`` gardé en mémoire seulement (ex. intersecteur de rayons)."""
+        with self._lock:
+            if name not in self._memo:
+                self._memo[name] = build()
+            return self._memo[name]
+
+    # ------------------------------------------------------------------
+    # Structures dérivées
+    # ------------------------------------------------------------------
+    @property
+    def face_normals(self) -> np.ndarray:
+        """Normales unitaires des faces (M×3)."""
+        def build():
+            v = self.vertices.astype(np.float64)
+            tri = v[self.faces]
+            n = np.cross(tri[:, 1] - tri[:, 0], tri[:, 2] - tri[:, 0])
+            norm = np.linalg.norm(n, axis=1, keepdims=True)
+            return n / np.where(norm > 0, norm, 1)
+        return self.cached_array("face_normals", build)
+
+    @property
+    def face_areas(self) -> np.ndarray:
+        def build():
+            v = self.vertices.astype(np.float64)
+            tri = v[self.faces]
+            return 0.5 * np.linalg.norm(
+                np.cross(tri[:, 1] - tri[:, 0], tri[:, 2] - tri[:, 0]), axis=1
+            )
+        return self.cached_array("face_areas", build)
+
+    @property
+    def vertex_faces(self) -> sp.csr_matrix:
+        """Incidence sommets × faces (N×M), 1 si le sommet appartient à la face."""
+        def build():
+            n_faces = len(self.faces)
+            rows = self.faces.ravel()
+            cols = np.repeat(np.arange(n_faces), 3)
+            return sp.coo_matrix(
+                (np.ones(rows.size, dtype=np.int8), (rows, cols)),
+                shape=(len(self.vertices), n_faces),
+            )
+        return self.cached_sparse("vertex_faces", build)
+
+    @property
+    def vertex_adjacency(self) -> sp.csr_matrix:
+        """Adjacence sommet-sommet (N×N, symétrique) issue des arêtes des faces."""
+        def build():
+            f = self.faces
+            i = np.concatenate([f[:, 0], f[:, 1], f[:, 2]])
+            j = np.concatenate([f[:, 1], f[:, 2], f[:, 0]])
+            n = len(self.vertices)
+            adj = sp.coo_matrix((np.ones(i.size, dtype=np.int8), (i, j)), shape=(n, n))
+            adj = (adj + adj.T).tocsr()
+            adj.data[:] = 1
+            return adj
+        return self.cached_sparse("vertex_adjacency", build)
+
+    @property
+    def vertex_normals(self) -> np.ndarray:
+        """Normales unitaires des sommets, moyenne des normales de faces pondérée par l'aire."""
+        def build():
+            weighted = self.face_normals * self.face_areas[:, None]
+            n = self.vertex_faces @ weighted
+            norm = np.linalg.norm(n, axis=1, keepdims=True)
+            return n / np.where(norm > 0, norm, 1)
+        return self.cached_array("vertex_normals", build)
+
+
+def get_geometry(mesh_path: str | Path) -> MeshGeometry:
+    """Géométrie de ``mesh_path``, partagée dans le processus (LRU par contenu)."""
+    digest = file_digest(mesh_path)
+    with _lock:
+        if digest in _geometries:
+            _geometries.move_to_end(digest)
+            return _geometries[digest]
+
+    geometry = MeshGeometry(mesh_path, get_cache(GEOMETRY_CACHE_DIR))
+    with _lock:
+        _geometries[digest] = geometry
+        while len(_geometries) > MAX_IN_MEMORY:
+            _geometries.popitem(last=False)
+    return geometry
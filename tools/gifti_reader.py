@@ -0,0 +1,158 @@
+"""
+Lecture paresseuse des darrays d'un fichier GIFTI.
+
+``nb.load`` décode (base64, zlib) tous les darrays d'un fichier, même si un
+seul est utilisé : pour une texture fonctionnelle de plusieurs centaines de
+cartes, afficher une carte coûte le décodage de toutes. Ici :
+
+  • ``gifti_index`` parcourt le fichier (projeté en mémoire) une seule fois
+    et relève, pour chaque DataArray, ses attributs (type, dimensions,
+    encodage…) et la position de son élément ``<Data>`` ; l'index est
+    mémorisé par (chemin, mtime, taille)
+  • ``read_darray`` ne décode que les octets du darray demandé
+
+Encodages pris en charge : ASCII, Base64Binary, GZipBase64Binary et
+ExternalFileBinary (projeté en mémoire). Un fichier que l'index ne sait pas
+lire lève ``ValueError`` : l'appelant peut alors se rabattre sur nibabel.
+"""
+import base64
+import mmap
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+# Nombre de fichiers dont l'index reste en mémoire
+INDEX_MEMO_SIZE = 256
+
+_DTYPES = {
+    "NIFTI_TYPE_UINT8": "u1",
+    "NIFTI_TYPE_INT8": "i1",
+    "NIFTI_TYPE_INT16": "i2",
+    "NIFTI_TYPE_UINT16": "u2",
+    "NIFTI_TYPE_INT32": "i4",
+    "NIFTI_TYPE_UINT32": "u4",
+    "NIFTI_TYPE_INT64": "i8",
+    "NIFTI_TYPE_UINT64": "u8",
+    "NIFTI_TYPE_FLOAT32": "f4",
+    "NIFTI_TYPE_FLOAT64": "f8",
+}
+
+_DATA_ARRAY_RE = re.compile(rb"<DataArray\b([^>]*)>")
+_DATA_RE = re.compile(rb"<Data\s*(/?)>")
+_ATTR_RE = re.compile(rb'(\w+)\s*=\s*"([^"]*)"')
+
+_memo: OrderedDict = OrderedDict()
+_memo_lock = threading.Lock()
+
+
+def _darray_info(attrs: dict, data_start: int, data_end: int) -> dict:
+    try:
+        dtype = np.dtype(_DTYPES[attrs["DataType"]])
+        ndim = int(attrs["Dimensionality"])
+        shape = tuple(int(attrs[f"Dim{i}"]) for i in range(ndim))
+    except (KeyError, ValueError) as e:
+        raise ValueError(f"DataArray GIFTI non pris en charge : {e}")
+    if dtype.itemsize > 1:
+        dtype = dtype.newbyteorder(">" if attrs.get("Endian") == "BigEndian" else "<")
+    return {
+        "intent": attrs.get("Intent", "NIFTI_INTENT_NONE"),
+        "dtype": dtype,
+        "shape": shape,
+        "order": "F" if attrs.get("ArrayIndexingOrder") == "ColumnMajorOrder" else "C",
+        "encoding": attrs.get("Encoding", "ASCII"),
+        "external_file": attrs.get("ExternalFileName", ""),
+        "external_offset": int(attrs.get("ExternalFileOffset") or 0),
+        "data_start": data_start,
+        "data_end": data_end,
+    }
+
+
+def _scan(path: Path) -> list:
+    darrays = []
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        pos = 0
+        while True:
+            tag = _DATA_ARRAY_RE.search(mm, pos)
+            if tag is None:
+                break
+            attrs = {k.decode(): v.decode() for k, v in _ATTR_RE.findall(tag.group(1))}
+            end_tag = mm.find(b"</DataArray>", tag.end())
+            data = _DATA_RE.search(mm, tag.end(), end_tag if end_tag >= 0 else len(mm))
+            if end_tag < 0 or data is None:
+                raise ValueError(f"DataArray {len(darrays)} mal formé dans {path.name}")
+            if data.group(1):                                   # <Data/>
+                start = end = data.end()
+            else:
+                start = data.end()
+                end = mm.find(b"</Data>", start, end_tag)
+                if end < 0:
+                    raise ValueError(f"DataArray {len(darrays)} mal formé dans {path.name}")
+            darrays.append(_darray_info(attrs, start, end))
+            pos = end_tag
+    return darrays
+
+
+def gifti_index(path: str | Path) -> list:
+    """Description de chaque darray de ``path`` (sans décoder les données)."""
+    path = Path(path).resolve()
+    st = path.stat()
+    key = (str(path), st.st_mtime_ns, st.st_size)
+    with _memo_lock:
+        if key in _memo:
+            _memo.move_to_end(key)
+            return _memo[key]
+
+    darrays = _scan(path)
+    with _memo_lock:
+        _memo[key] = darrays
+        while len(_memo) > INDEX_MEMO_SIZE:
+            _memo.popitem(last=False)
+    return darrays
+
+
+def _decode(path: Path, info: dict, raw: bytes) -> np.ndarray:
+    dtype, shape, encoding = info["dtype"], info["shape"], info["encoding"]
+    count = int(np.prod(shape))
+    if encoding == "ExternalFileBinary":
+        external = path.parent / info["external_file"]
+        flat = np.memmap(external, dtype=dtype, mode="r",
+                         offset=info["external_offset"], shape=(count,))
+    elif encoding == "ASCII":
+        flat = np.array(raw.split(), dtype=dtype.newbyteorder("="))
+    elif encoding in ("Base64Binary", "GZipBase64Binary"):
+        buf = base64.b64decode(raw)
+        if encoding == "GZipBase64Binary":
+            buf = zlib.decompress(buf)
+        flat = np.frombuffer(buf, dtype=dtype, count=count)
+    else:
+        raise ValueError(f"Encodage GIFTI non pris en charge : {encoding}")
+
+    if flat.size != count:
+        raise ValueError(f"{flat.size} valeurs lues pour la forme {shape}")
+    arr = flat.reshape(shape, order=info["order"])
+    return arr if arr.dtype.isnative else arr.astype(arr.dtype.newbyteorder("="))
+
+
+def read_darrays(path: str | Path, indices) -> list:
+    """Décode uniquement les darrays ``indices`` de ``path`` (dans cet ordre)."""
+    path = Path(path).resolve()
+    darrays = gifti_index(path)
+    for i in indices:
+        if not -len(darrays) <= i < len(darrays):
+            raise IndexError(f"darray {i} absent de {path.name} ({len(darrays)} darrays)")
+
+    out = []
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for i in indices:
+            info = darrays[i]
+            out.append(_decode(path, info, mm[info["data_start"]:info["data_end"]]))
+    return out
+
+
+def read_darray(path: str | Path, index: int = 0) -> np.ndarray:
+    """Décode uniquement le darray ``index`` de ``path``."""
+    return read_darrays(path, [index])[0]
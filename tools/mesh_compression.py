@@ -0,0 +1,157 @@
+"""
+Encodage compressé de la géométrie d'un maillage (format « CVMZ »).
+
+  • positions quantifiées sur 16 bits par axe dans la boîte englobante
+    (erreur ≤ demi-pas de quantification, soit étendue / 131070 par axe)
+  • triangles réordonnés pour la localité (chaque triangle tourne pour
+    commencer par son plus petit indice, sans changer l'orientation, puis
+    les triangles sont triés) : les indices successifs sont proches
+  • positions et indices codés en différences successives (zigzag), octets
+    regroupés par poids (« byte shuffle ») puis compressés en gzip, ou zstd
+    si le module ``zstandard`` est installé
+
+L'ordre des sommets est conservé : les textures restent valides telles
+quelles. Seul l'ordre des triangles change.
+
+Structure : en-tête de 8 octets (``b"CVMZ"``, version, codec, 2 octets nuls)
+puis le corps compressé :
+
+    n_vertices u32 | n_faces u32 | min f32×3 | pas f32×3
+    | positions (N×3 deltas zigzag, u32 regroupés par octet)
+    | indices   (M×3 deltas zigzag, u32 regroupés par octet)
+"""
+import gzip
+import struct
+from pathlib import Path
+
+import numpy as np
+
+from tools.conversion_cache import get_cache
+from tools.parser import load_mesh_arrays
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MAGIC = b"CVMZ"
+VERSION = 1
+CODECS = {"gzip": 1, "zstd": 2}
+
+# Niveau gzip : au-delà de 6 le gain de taille est marginal pour un coût CPU élevé
+GZIP_LEVEL = 6
+
+_HEADER = struct.Struct("<4sBB2x")
+_BODY_HEADER = struct.Struct("<II3f3f")
+_LEVELS = 65535
+
+
+def _zigzag(deltas: np.ndarray) -> np.ndarray:
+    deltas = deltas.astype(np.int64)
+    return ((deltas << 1) ^ (deltas >> 63)).astype("<u4")
+
+
+def _unzigzag(codes: np.ndarray) -> np.ndarray:
+    codes = codes.astype(np.int64)
+    return (codes >> 1) ^ -(codes & 1)
+
+
+def _shuffle(codes: np.ndarray) -> bytes:
+    """u32 → 4 plans d'octets (poids faibles d'abord) : les plans forts sont presque nuls."""
+    return np.ascontiguousarray(codes.view(np.uint8).reshape(-1, 4).T).tobytes()
+
+
+def _unshuffle(buf: bytes, count: int, offset: int) -> np.ndarray:
+    planes = np.frombuffer(buf, dtype=np.uint8, count=4 * count, offset=offset).reshape(4, count)
+    return np.ascontiguousarray(planes.T).view("<u4").ravel()
+
+
+def _compress(raw: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise ValueError("Codec zstd indisponible (module zstandard absent)")
+        return zstandard.ZstdCompressor(level=19).compress(raw)
+    return gzip.compress(raw, compresslevel=GZIP_LEVEL)
+
+
+def _decompress(data: bytes, codec_id: int) -> bytes:
+    if codec_id == CODECS["zstd"]:
+        if zstandard is None:
+            raise ValueError("Codec zstd indisponible (module zstandard absent)")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def reorder_faces(faces: np.ndarray) -> np.ndarray:
+    """Rotation de chaque triangle vers son plus petit indice, puis tri lexicographique."""
+    f = np.asarray(faces, dtype=np.int64)
+    shift = f.argmin(axis=1)
+    cols = (shift[:, None] + np.arange(3)) % 3
+    rotated = np.take_along_axis(f, cols, axis=1)
+    order = np.lexsort((rotated[:, 2], rotated[:, 1], rotated[:, 0]))
+    return rotated[order]
+
+
+def quantization_step(vertices: np.ndarray):
+    """(min, pas) de quantification par axe, en float32."""
+    v = np.asarray(vertices, dtype=np.float32)
+    vmin = v.min(axis=0) if len(v) else np.zeros(3, np.float32)
+    extent = (v.max(axis=0) - vmin) if len(v) else np.zeros(3, np.float32)
+    step = np.where(extent > 0, extent / _LEVELS, 1).astype(np.float32)
+    return vmin.astype(np.float32), step
+
+
+def encode_mesh(vertices: np.ndarray, faces: np.ndarray, codec: str = "gzip") -> bytes:
+    """Encode (vertices N×3, faces M×3) au format CVMZ."""
+    if codec not in CODECS:
+        raise ValueError(f"Codec inconnu : {codec}")
+    v = np.asarray(vertices, dtype=np.float32).reshape(-1, 3)
+    f = reorder_faces(np.asarray(faces).reshape(-1, 3))
+
+    vmin, step = quantization_step(v)
+    q = np.rint((v.astype(np.float64) - vmin) / step).clip(0, _LEVELS).astype(np.int64)
+    pos_deltas = np.diff(q, axis=0, prepend=np.zeros((1, 3), np.int64)).ravel()
+    idx = f.ravel()
+    idx_deltas = np.diff(idx, prepend=0)
+
+    raw = b"".join((
+        _BODY_HEADER.pack(len(v), len(f), *vmin.tolist(), *step.tolist()),
+        _shuffle(_zigzag(pos_deltas)),
+        _shuffle(_zigzag(idx_deltas)),
+    ))
+    return _HEADER.pack(MAGIC, VERSION, CODECS[codec]) + _compress(raw, codec)
+
+
+def decode_mesh(data: bytes):
+    """
+    Décodeur de référence du format CVMZ.
+
+    Returns:
+        (vertices float32 N×3, faces int32 M×3) ; triangles dans l'ordre réordonné
+    """
+    magic, version, codec_id = _HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Données CVMZ invalides")
+    raw = _decompress(data[_HEADER.size:], codec_id)
+
+    n_vertices, n_faces, *bounds = _BODY_HEADER.unpack_from(raw)
+    vmin = np.array(bounds[:3], dtype=np.float32)
+    step = np.array(bounds[3:], dtype=np.float32)
+    at = _BODY_HEADER.size
+
+    # le cumul se fait par axe : les deltas ont été pris le long des sommets
+    q = np.cumsum(_unzigzag(_unshuffle(raw, 3 * n_vertices, at)).reshape(-1, 3), axis=0)
+    at += 12 * n_vertices
+    idx = np.cumsum(_unzigzag(_unshuffle(raw, 3 * n_faces, at)))
+
+    vertices = (vmin.astype(np.float64) + q * step.astype(np.float64)).astype(np.float32)
+    return vertices, idx.reshape(-1, 3).astype(np.int32)
+
+
+def generate_compressed_mesh(gii_path, output_dir, codec: str = "gzip") -> Path:
+    """Artefact CVMZ de ``gii_path`` dans ``output_dir`` (``<sha256>.<codec>.cvmz``), mis en cache."""
+    def build(tmp: Path):
+        vertices, faces = load_mesh_arrays(gii_path)
+        tmp.write_bytes(encode_mesh(vertices, faces, codec))
+
+    return get_cache(output_dir).get_or_create(gii_path, f".{codec}.cvmz", build)
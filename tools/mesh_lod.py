@@ -0,0 +1,138 @@
+"""
+Pyramide de niveaux de détail (LOD) d'un maillage.
+
+Chaque niveau est obtenu par regroupement des sommets sur une grille
+régulière (vertex clustering, entièrement vectorisé) : la taille de cellule
+est ajustée par dichotomie pour conserver la fraction de sommets demandée.
+Deux sommets d'une même cellule ne sont fusionnés que si leurs normales ont
+la même orientation dominante, ce qui évite de souder les deux berges d'un
+sillon. Chaque cluster est représenté par le sommet d'origine le plus proche
+de son barycentre : les sommets d'un niveau restent sur la surface.
+
+Chaque niveau fournit :
+  • ``vertices`` / ``faces`` du maillage simplifié
+  • ``mapping`` (N_full,) : sommet du niveau associé à chaque sommet d'origine
+  • ``source`` (N_level,) : sommet d'origine représentant chaque sommet du niveau
+
+Les niveaux sont mis en cache par contenu de maillage dans ``LOD_OUTPUT``.
+"""
+import os
+from pathlib import Path
+
+import numpy as np
+
+from tools.conversion_cache import get_cache
+from tools.geometry_cache import get_geometry
+
+LOD_OUTPUT = Path("cache/lod")
+
+# Fractions de sommets conservées, du plus grossier au plus fin
+LOD_LEVELS = tuple(
+    float(x) for x in os.environ.get("CORTEXVISU_LOD_LEVELS", "0.1,0.25,1.0").split(",")
+)
+
+# Itérations de la dichotomie sur la taille de cellule
+_SEARCH_STEPS = 24
+
+
+def _orientation_class(normals: np.ndarray) -> np.ndarray:
+    """Axe dominant et signe de chaque normale : 6 classes (0…5)."""
+    axis = np.abs(normals).argmax(axis=1)
+    sign = normals[np.arange(len(normals)), axis] < 0
+    return axis * 2 + sign
+
+
+def _cluster(vertices: np.ndarray, classes: np.ndarray, cell: float):
+    """Identifiant de cluster (0…K-1) de chaque sommet et nombre K de clusters."""
+    cells = np.floor((vertices - vertices.min(axis=0)) / cell).astype(np.int64)
+    dims = cells.max(axis=0) + 1
+    key = ((cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2]) * 6 + classes
+    _, labels = np.unique(key, return_inverse=True)
+    return labels, int(labels.max()) + 1
+
+
+def decimate(vertices: np.ndarray, faces: np.ndarray, normals: np.ndarray,
+             fraction: float) -> dict:
+    """
+    Simplifie le maillage en gardant environ ``fraction`` des sommets.
+
+    Returns:
+        dict: vertices (float32), faces (int32), mapping et source (int32)
+    """
+    v = np.asarray(vertices, dtype=np.float64)
+    f = np.asarray(faces, dtype=np.int64)
+    n = len(v)
+    if fraction >= 1:
+        identity = np.arange(n, dtype=np.int32)
+        return {"vertices": v.astype(np.float32), "faces": f.astype(np.int32),
+                "mapping": identity, "source": identity}
+
+    classes = _orientation_class(np.asarray(normals))
+    target = max(4, int(n * fraction))
+
+    # dichotomie (échelle log) sur la taille de cellule
+    extent = float(np.ptp(v, axis=0).max()) or 1.0
+    lo, hi = np.log(extent * 1e-6), np.log(extent)
+    best = None
+    for _ in range(_SEARCH_STEPS):
+        mid = (lo + hi) / 2
+        labels, k = _cluster(v, classes, np.exp(mid))
+        if best is None or abs(k - target) < abs(best[1] - target):
+            best = (labels, k)
+        if k > target:
+            lo = mid
+        else:
+            hi = mid
+    labels, k = best
+
+    # représentant : sommet d'origine le plus proche du barycentre du cluster
+    counts = np.bincount(labels, minlength=k)
+    centroid = np.stack([np.bincount(labels, weights=v[:, i], minlength=k)
+                         for i in range(3)], axis=1) / counts[:, None]
+    dist = np.einsum("ij,ij->i", v - centroid[labels], v - centroid[labels])
+    order = np.lexsort((dist, labels))
+    first = np.ones(n, dtype=bool)
+    first[1:] = labels[order][1:] != labels[order][:-1]
+    source = order[first]                            # trié par label
+
+    # faces remappées : suppression des triangles dégénérés et des doublons
+    tri = labels[f]
+    keep = (tri[:, 0] != tri[:, 1]) & (tri[:, 1] != tri[:, 2]) & (tri[:, 0] != tri[:, 2])
+    tri = tri[keep]
+    canon = np.sort(tri, axis=1)
+    _, unique_idx = np.unique(canon, axis=0, return_index=True)
+    tri = tri[np.sort(unique_idx)]
+
+    return {
+        "vertices": v[source].astype(np.float32),
+        "faces": tri.astype(np.int32),
+        "mapping": labels.astype(np.int32),
+        "source": source.astype(np.int32),
+    }
+
+
+def get_lod(mesh_path, fraction: float, output_dir: Path = LOD_OUTPUT) -> dict:
+    """Niveau ``fraction`` de ``mesh_path`` (calculé une fois, puis relu en mmap)."""
+    geometry = get_geometry(mesh_path)
+    if fraction >= 1:
+        return decimate(geometry.vertices, geometry.faces, None, 1.0)
+
+    def build(tmp: Path):
+        level = decimate(geometry.vertices, geometry.faces, geometry.vertex_normals, fraction)
+        with open(tmp, "wb") as fh:
+            np.savez(fh, **level)
+
+    path = get_cache(output_dir).get_or_create(
+        mesh_path, f"_lod{int(round(fraction * 1000)):04d}.npz", build
+    )
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
+
+
+def resample_texture(values: np.ndarray, mapping: np.ndarray, n_level: int) -> np.ndarray:
+    """Texture pleine résolution → niveau : moyenne des sommets de chaque cluster (NaN ignorés)."""
+    values = np.asarray(values, dtype=np.float64)
+    finite = np.isfinite(values)
+    sums = np.bincount(mapping[finite], weights=values[finite], minlength=n_level)
+    counts = np.bincount(mapping[finite], minlength=n_level)
+    return np.divide(sums, counts, out=np.full(n_level, np.nan), where=counts > 0)
@@ -0,0 +1,170 @@
+"""
+Export binaire glTF 2.0 (.glb) d'un maillage et de ses textures scalaires.
+
+Un seul fichier contient les positions (float32), les faces (uint32) et chaque
+texture comme attribut de sommet personnalisé (``_NOM``, float32). Le chunk JSON
+décrit l'offset de chaque bloc : le client peut lire l'en-tête puis récupérer
+un attribut précis par requête HTTP Range. Le fichier se charge aussi tel quel
+avec le GLTFLoader de Three.js.
+"""
+import hashlib
+import json
+import re
+import struct
+from pathlib import Path
+
+import numpy as np
+
+from tools.conversion_cache import file_digest
+from tools.conversion_cache import get_cache
+from tools.parser import load_mesh_arrays, load_scalar_array
+
+GLB_MAGIC = 0x46546C67            # "glTF"
+CHUNK_JSON = 0x4E4F534A
+CHUNK_BIN = 0x004E4942
+
+FLOAT = 5126
+UNSIGNED_INT = 5125
+ARRAY_BUFFER = 34962
+ELEMENT_ARRAY_BUFFER = 34963
+
+
+def attribute_name(texture_name: str) -> str:
+    """Nom d'attribut glTF d'une texture (les attributs applicatifs commencent par _)."""
+    return "_" + re.sub(r"[^A-Za-z0-9]", "_", texture_name).upper()
+
+
+def _pad(data: bytes, fill: bytes) -> bytes:
+    return data + fill * (-len(data) % 4)
+
+
+def unique_texture_names(paths) -> list[str]:
+    """Nom de chaque texture (stem), suffixé ``_2``, ``_3``… si le nom ou l'attribut est déjà pris."""
+    names, attributes = [], set()
+    for path in paths:
+        stem = Path(path).stem
+        name, n = stem, 1
+        while name in names or attribute_name(name) in attributes:
+            n += 1
+            name = f"{stem}_{n}"
+        names.append(name)
+        attributes.add(attribute_name(name))
+    return names
+
+
+def _bounds(values: np.ndarray) -> dict:
+    """min / max d'accessor (NaN ignorés) ; absents si aucune valeur finie (JSON valide)."""
+    finite = values[np.isfinite(values)]
+    if not finite.size:
+        return {}
+    return {"min": [float(finite.min())], "max": [float(finite.max())]}
+
+
+def write_glb(vertices: np.ndarray, faces: np.ndarray,
+              scalars: dict[str, np.ndarray], output_path: Path,
+              skipped: list | None = None) -> None:
+    """
+    Écrit un .glb contenant le maillage et les textures ``scalars``
+    (nom → tableau de taille N). Chaque bloc binaire est aligné sur 4 octets.
+    ``skipped`` (textures écartées, avec leur motif) est noté dans les extras.
+    """
+    if len({attribute_name(name) for name in scalars}) != len(scalars):
+        raise ValueError("Deux textures donnent le même attribut glTF : renommez-les "
+                         "(voir unique_texture_names)")
+    blocks = [
+        (np.ascontiguousarray(vertices, dtype="<f4"), ARRAY_BUFFER),
+        (np.ascontiguousarray(faces, dtype="<u4"), ELEMENT_ARRAY_BUFFER),
+    ] + [
+        (np.ascontiguousarray(values, dtype="<f4").reshape(-1), ARRAY_BUFFER)
+        for values in scalars.values()
+    ]
+
+    buffer_views = []
+    offset = 0
+    for arr, target in blocks:
+        buffer_views.append({"buffer": 0, "byteOffset": offset,
+                             "byteLength": arr.nbytes, "target": target})
+        offset += arr.nbytes                # float32 / uint32 : toujours aligné
+
+    accessors = [
+        {"bufferView": 0, "componentType": FLOAT, "count": len(vertices), "type": "VEC3",
+         "min": vertices.min(axis=0).tolist(), "max": vertices.max(axis=0).tolist()},
+        {"bufferView": 1, "componentType": UNSIGNED_INT, "count": int(faces.size),
+         "type": "SCALAR"},
+    ]
+    attributes = {"POSITION": 0}
+    textures = []
+    for i, name in enumerate(scalars, start=2):
+        values = blocks[i][0]
+        accessors.append({"bufferView": i, "componentType": FLOAT, "count": int(values.size),
+                          "type": "SCALAR", **_bounds(values)})
+        attributes[attribute_name(name)] = i
+        textures.append({"name": name, "attribute": attribute_name(name), "accessor": i})
+
+    gltf = {
+        "asset": {"version": "2.0", "generator": "cortexvisu mesh_to_glb"},
+        "scene": 0,
+        "scenes": [{"nodes": [0]}],
+        "nodes": [{"mesh": 0}],
+        "meshes": [{"primitives": [{"attributes": attributes, "indices": 1, "mode": 4}],
+                    "extras": {"textures": textures, "skipped": skipped or []}}],
+        "buffers": [{"byteLength": offset}],
+        "bufferViews": buffer_views,
+        "accessors": accessors,
+    }
+
+    json_chunk = _pad(json.dumps(gltf, separators=(",", ":"), allow_nan=False).encode(), b" ")
+    total = 12 + 8 + len(json_chunk) + 8 + offset
+
+    with open(output_path, "wb") as f:
+        f.write(struct.pack("<III", GLB_MAGIC, 2, total))
+        f.write(struct.pack("<II", len(json_chunk), CHUNK_JSON))
+        f.write(json_chunk)
+        f.write(struct.pack("<II", offset, CHUNK_BIN))
+        for arr, _ in blocks:
+            f.write(memoryview(arr).cast("B"))
+
+
+def read_glb_json(path: Path) -> dict:
+    """Lit uniquement l'en-tête et le chunk JSON d'un .glb (sans le binaire)."""
+    with open(path, "rb") as f:
+        magic, _, _ = struct.unpack("<III", f.read(12))
+        if magic != GLB_MAGIC:
+            raise ValueError(f"{path} n'est pas un fichier glb")
+        length, chunk_type = struct.unpack("<II", f.read(8))
+        if chunk_type != CHUNK_JSON:
+            raise ValueError(f"{path} : premier chunk non JSON")
+        return json.loads(f.read(length))
+
+
+def generate_glb(gii_path: Path, texture_paths: list, output_dir: Path) -> tuple[Path, list]:
+    """
+    Convertit un maillage .gii et ses textures en un seul .glb, mis en cache
+    selon le contenu du maillage et des textures.
+
+    Les textures dont le nombre de valeurs ne correspond pas au nombre
+    de sommets sont ignorées (listées dans ``extras.skipped``). Deux textures
+    de même nom sont distinguées par un suffixe (``curv``, ``curv_2``).
+
+    Returns:
+        (Path, list): chemin du .glb et noms des textures incluses
+    """
+    tex_key = hashlib.sha256(
+        "".join(file_digest(p) for p in texture_paths).encode()
+    ).hexdigest()[:16]
+
+    def build(tmp: Path):
+        vertices, faces = load_mesh_arrays(gii_path)
+        scalars, skipped = {}, []
+        for name, texture_path in zip(unique_texture_names(texture_paths), texture_paths):
+            values = load_scalar_array(texture_path)
+            if values.size != len(vertices):
+                skipped.append({"name": name, "path": str(texture_path),
+                                "reason": f"{values.size} valeurs pour {len(vertices)} sommets"})
+                continue
+            scalars[name] = values
+        write_glb(vertices, faces, scalars, tmp, skipped)
+
+    glb_path = get_cache(output_dir).get_or_create(gii_path, f"_{tex_key}.glb", build)
+    textures = read_glb_json(glb_path)["meshes"][0]["extras"]["textures"]
+    return glb_path, [t["name"] for t in textures]
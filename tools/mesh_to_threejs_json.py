@@ -1,14 +1,59 @@
 import json
-import uuid
+import numpy as np
 from pathlib import Path
-from tools.parser import load_mesh  
+from tools.parser import load_mesh_arrays
+from tools.conversion_cache import get_cache
+
+# Nombre de valeurs sérialisées à la fois par le writer streaming
+CHUNK_SIZE = 1 << 16
+
+METADATA = {
+    "version": 4.5,
+    "type": "BufferGeometry",
+    "generator": "generate_threejs_json"
+}
+
+
+def _write_json_array(f, arr: np.ndarray, chunk_size: int) -> None:
+    """Écrit ``arr`` aplati comme tableau JSON, par blocs de ``chunk_size`` valeurs."""
+    flat = arr.reshape(-1)                  # vue, pas de copie
+    f.write("[")
+    for start in range(0, flat.size, chunk_size):
+        if start:
+            f.write(", ")
+        f.write(json.dumps(flat[start:start + chunk_size].tolist())[1:-1])
+    f.write("]")
+
+
+def write_threejs_json(gii_path: Path, output_path: Path) -> None:
+    """
+    Écrit le JSON BufferGeometry (Three.js) du maillage dans ``output_path``.
+
+    Le document est émis au fil de l'eau directement depuis les buffers NumPy :
+    en plus des tableaux du maillage, la mémoire utilisée se limite à un bloc
+    de ``CHUNK_SIZE`` valeurs, quelle que soit la taille du maillage.
+    """
+    # Charge les données du maillage
+    vertices, faces = load_mesh_arrays(gii_path)
+
+    with open(output_path, "w") as f:
+        f.write('{"metadata": ' + json.dumps(METADATA))
+        f.write(', "data": {"attributes": {"position": '
+                '{"itemSize": 3, "type": "Float32Array", "array": ')
+        _write_json_array(f, vertices, CHUNK_SIZE)
+        f.write(', "normalized": false}}, "index": {"type": "Uint32Array", "array": ')
+        _write_json_array(f, faces, CHUNK_SIZE)
+        f.write("}}}")
 
 
 def generate_threejs_json(gii_path: Path, output_dir: Path) -> Path:
     """
     Convertit un fichier .gii contenant un maillage (vertices + faces)
     en un fichier JSON compatible BufferGeometry (Three.js).
-    
+
+    Le résultat est mis en cache selon le contenu du fichier source :
+    une conversion répétée renvoie directement le JSON existant.
+
     Args:
         gii_path (Path): chemin vers le fichier GIFTI
         output_dir (Path): dossier de sortie pour le .json
@@ -16,42 +61,11 @@ def generate_threejs_json(gii_path: Path, output_dir: Path) -> Path:
     Returns:
         Path: chemin complet du fichier JSON généré
     """
-    # Charge les données du maillage
-    vertices, faces = load_mesh(str(gii_path))
-
-    # Aplatissement des listes (Three.js attend une liste plate de coordonnées)
-    flat_vertices = [coord for vertex in vertices for coord in vertex]
-    flat_faces = [index for face in faces for index in face]
-
-    # Création du JSON BufferGeometry
-    data = {
-        "metadata": {
-            "version": 4.5,
-            "type": "BufferGeometry",
-            "generator": "generate_threejs_json"
-        },
-        "data": {
-            "attributes": {
-                "position": {
-                    "itemSize": 3,
-                    "type": "Float32Array",
-                    "array": flat_vertices,
-                    "normalized": False
-                }
-            },
-            "index": {
-                "type": "Uint32Array",
-                "array": flat_faces
-            }
-        }
-    }
-
-    # Génère un nom unique basé sur l'input
-    output_filename = f"{uuid.uuid4().hex}_{gii_path.stem}.json"
-    output_path = output_dir / output_filename
-
-    # Sauvegarde du JSON
-    with open(output_path, "w") as f:
-        json.dump(data, f)
+    return get_cache(output_dir).get_or_create(
+        gii_path, ".json", lambda tmp: write_threejs_json(gii_path, tmp)
+    )
+
 
-    return output_path
+def invalidate_threejs_json(output_dir: Path, gii_path: Path | None = None) -> list[Path]:
+    """Supprime le JSON en cache de ``gii_path`` (ou tout le cache de ``output_dir``)."""
+    return get_cache(output_dir).invalidate(gii_path)
@@ -1,16 +1,233 @@
+import glob
+import os
+import threading
+from collections import OrderedDict
 import nibabel as nb
 import numpy as np
 from pathlib import Path
 
+from tools.gifti_reader import read_darray, read_darrays
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+
+# Budget mémoire (octets) du cache des tableaux GIFTI décodés
+ARRAY_CACHE_BYTES = int(os.environ.get("CORTEXVISU_ARRAY_CACHE_BYTES", str(512 * 2**20)))
+
+
+class ArrayCache:
+    """
+    Cache LRU des tableaux décodés, partagé par tout le processus et borné
+    en octets. La clé (chemin, mtime, taille, type de lecture) invalide
+    d'elle-même une entrée dont le fichier a changé.
+
+    Les tableaux renvoyés sont partagés entre appelants : ils sont en
+    lecture seule (copier avant de modifier).
+    """
+
+    def __init__(self, max_bytes: int = ARRAY_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict = OrderedDict()      # clé → (valeur, octets)
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_load(self, path, kind: str, load):
+        """Valeur ``load(path)`` (tableau ou tuple de tableaux), depuis le cache si possible."""
+        path = Path(path).resolve()
+        st = path.stat()
+        key = (str(path), st.st_mtime_ns, st.st_size, kind)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        value = load(path)
+        arrays = value if isinstance(value, tuple) else (value,)
+        for arr in arrays:
+            arr.flags.writeable = False
+        size = sum(arr.nbytes for arr in arrays)
+        if size > self.max_bytes:
+            return value
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = (value, size)
+                self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, (_, freed) = self._entries.popitem(last=False)
+                self.nbytes -= freed
+                self.evictions += 1
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.nbytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else None,
+            }
+
+
+array_cache = ArrayCache()
+
+
+def _load_gifti(path):
+    # mmap=True : les darrays stockés en ExternalFileBinary sont projetés
+    # en mémoire au lieu d'être lus entièrement
+    return nb.load(str(path), mmap=True)
+
+
+def _read_mesh(path):
+    try:
+        coords, faces = read_darrays(path, [0, 1])
+    except ValueError:
+        g = _load_gifti(path)
+        coords, faces = g.darrays[0].data, g.darrays[1].data
+    return np.asarray(coords, dtype=np.float32), np.asarray(faces, dtype=np.int32)
+
+
+def _read_scalars(path, darray=0):
+    # seul le darray demandé est décodé ; nibabel en dernier recours
+    try:
+        return read_darray(path, darray)
+    except ValueError:
+        return np.asarray(_load_gifti(path).darrays[darray].data)
+
+
+# ---------------------------------------------------------------------------
+# API NumPy : les tableaux restent des ndarray (aucune conversion en listes)
+# ---------------------------------------------------------------------------
+def load_mesh_arrays(gii_path):
+    """
+    Charge un maillage GIFTI sous forme de tableaux NumPy :
+    vertices en float32 (N×3), faces en int32 (M×3).
+    Aucune copie si les darrays sont déjà dans ces types.
+    Tableaux en lecture seule, partagés via ``array_cache``.
+    """
+    return array_cache.get_or_load(gii_path, "mesh", _read_mesh)
+
+
+def load_scalar_array(scalar_path, darray: int = 0):
+    """
+    Renvoie le darray ``darray`` (le premier par défaut) d'une texture GIFTI,
+    dans son type d'origine (lecture seule). Les autres darrays du fichier ne
+    sont pas décodés.
+    """
+    return array_cache.get_or_load(
+        scalar_path, f"scalars[{darray}]", lambda path: _read_scalars(path, darray)
+    )
+
+
+def normals_sidecar(path: str | Path) -> Path:
+    """
+    Sidecar binaire de la version courante d'un CSV de normales :
+    ``.<nom>.csv.<taille>-<mtime_ns>.npy`` (fichier caché). La clé (taille,
+    mtime) doit correspondre exactement : un CSV remplacé par un fichier plus
+    ancien (``cp -p``, ``rsync -t``, archive) n'est pas confondu avec l'ancien.
+    """
+    path = Path(path)
+    st = path.stat()
+    return path.with_name(f".{path.name}.{st.st_size}-{st.st_mtime_ns}.npy")
+
+
+def _check_normals(arr: np.ndarray) -> np.ndarray:
+    if arr.ndim != 2 or arr.shape[1] != 3:
+        raise ValueError('CSV doit être au format N×3 (nx,ny,nz)')
+    return arr
+
+
+def _has_header(path: Path) -> bool:
+    """Vrai si la 1ʳᵉ ligne (seule lue) n'est pas numérique."""
+    with open(path, encoding="utf-8") as f:
+        first_line = f.readline().strip()
+    try:
+        [float(x) for x in first_line.split(",")]
+        return False
+    except ValueError:
+        return True
+
+
+def _parse_normals_csv(path: Path) -> np.ndarray:
+    skip = 1 if _has_header(path) else 0
+    if pd is not None:
+        arr = pd.read_csv(path, header=None, skiprows=skip, dtype=np.float64,
+                          engine="c").to_numpy()
+    else:
+        arr = np.loadtxt(path, delimiter=',', skiprows=skip, ndmin=2)
+    return arr.astype(np.float64, copy=False)
+
+
+def load_normals_array(path: str | Path, sidecar: bool = True):
+    """
+    Charge des normales N×3 en ndarray float64.
+
+    • ``.npy`` : projeté en mémoire (mmap, lecture seule)
+    • ``.csv`` : entête éventuelle détectée sur la 1ʳᵉ ligne, lecture par le
+      moteur C de pandas s'il est installé (sinon ``np.loadtxt``). Avec
+      ``sidecar=True``, le résultat est enregistré dans ``normals_sidecar``
+      et les chargements suivants projettent ce fichier tant que la taille
+      et le mtime du CSV sont inchangés.
+
+    pandas est facultatif (absent de requirements.txt) : dans une
+    installation par défaut, seul le sidecar accélère les lectures
+    suivantes ; la première lecture passe par ``np.loadtxt``.
+    """
+    path = Path(path)
+    if path.suffix.lower() == ".npy":
+        return _check_normals(np.load(path, mmap_mode="r"))
+
+    side = normals_sidecar(path)
+    if sidecar:
+        try:
+            return _check_normals(np.load(side, mmap_mode="r"))
+        except (OSError, ValueError):
+            pass
+
+    arr = _check_normals(_parse_normals_csv(path))
+    if sidecar:
+        tmp = side.with_name(f"{side.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp, "wb") as f:
+                np.save(f, arr)
+            os.replace(tmp, side)
+            # sidecars des versions précédentes du CSV
+            for old in path.parent.glob(f".{glob.escape(path.name)}.*-*.npy"):
+                if old != side:
+                    old.unlink(missing_ok=True)
+        except OSError:                      # dossier en lecture seule : pas de sidecar
+            tmp.unlink(missing_ok=True)
+    return arr
+
+
+# ---------------------------------------------------------------------------
+# API listes : conversion à la frontière JSON (anciens appelants)
+# ---------------------------------------------------------------------------
 def load_mesh(gii_path):
-    g = nb.load(gii_path)
-    coords = g.darrays[0].data.tolist()
-    faces = g.darrays[1].data.tolist()
-    return coords, faces
+    coords, faces = load_mesh_arrays(gii_path)
+    return coords.tolist(), faces.tolist()
+
 
 def load_scalar_data(scalar_path):
-    g = nb.load(scalar_path)
-    return g.darrays[0].data.tolist()
+    return load_scalar_array(scalar_path).tolist()
 
 
 def write_texture(tex, gifti_file):
@@ -29,12 +246,4 @@ def load_normals_csv(path: str | Path):
     """
     Charge un CSV N×3. Ignore automatiquement une entête éventuelle.
     """
-    path = Path(path)
-    # détermine si la 1ʳᵉ ligne contient du texte
-    first_line = path.read_text().splitlines()[0].strip()
-    skip = 1 if not first_line.replace(',', '').replace('.', '').replace('-', '').isdigit() else 0
-
-    arr = np.loadtxt(path, delimiter=',', skiprows=skip)
-    if arr.ndim != 2 or arr.shape[1] != 3:
-        raise ValueError('CSV doit être au format N×3 (nx,ny,nz)')
-    return arr.astype(float).tolist()
+    return load_normals_array(path).tolist()
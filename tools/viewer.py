@@ -1,16 +1,16 @@
 import json
 from pathlib import Path
-from tools.parser import load_mesh, load_scalar_data
+from tools.parser import load_mesh_arrays, load_scalar_array
 import matplotlib.pyplot as plt
 
 def generate_json(surface_path, scalar_path, output_path):
-    vertices, faces = load_mesh(surface_path)
-    scalars = load_scalar_data(scalar_path)
+    vertices, faces = load_mesh_arrays(surface_path)
+    scalars = load_scalar_array(scalar_path)
 
     data = {
-        "vertices": vertices,
-        "faces": faces,
-        "scalars": scalars,
+        "vertices": vertices.tolist(),
+        "faces": faces.tolist(),
+        "scalars": scalars.tolist(),
         "title": Path(surface_path).stem
     }
 